@@ -4,6 +4,7 @@
 # Streamlit 앱 설정을 구성하고 메인 UI를 렌더링합니다.
 
 import streamlit as st
+from lib.metrics import start_metrics_server
 from ui.main import render_main_ui
 
 # Streamlit 앱 설정
@@ -14,5 +15,8 @@ st.set_page_config(
     initial_sidebar_state="expanded"    # 사이드바 초기 상태 (expanded: 펼침)
 )
 
+# 메트릭/상태 확인 HTTP 서버 시작 (별도 포트, 프로세스당 한 번만 시작)
+start_metrics_server()
+
 # 메인 UI 렌더링 함수 호출
 render_main_ui()
\ No newline at end of file
@@ -1,11 +1,14 @@
 # Path: /bedrock_chatbot_app/lib/agent.py
 
 """Amazon Bedrock Agent를 호출하기 위한 기능을 제공하는 모듈"""
-import json
 import time
 import logging
 from lib.bedrock_client import get_bedrock_agent_client
 from lib.config import config
+from lib.json_codec import loads
+from lib.stream_decoder import StreamTextDecoder
+from lib.trace_utils import TraceIndex
+from lib.metrics import PARSE_SECONDS, STREAM_SECONDS, track_call
 
 logger = logging.getLogger(__name__)
 
@@ -53,27 +56,29 @@ def invoke_agent(input_text, agent_id=None, agent_alias_id=None, enable_trace=Tr
         logger.info(f"🚀 Agent API 호출: ID={agent_id}, Alias={agent_alias_id}, 트레이스={enable_trace}")
         
         # Agent 호출
-        response = client.invoke_agent(
-            agentId=agent_id,
-            agentAliasId=agent_alias_id,
-            sessionId=session_id,
-            inputText=input_text,
-            enableTrace=enable_trace
-        )
+        with track_call("invoke_agent"):
+            response = client.invoke_agent(
+                agentId=agent_id,
+                agentAliasId=agent_alias_id,
+                sessionId=session_id,
+                inputText=input_text,
+                enableTrace=enable_trace
+            )
         
         logger.info("✅ Agent API 응답 수신 성공")
         
-        # 응답 처리
-        chunks = []
+        # 응답 처리 (응답 바이트는 버퍼에 모아 마지막에 한 번만 디코딩)
+        text_decoder = StreamTextDecoder()
         trace_data = {}
+        trace_index = TraceIndex()
+        stream_start = time.perf_counter()
+        parse_seconds = 0.0
         
         # 이벤트 스트림 처리
         for event_idx, event in enumerate(response.get("completion", [])):
             # 응답 텍스트 추출
             if "chunk" in event:
-                chunk_text = event["chunk"].get("bytes", b"").decode("utf-8")
-                if chunk_text:
-                    chunks.append(chunk_text)
+                text_decoder.feed(event["chunk"].get("bytes", b""))
             
             # 트레이스 정보 처리
             if "trace" in event:
@@ -81,77 +86,44 @@ def invoke_agent(input_text, agent_id=None, agent_alias_id=None, enable_trace=Tr
                 raw_trace_data = event["trace"].get("bytes", b"")
                 
                 if raw_trace_data and len(raw_trace_data) > 0:
+                    parse_start = time.perf_counter()
                     try:
-                        decoded_trace = raw_trace_data.decode("utf-8")
-                        trace_info = json.loads(decoded_trace)
+                        trace_info = loads(raw_trace_data)
                         
                         # 트레이스 정보 병합
                         new_trace_data = trace_info.get("trace", trace_info)
+                        trace_index.add(new_trace_data)
                         deep_merge_dict(trace_data, new_trace_data)
                         
                     except Exception as e:
                         logger.error(f"⚠️ 트레이스 파싱 오류: {str(e)}")
+                    parse_seconds += time.perf_counter() - parse_start
                 elif isinstance(event["trace"], dict):
                     # 딕셔너리 형태의 트레이스 처리
                     new_trace_data = {k: v for k, v in event["trace"].items() if k != "bytes"}
                     if new_trace_data:
+                        trace_index.add(new_trace_data)
                         deep_merge_dict(trace_data, new_trace_data)
         
-        # 응답 텍스트 결합
-        response_text = "".join(chunks)
+        STREAM_SECONDS.observe(time.perf_counter() - stream_start, operation="invoke_agent")
+        PARSE_SECONDS.observe(parse_seconds, operation="invoke_agent")
         
-        # finalResponse에서 응답 텍스트 추출 (chunks가 비어있을 경우)
+        # 응답 텍스트 디코딩 (조각 경계에서 나뉜 멀티바이트 문자도 온전히 복원)
+        response_text = text_decoder.getvalue()
+        
+        # finalResponse에서 응답 텍스트 추출 (응답 청크가 비어있을 경우, 색인된 경로로 조회)
         if not response_text and trace_data:
-            # 여러 위치에서 finalResponse 찾기 시도
-            final_response_text = None
-            
-            # 1. orchestrationTrace > observation > finalResponse
-            if "orchestrationTrace" in trace_data:
-                orch_trace = trace_data["orchestrationTrace"]
-                if "observation" in orch_trace and "finalResponse" in orch_trace["observation"]:
-                    final_response_text = orch_trace["observation"]["finalResponse"].get("text", "")
-            
-            # 2. observation > finalResponse
-            elif "observation" in trace_data and "finalResponse" in trace_data["observation"]:
-                final_response_text = trace_data["observation"]["finalResponse"].get("text", "")
-            
-            # 3. 재귀 탐색
-            if not final_response_text:
-                def find_final_response(obj):
-                    if not isinstance(obj, dict):
-                        return None
-                    
-                    if "finalResponse" in obj and "text" in obj["finalResponse"]:
-                        return obj["finalResponse"]["text"]
-                    
-                    for key, value in obj.items():
-                        if isinstance(value, dict):
-                            result = find_final_response(value)
-                            if result:
-                                return result
-                    return None
-                
-                final_response_text = find_final_response(trace_data)
-            
-            if final_response_text:
-                response_text = final_response_text
+            response_text = trace_index.final_response_text(trace_data) or ""
         
         # 응답 텍스트 기본값 설정
         response_text = response_text or "응답을 생성할 수 없습니다."
         
-        # 디버깅용 트레이스 저장
-        if trace_data:
-            try:
-                with open("last_trace.json", "w") as f:
-                    json.dump(trace_data, f, default=str, indent=2)
-            except Exception as e:
-                logger.debug(f"트레이스 저장 실패: {str(e)}")
-        
         # 최종 응답 구성
         return {
             "response_type": "agent",
             "output": response_text,
             "trace": trace_data,
+            "trace_index": trace_index.to_dict(),
             "session_id": session_id
         }
     
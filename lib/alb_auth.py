@@ -0,0 +1,83 @@
+# Path: /bedrock_chatbot_app/lib/alb_auth.py
+
+"""ALB OIDC 인증이 전달한 사용자 클레임(x-amzn-oidc-data)을 서명 검증하여 사용자 식별자를 구하는 모듈"""
+import logging
+import os
+import threading
+import urllib.request
+from lib.config import config
+
+try:
+    import jwt
+except ImportError:
+    jwt = None
+
+logger = logging.getLogger(__name__)
+
+# ALB가 인증 후 추가하는 사용자 클레임 헤더 (ES256으로 서명된 JWT)
+ALB_OIDC_DATA_HEADER = "X-Amzn-Oidc-Data"
+
+# ALB 서명 공개 키 주소 (리전과 JWT 헤더의 kid로 조회)
+ALB_PUBLIC_KEY_URL = "https://public-keys.auth.elb.{region}.amazonaws.com/{kid}"
+
+# 토큰을 서명한 ALB ARN (설정하면 다른 ALB가 서명한 토큰은 거부)
+EXPECTED_SIGNER = os.environ.get("ALB_ARN")
+
+PUBLIC_KEY_TIMEOUT_SECONDS = 3.0
+
+_public_keys = {}
+_public_keys_lock = threading.Lock()
+
+
+def _get_public_key(kid, region):
+    """kid에 해당하는 ALB 서명 공개 키(PEM)를 조회합니다 (프로세스 내 캐시)"""
+    with _public_keys_lock:
+        key = _public_keys.get((region, kid))
+    if key is None:
+        url = ALB_PUBLIC_KEY_URL.format(region=region, kid=kid)
+        with urllib.request.urlopen(url, timeout=PUBLIC_KEY_TIMEOUT_SECONDS) as response:
+            key = response.read().decode("utf-8")
+        with _public_keys_lock:
+            _public_keys[(region, kid)] = key
+    return key
+
+
+def verify_alb_identity(token, region=None, expected_signer=None):
+    """
+    ALB가 서명한 사용자 클레임 JWT를 검증하고 사용자 식별자(sub)를 반환합니다.
+
+    클라이언트가 보낸 헤더를 그대로 믿지 않고 ALB 공개 키로 서명과 만료 시간을 확인하며,
+    expected_signer(없으면 ALB_ARN 환경 변수)가 있으면 서명한 ALB도 확인합니다.
+    PyJWT가 설치되어 있지 않거나 검증에 실패하면 None을 반환합니다.
+
+    Args:
+        token (str): x-amzn-oidc-data 헤더 값
+        region (str, optional): ALB 리전 (없으면 config.region_name)
+        expected_signer (str, optional): 허용할 ALB ARN
+
+    Returns:
+        str or None: 검증된 사용자 식별자
+    """
+    if not token:
+        return None
+    if jwt is None:
+        logger.warning("⚠️ PyJWT가 설치되지 않아 ALB 사용자 클레임을 검증할 수 없습니다")
+        return None
+
+    expected_signer = expected_signer or EXPECTED_SIGNER
+    try:
+        header = jwt.get_unverified_header(token)
+        if expected_signer and header.get("signer") != expected_signer:
+            logger.warning(f"⚠️ 허용되지 않은 ALB가 서명한 사용자 클레임: {header.get('signer')}")
+            return None
+
+        kid = header["kid"]
+        if not kid or "/" in kid:
+            raise ValueError(f"잘못된 kid: {kid}")
+        public_key = _get_public_key(kid, region or config.region_name)
+        claims = jwt.decode(token, public_key, algorithms=["ES256"], options={"require": ["exp", "sub"]})
+    except Exception as e:
+        logger.warning(f"⚠️ ALB 사용자 클레임 검증 실패: {str(e)}")
+        return None
+
+    return claims["sub"]
@@ -1,19 +1,180 @@
 # Path: /bedrock_chatbot_app/lib/bedrock_client.py
 
 """Amazon Bedrock 서비스에 접근하기 위한 클라이언트를 제공하는 모듈"""
+import logging
+import threading
+import time
+from collections import deque
 import boto3
+from botocore.exceptions import ClientError, EndpointConnectionError, ConnectTimeoutError, ReadTimeoutError
 from lib.config import config
+from lib.metrics import CLIENT_CREATE_SECONDS, record_call
 
-def get_bedrock_client():
+logger = logging.getLogger(__name__)
+
+# 다른 리전으로 전환할 오류 코드 (스로틀링, 서비스 장애)
+FAILOVER_ERROR_CODES = {
+    "ThrottlingException", "ServiceUnavailableException", "InternalServerException",
+    "ModelNotReadyException", "ModelTimeoutException", "TooManyRequestsException"
+}
+
+# 리전 상태 추적 설정
+EWMA_ALPHA = 0.2
+UNHEALTHY_ERROR_RATE = 0.5       # 이 값을 넘으면 다른 리전을 우선
+SECONDARY_PRIOR_LATENCY = 1.0    # 관측 전 보조 리전의 가정 지연 시간(초), 기본 리전을 우선하기 위함
+MAX_FAILOVER_EVENTS = 100
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _get_client(service_name, region_name):
+    """서비스/리전별 클라이언트를 생성하여 재사용합니다 (boto3 클라이언트는 스레드 안전)"""
+    key = (service_name, region_name)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                with CLIENT_CREATE_SECONDS.time(service=service_name, region=region_name):
+                    client = boto3.client(service_name=service_name, region_name=region_name)
+                _clients[key] = client
+    return client
+
+
+def get_bedrock_client(region_name=None):
     """기본 Bedrock 런타임 클라이언트(파운데이션 모델, Converse API용)를 반환합니다"""
-    return boto3.client(
-        service_name='bedrock-runtime',
-        region_name=config.region_name
-    )
+    return _get_client('bedrock-runtime', region_name or config.region_name)
+
 
 def get_bedrock_agent_client():
-    """Bedrock Agent 런타임 클라이언트(Agent, Flow, Knowledge Base용)를 반환합니다"""
-    return boto3.client(
-        service_name='bedrock-agent-runtime',
-        region_name=config.region_name
-    )
\ No newline at end of file
+    """
+    Bedrock Agent 런타임 클라이언트(Agent, Flow, Knowledge Base용)를 반환합니다
+
+    Agent, Flow, Knowledge Base 리소스 ID는 리전에 종속되므로 항상 기본 리전을 사용합니다.
+    """
+    return _get_client('bedrock-agent-runtime', config.region_name)
+
+
+def get_bedrock_agent_control_client():
+    """Bedrock Agent 관리(control plane) 클라이언트(데이터 소스/수집 작업 조회용)를 반환합니다"""
+    return _get_client('bedrock-agent', config.region_name)
+
+
+def is_failover_error(error):
+    """다른 리전으로 재시도할 만한 오류인지 확인합니다"""
+    if isinstance(error, (EndpointConnectionError, ConnectTimeoutError, ReadTimeoutError)):
+        return True
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code") in FAILOVER_ERROR_CODES
+    return False
+
+
+class RegionRouter:
+    """
+    여러 리전의 Bedrock 런타임 클라이언트를 보유하고 상태가 가장 좋은 리전으로 모델 호출을 보내는 클래스
+
+    리전별 지연 시간과 오류율의 EWMA를 추적하며, 스로틀링이나 서비스 장애가 발생하면
+    다음 리전으로 전환(failover)하고 그 이벤트를 기록합니다.
+
+    Attributes:
+        regions (list): 사용할 리전 목록 (첫 번째가 기본 리전)
+    """
+
+    def __init__(self, regions):
+        self.regions = list(dict.fromkeys(regions))
+        self._stats = {}   # region -> {"latency": 초, "error_rate": 0~1}
+        self._events = deque(maxlen=MAX_FAILOVER_EVENTS)
+        self._lock = threading.Lock()
+
+    def record(self, region, latency, success):
+        """리전 호출 결과를 반영합니다"""
+        error = 0.0 if success else 1.0
+        with self._lock:
+            stats = self._stats.get(region)
+            if stats is None:
+                self._stats[region] = {"latency": latency, "error_rate": error}
+                return
+            if success:
+                stats["latency"] += EWMA_ALPHA * (latency - stats["latency"])
+            stats["error_rate"] += EWMA_ALPHA * (error - stats["error_rate"])
+
+    def ranked_regions(self):
+        """상태가 좋은 순서로 리전 목록을 반환합니다"""
+        with self._lock:
+            stats = dict(self._stats)
+
+        def score(item):
+            index, region = item
+            region_stats = stats.get(region)
+            if region_stats is None:
+                prior = 0.0 if index == 0 else SECONDARY_PRIOR_LATENCY
+                return (False, prior, index)
+            unhealthy = region_stats["error_rate"] > UNHEALTHY_ERROR_RATE
+            return (unhealthy, region_stats["latency"] * (1 + 4 * region_stats["error_rate"]), index)
+
+        return [region for _, region in sorted(enumerate(self.regions), key=score)]
+
+    def invoke(self, operation, call, prefer_secondary=False):
+        """
+        상태가 가장 좋은 리전에서 호출하고, 전환 대상 오류가 나면 다음 리전에서 재시도합니다.
+
+        Args:
+            operation (str): 로그/이벤트에 표시할 작업 이름
+            call (callable): call(client) -> 결과
+            prefer_secondary (bool): 두 번째로 좋은 리전부터 시도 (헤지 요청 등에 사용)
+
+        Returns:
+            호출 결과
+        """
+        regions = self.ranked_regions()
+        if prefer_secondary and len(regions) > 1:
+            regions = regions[1:] + regions[:1]
+
+        last_error = None
+        for attempt, region in enumerate(regions):
+            start = time.perf_counter()
+            try:
+                result = call(get_bedrock_client(region))
+            except Exception as e:
+                self.record(region, time.perf_counter() - start, success=False)
+                record_call(operation, region, time.perf_counter() - start, e)
+                if not is_failover_error(e):
+                    raise
+                last_error = e
+                if attempt + 1 < len(regions):
+                    self._report_failover(operation, region, regions[attempt + 1], e)
+                continue
+
+            self.record(region, time.perf_counter() - start, success=True)
+            record_call(operation, region, time.perf_counter() - start)
+            return result
+
+        raise last_error
+
+    def _report_failover(self, operation, from_region, to_region, error):
+        """리전 전환 이벤트를 기록합니다"""
+        event = {
+            "timestamp": time.time(),
+            "operation": operation,
+            "from_region": from_region,
+            "to_region": to_region,
+            "error": str(error)
+        }
+        with self._lock:
+            self._events.append(event)
+        logger.warning(f"🌐 리전 전환: {operation} {from_region} → {to_region} ({error})")
+
+    def failover_events(self):
+        """최근 리전 전환 이벤트 목록을 반환합니다"""
+        with self._lock:
+            return list(self._events)
+
+    def stats(self):
+        """리전별 지연 시간/오류율을 반환합니다"""
+        with self._lock:
+            return {region: dict(stats) for region, stats in self._stats.items()}
+
+
+# 모델 호출용 리전 라우터 (기본 리전 + 보조 리전)
+region_router = RegionRouter([config.region_name] + list(config.fallback_regions))
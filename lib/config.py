@@ -1,7 +1,8 @@
 # Path: /bedrock_chatbot_app/lib/config.py
 
 """Bedrock 서비스 설정 정보를 관리하는 모듈"""
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 
 @dataclass
 class BedrockConfig:
@@ -16,7 +17,28 @@ class BedrockConfig:
         knowledge_base_id (str): Bedrock Knowledge Base의 ID
         
         region_name (str): AWS 리전 이름
-        model_id (str): 기본 파운데이션 모델 ID
+        fallback_regions (list): 모델 호출 장애 시 전환할 보조 리전 목록 (KB/Agent/Flow는 기본 리전만 사용)
+        model_id (str): 기본 파운데이션 모델 ID (Flow 데이터 추출에도 사용, 프롬프트 캐싱은 MODEL_OPTIONS의 prompt_caching 지원 모델에서만 적용)
+        
+        kb_federation_deadline_seconds (float): 여러 Knowledge Base 동시 검색 시 공통 마감 시간(초)
+        knowledge_base_backend (str): 검색 백엔드 ("bedrock" 또는 로컬 벡터 인덱스 "local")
+        local_index_path (str): 로컬 벡터 인덱스 디렉터리 (python -m lib.local_index build로 생성)
+        rerank_embedding_model_id (str): 검색 결과 재정렬에 사용할 임베딩 모델 ID (없으면 BM25만 사용)
+        retrieval_cache_ttl_seconds (float): 검색 결과 캐시 유효 시간(초)
+        retrieval_cache_max_entries (int): 검색 결과 캐시 최대 항목 수
+        retrieval_cache_version_check_seconds (float): KB 수집 작업 버전 확인 주기(초), None이면 확인 안 함
+        
+        transcript_anonymous_restore (bool): ALB OIDC 인증 사용자가 아닐 때 URL의 세션 토큰만으로 복원 허용 여부
+        
+        hedge_enabled (bool): 비스트리밍 멱등 호출의 헤지 요청 사용 여부
+        hedge_percentile (float): 헤지 요청을 보낼 지연 시간 백분위수 (0~1)
+        hedge_budget_ratio (float): 전체 요청 대비 허용할 헤지 요청 비율
+        hedge_model_id (str): Converse 헤지 요청에 사용할 보조 모델 ID (없으면 같은 모델, 보조 모델이 응답하면 메시지에 표시)
+        
+        log_level (str): 애플리케이션 로깅 레벨
+        log_format (str): 로그 출력 형식 ("json" 구조화 로그 또는 "text" 색상 텍스트)
+        log_sampling (dict): 로거 이름 접두어별 INFO 이하 로그 샘플링 비율 (0~1, WARNING 이상은 항상 기록)
+        metrics_port (int): Prometheus 메트릭(/metrics)과 상태 확인(/healthz, /readyz)을 제공할 포트, None이면 사용 안 함
     """
     # 기본 리소스 ID 설정 - 여기에 실제 ID 입력
     # flow_id: str = "YOUR-FLOW-ID"
@@ -34,7 +56,99 @@ class BedrockConfig:
     
     # AWS 리전 및 모델 설정
     region_name: str = "us-west-2"
+    fallback_regions: List[str] = field(default_factory=lambda: ["us-east-1"])
     model_id: str = "anthropic.claude-3-sonnet-20240229-v1:0"
+    
+    # Knowledge Base 통합 검색 설정
+    kb_federation_deadline_seconds: float = 3.0
+    knowledge_base_backend: str = "bedrock"
+    local_index_path: str = "local_index"
+    rerank_embedding_model_id: Optional[str] = None  # 예: "amazon.titan-embed-text-v2:0"
+    
+    # 검색 결과 캐시 설정
+    retrieval_cache_ttl_seconds: float = 300.0
+    retrieval_cache_max_entries: int = 256
+    retrieval_cache_version_check_seconds: Optional[float] = None  # 예: 60.0 (bedrock:ListIngestionJobs 권한 필요)
+    
+    # 채팅 기록 복원 설정 (소유자는 ALB가 서명한 사용자 클레임으로 확인, lib/alb_auth.py)
+    transcript_anonymous_restore: bool = False  # True면 URL을 아는 누구나 대화를 불러올 수 있음
+    
+    # 헤지 요청 설정
+    hedge_enabled: bool = False
+    hedge_percentile: float = 0.95
+    hedge_budget_ratio: float = 0.1
+    hedge_model_id: Optional[str] = None
+    
+    # 로깅 설정
+    log_level: str = "INFO"
+    log_format: str = "json"
+    log_sampling: Dict[str, float] = field(default_factory=dict)  # 예: {"lib.hedging": 0.1}
+    
+    # 메트릭 설정
+    metrics_port: Optional[int] = 9464
 
 # 전역 설정 객체 생성
-config = BedrockConfig()
\ No newline at end of file
+config = BedrockConfig()
+
+# 모델 옵션 목록 및 모델별 설정
+#   history_token_budget: Converse 대화 기록에 사용할 최대 입력 토큰 수 (초과분은 요약으로 압축)
+#   system_prompt: Converse API 시스템 프롬프트 지원 여부
+#   prompt_caching: Bedrock 프롬프트 캐싱(cache point) 지원 여부 (Claude 3 Sonnet/Haiku는 미지원)
+#   cache_min_tokens: 캐시 체크포인트 하나에 필요한 최소 접두부 토큰 수 (미만이면 체크포인트를 넣지 않음)
+#   context_window: 입력과 출력을 합한 최대 토큰 수
+#   max_output_tokens: 한 번에 생성할 수 있는 최대 토큰 수
+#   router_tier: 자동 라우팅 등급 ("fast": 기본 처리, "strong": 복잡한 요청/승격 대상, None: 라우팅 제외)
+#   relative_cost: 자동 라우팅 시 비교할 상대 비용 (Sonnet = 1.0)
+MODEL_OPTIONS = {
+    "anthropic.claude-3-sonnet-20240229-v1:0": {
+        "history_token_budget": 12000,
+        "system_prompt": True,
+        "prompt_caching": False,
+        "context_window": 200000,
+        "max_output_tokens": 4096,
+        "router_tier": "strong",
+        "relative_cost": 1.0
+    },
+    "anthropic.claude-3-haiku-20240307-v1:0": {
+        "history_token_budget": 12000,
+        "system_prompt": True,
+        "prompt_caching": False,
+        "context_window": 200000,
+        "max_output_tokens": 4096,
+        "router_tier": "fast",
+        "relative_cost": 0.08
+    },
+    # 프롬프트 캐싱 지원 모델 (온디맨드 호출은 교차 리전 추론 프로필 ID 사용)
+    "us.anthropic.claude-3-7-sonnet-20250219-v1:0": {
+        "history_token_budget": 12000,
+        "system_prompt": True,
+        "prompt_caching": True,
+        "cache_min_tokens": 1024,
+        "context_window": 200000,
+        "max_output_tokens": 8192,
+        "router_tier": "strong",
+        "relative_cost": 1.0
+    },
+    "us.anthropic.claude-3-5-haiku-20241022-v1:0": {
+        "history_token_budget": 12000,
+        "system_prompt": True,
+        "prompt_caching": True,
+        "cache_min_tokens": 2048,
+        "context_window": 200000,
+        "max_output_tokens": 8192,
+        "router_tier": "fast",
+        "relative_cost": 0.27
+    },
+    "amazon.titan-text-express-v1": {
+        "history_token_budget": 4000,
+        "system_prompt": False,
+        "prompt_caching": False,
+        "context_window": 8192,
+        "max_output_tokens": 8192,
+        "router_tier": None,  # 한국어 응답 품질 문제로 자동 라우팅에서 제외
+        "relative_cost": 0.05
+    }
+}
+
+# 오래된 대화 요약에 사용할 저비용 모델
+SUMMARY_MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
\ No newline at end of file
@@ -0,0 +1,117 @@
+# Path: /bedrock_chatbot_app/lib/conversation.py
+
+"""Converse API 메시지 형식 그대로 대화를 유지하는 대화 객체 모듈"""
+from lib.json_codec import dumps, loads
+
+
+class Conversation:
+    """
+    Converse API의 네이티브 메시지 형식({"role", "content": [블록, ...]})으로 대화를 보관하는 클래스
+
+    메시지 목록은 추가 전용으로 공유되며, 각 객체는 공유 목록의 앞부분(길이)만 바라봅니다.
+    끝에 추가할 때는 목록을 복사하지 않고 새 객체를 반환하므로 이전 객체가 보던 접두부는
+    그대로 유지되고, 턴마다 전체 기록을 다시 만드는 비용이 없습니다.
+    분기된(이미 뒤에 다른 메시지가 추가된) 객체에서 추가할 때만 접두부를 복사합니다.
+    메시지와 콘텐츠 블록은 불변으로 취급하며 수정하지 않습니다.
+    """
+
+    __slots__ = ("_messages", "_length")
+
+    def __init__(self, messages=None, _length=None):
+        self._messages = messages if messages is not None else []
+        self._length = len(self._messages) if _length is None else _length
+
+    @classmethod
+    def from_history(cls, history):
+        """
+        기존 대화 기록을 Conversation 객체로 변환합니다.
+
+        Args:
+            history: Conversation 객체, None, 또는 메시지 목록
+                (텍스트 전용 {"role", "content": str} 형식과 네이티브 형식 모두 지원)
+
+        Returns:
+            Conversation: 대화 객체
+        """
+        if isinstance(history, Conversation):
+            return history
+        if not history:
+            return cls()
+
+        messages = []
+        for msg in history:
+            content = msg["content"]
+            if not isinstance(content, list):
+                content = [{"text": str(content)}]
+            messages.append({"role": msg["role"], "content": content})
+        return cls(messages)
+
+    @property
+    def messages(self):
+        """Converse API에 그대로 전달할 수 있는 메시지 목록 (공유 목록이면 복사하지 않음)"""
+        if self._length == len(self._messages):
+            return self._messages
+        return self._messages[:self._length]
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        return iter(self.messages)
+
+    def __bool__(self):
+        return self._length > 0
+
+    def append(self, message):
+        """
+        메시지를 추가한 새 대화 객체를 반환합니다.
+
+        Args:
+            message (dict): Converse 형식 메시지 {"role": ..., "content": [...]}
+
+        Returns:
+            Conversation: 메시지가 추가된 대화 객체
+        """
+        if self._length == len(self._messages):
+            messages = self._messages
+        else:
+            messages = self._messages[:self._length]
+        messages.append(message)
+        return Conversation(messages, self._length + 1)
+
+    def add_user_text(self, text):
+        """사용자 텍스트 메시지를 추가한 새 대화 객체를 반환합니다"""
+        return self.append({"role": "user", "content": [{"text": text}]})
+
+    def tail(self, count):
+        """
+        최근 count개 메시지만 남긴 새 대화 객체를 반환합니다.
+
+        Converse API는 사용자 메시지로 시작해야 하므로 앞쪽의 어시스턴트 메시지는 제외합니다.
+        """
+        messages = self.messages[-count:] if count > 0 else []
+        start = 0
+        while start < len(messages) and messages[start]["role"] != "user":
+            start += 1
+        return Conversation(list(messages[start:]))
+
+    def text_history(self):
+        """화면 표시용 {"role", "content": str} 목록을 반환합니다 (텍스트 블록만 결합)"""
+        return [
+            {"role": msg["role"], "content": message_text(msg)}
+            for msg in self.messages
+        ]
+
+    def to_json(self):
+        """대화를 압축된 JSON 문자열로 직렬화합니다"""
+        return dumps(self.messages, default=str)
+
+    @classmethod
+    def from_json(cls, data):
+        """to_json()으로 직렬화한 대화를 복원합니다"""
+        return cls(loads(data))
+
+
+def message_text(message):
+    """Converse 형식 메시지에서 텍스트 블록만 이어 붙여 반환합니다"""
+    return "".join(block.get("text", "") for block in message.get("content", []) if isinstance(block, dict))
@@ -2,83 +2,202 @@
 
 """Amazon Bedrock Converse API를 활용하기 위한 기능을 제공하는 모듈"""
 import logging
-from lib.bedrock_client import get_bedrock_client
+import time
+from lib.bedrock_client import region_router
 from lib.config import config
+from lib.conversation import Conversation, message_text
+from lib.hedging import hedged_call
+from lib.metrics import STREAM_SECONDS
+from lib.token_estimator import estimate_request_tokens, preflight
+from lib.prompt_cache import (
+    supports_prompt_caching, supports_system_prompt, cache_min_tokens, add_system_cache_point,
+    add_history_cache_point, merge_system_into_messages, normalize_usage, log_usage
+)
 
 logger = logging.getLogger(__name__)
 
-def converse(prompt, conversation_history=None, model_id=None, temperature=0.7, max_tokens=1024):
+def build_converse_request(prompt, conversation, model_id, temperature=0.7, max_tokens=1024,
+                           system=None, compactor=None, cache_prefix=True):
+    """
+    Converse/ConverseStream API 요청 파라미터를 구성합니다.
+    
+    현재 사용자 메시지 추가, 대화 기록 압축, 시스템 프롬프트 병합, 요청 크기 사전 점검,
+    캐시 체크포인트 적용을 차례로 수행합니다.
+    
+    Returns:
+        tuple: (사용자 메시지가 추가된 Conversation, 요청 파라미터 딕셔너리)
+    
+    Raises:
+        RequestTooLargeError: 요청이 모델 컨텍스트 한도를 넘는 경우
+    """
+    # 현재 사용자 메시지 추가 (이전 기록은 공유, 복사하지 않음)
+    request_conversation = conversation.add_user_text(prompt)
+    request_messages = request_conversation.messages
+    system = list(system or [])
+    
+    # 토큰 예산을 넘는 오래된 턴은 요약으로 대체
+    if compactor is not None:
+        request_messages, summary_system = compactor.prepare(request_conversation, model_id)
+        system.extend(summary_system or [])
+    
+    # 시스템 프롬프트를 지원하지 않는 모델은 첫 메시지에 병합
+    if system and not supports_system_prompt(model_id):
+        request_messages = merge_system_into_messages(system, request_messages)
+        system = []
+    
+    # 전송 전 요청 크기 점검 및 max_tokens 조정
+    max_tokens = preflight(
+        model_id, estimate_request_tokens(request_messages, system, model_id), max_tokens,
+        label="Converse 요청", operation="converse"
+    )
+    
+    # 반복되는 접두부(시스템 프롬프트, 이전 대화)에 캐시 체크포인트 적용
+    # (최소 토큰 수에 못 미치는 접두부는 캐시되지 않으므로 체크포인트를 넣지 않음)
+    if cache_prefix and supports_prompt_caching(model_id):
+        min_tokens = cache_min_tokens(model_id)
+        system_tokens = estimate_request_tokens([], system, model_id)
+        if system_tokens >= min_tokens:
+            system = add_system_cache_point(system)
+        if system_tokens + estimate_request_tokens(request_messages[:-1], None, model_id) >= min_tokens:
+            request_messages = add_history_cache_point(request_messages)
+    
+    request_params = {
+        "modelId": model_id,
+        "messages": request_messages,
+        "inferenceConfig": {
+            "temperature": temperature,
+            "maxTokens": max_tokens,
+        }
+    }
+    if system:
+        request_params["system"] = system
+    
+    return request_conversation, request_params
+
+
+def converse(prompt, conversation_history=None, model_id=None, temperature=0.7, max_tokens=1024,
+             system=None, compactor=None, cache_prefix=True):
     """
     Amazon Bedrock Converse API를 호출하여 대화형 응답을 생성합니다.
     
+    대화 기록은 Converse 네이티브 메시지 형식의 Conversation 객체로 유지되며,
+    매 턴 전체 기록을 다시 만들지 않고 새 메시지만 추가합니다.
+    
     Args:
         prompt (str): 사용자 입력 프롬프트
-        conversation_history (list, optional): 이전 대화 기록
+        conversation_history (Conversation or list, optional): 이전 대화 기록
         model_id (str, optional): 사용할 모델 ID
         temperature (float): 응답의 무작위성 조절 (0~1)
         max_tokens (int): 생성할 최대 토큰 수
+        system (list, optional): 시스템 프롬프트 블록 목록
+        compactor (HistoryCompactor, optional): 토큰 예산에 맞춰 대화 기록을 압축할 세션별 압축기
+        cache_prefix (bool): 지원 모델에서 시스템 프롬프트와 이전 대화에 캐시 체크포인트 적용 여부
         
     Returns:
-        dict: 생성된 응답과 업데이트된 대화 기록을 포함하는 딕셔너리
+        dict: 생성된 응답, 업데이트된 대화 기록(Conversation), 토큰/캐시 사용량,
+            응답한 모델 ID(model_id, 헤지 보조 모델이면 hedged_model=True)를 포함하는 딕셔너리
     """
     model_id = model_id or config.model_id
-    conversation_history = conversation_history or []
+    conversation = Conversation.from_history(conversation_history)
     
     logger.info(f"🗣️ Converse API 호출 시작: 모델={model_id}, 온도={temperature}")
     
     try:
-        client = get_bedrock_client()
-        
-        # 대화 기록을 Converse API 형식으로 변환
-        messages = []
-        
-        # 이전 대화 기록 추가
-        for msg in conversation_history:
-            messages.append({
-                "role": msg["role"],
-                "content": [{"text": msg["content"]}]
-            })
-        
-        # 현재 사용자 메시지 추가
-        messages.append({
-            "role": "user",
-            "content": [{"text": prompt}]
-        })
+        request_conversation, request_params = build_converse_request(
+            prompt, conversation, model_id, temperature, max_tokens, system, compactor, cache_prefix
+        )
         
-        # Converse API 호출
-        response = client.converse(
-            modelId=model_id,
-            messages=messages,
-            inferenceConfig={
-                "temperature": temperature,
-                "maxTokens": max_tokens,
-            }
+        # Converse API 호출 (상태가 좋은 리전으로 호출, 지연 시 보조 모델 또는 다음 리전으로 헤지)
+        # 응답한 모델 ID를 함께 반환하여 보조 모델이 응답한 경우 화면에 표시
+        # 보조 모델 요청은 헤지할 때만 해당 모델 기준으로 다시 구성 (시스템 프롬프트 병합, 사전 점검, 캐시 체크포인트)
+        hedge_model_id = config.hedge_model_id
+        if hedge_model_id and hedge_model_id != model_id:
+            def secondary():
+                _, hedge_params = build_converse_request(
+                    prompt, conversation, hedge_model_id, temperature, max_tokens, system, compactor, cache_prefix
+                )
+                return hedge_model_id, region_router.invoke(
+                    "converse", lambda client: client.converse(**hedge_params)
+                )
+        else:
+            secondary = lambda: (model_id, region_router.invoke(
+                "converse", lambda client: client.converse(**request_params), prefer_secondary=True
+            ))
+        answered_model_id, response = hedged_call(
+            "converse",
+            lambda: (model_id, region_router.invoke("converse", lambda client: client.converse(**request_params))),
+            secondary=secondary
         )
+        if answered_model_id != model_id:
+            logger.info(f"🔀 헤지 요청의 보조 모델이 응답: {answered_model_id}")
         
         logger.info("✅ Converse API 응답 수신 성공")
+        usage = normalize_usage(response.get("usage"))
+        log_usage("Converse", usage)
         
-        # 응답 파싱
-        response_content = response.get("output", {}).get("message", {}).get("content", [])
-        assistant_message = ""
-        
-        # 응답 텍스트 추출
-        for content_item in response_content:
-            if content_item.get("type") == "text":
-                assistant_message += content_item.get("text", "")
+        # 응답 메시지는 도구 사용 등 모든 콘텐츠 블록을 포함한 원본 형식 그대로 보관
+        response_message = response.get("output", {}).get("message", {})
+        assistant_message = message_text(response_message)
         
         # 대화 기록 업데이트
-        updated_history = conversation_history.copy()
-        updated_history.append({"role": "user", "content": prompt})
-        updated_history.append({"role": "assistant", "content": assistant_message})
+        updated_history = request_conversation.append({
+            "role": response_message.get("role", "assistant"),
+            "content": response_message.get("content") or [{"text": assistant_message}]
+        })
         
         logger.info(f"💬 응답 생성 완료: {len(assistant_message)} 글자")
         
         return {
             "response_type": "converse",
             "output": assistant_message,
-            "conversation_history": updated_history
+            "conversation_history": updated_history,
+            "usage": usage,
+            "stop_reason": response.get("stopReason"),
+            "model_id": answered_model_id,
+            "hedged_model": answered_model_id != model_id
+        }
+    
+    except Exception as e:
+        error_msg = f"Converse API 오류: {str(e)}"
+        logger.error(f"❌ {error_msg}")
+        
+        return {
+            "response_type": "error",
+            "output": error_msg,
+            "conversation_history": conversation
         }
+
+
+def converse_stream(prompt, conversation_history=None, model_id=None, temperature=0.7, max_tokens=1024,
+                    system=None, compactor=None, cache_prefix=True, response_type="converse"):
+    """
+    Amazon Bedrock ConverseStream API로 응답을 스트리밍합니다.
+    
+    요청은 converse()와 같은 방식으로 구성하며, 반환된 딕셔너리의 "stream" 제너레이터가
+    텍스트 조각을 생성합니다. 스트림을 끝까지 소비하면 같은 딕셔너리에 "output",
+    "conversation_history", "usage", "stop_reason"이 채워집니다.
+    스트리밍 호출은 중간에 재시도할 수 없으므로 헤지하지 않고, 스트림 시작 전 오류만 리전을 전환합니다.
+    
+    Args:
+        prompt, conversation_history, model_id, temperature, max_tokens, system, compactor, cache_prefix:
+            converse()와 동일
+        response_type (str): 결과 딕셔너리의 응답 유형
+        
+    Returns:
+        dict: "stream" 제너레이터를 포함한 응답 딕셔너리 (요청 구성 오류 시 오류 응답)
+    """
+    model_id = model_id or config.model_id
+    conversation = Conversation.from_history(conversation_history)
+    
+    logger.info(f"🗣️ ConverseStream API 호출 시작: 모델={model_id}, 온도={temperature}")
     
+    try:
+        request_conversation, request_params = build_converse_request(
+            prompt, conversation, model_id, temperature, max_tokens, system, compactor, cache_prefix
+        )
+        response = region_router.invoke(
+            "converse_stream", lambda client: client.converse_stream(**request_params)
+        )
     except Exception as e:
         error_msg = f"Converse API 오류: {str(e)}"
         logger.error(f"❌ {error_msg}")
@@ -86,5 +205,44 @@ def converse(prompt, conversation_history=None, model_id=None, temperature=0.7,
         return {
             "response_type": "error",
             "output": error_msg,
-            "conversation_history": conversation_history
-        }
\ No newline at end of file
+            "conversation_history": conversation
+        }
+    
+    result = {
+        "response_type": response_type,
+        "output": "",
+        "conversation_history": conversation
+    }
+    
+    def stream():
+        chunks = []
+        start = time.perf_counter()
+        try:
+            for event in response.get("stream", []):
+                if "contentBlockDelta" in event:
+                    text = event["contentBlockDelta"].get("delta", {}).get("text")
+                    if text:
+                        chunks.append(text)
+                        yield text
+                elif "messageStop" in event:
+                    result["stop_reason"] = event["messageStop"].get("stopReason")
+                elif "metadata" in event:
+                    result["usage"] = normalize_usage(event["metadata"].get("usage"))
+                    log_usage("ConverseStream", result["usage"])
+        except Exception as e:
+            error_msg = f"Converse 스트림 오류: {str(e)}"
+            logger.error(f"❌ {error_msg}")
+            result["response_type"] = "error"
+            result["output"] = "".join(chunks) + f"\n\n⚠️ {error_msg}"
+            return
+        
+        STREAM_SECONDS.observe(time.perf_counter() - start, operation="converse_stream")
+        assistant_message = "".join(chunks)
+        result["output"] = assistant_message
+        result["conversation_history"] = request_conversation.append({
+            "role": "assistant", "content": [{"text": assistant_message}]
+        })
+        logger.info(f"💬 스트리밍 응답 완료: {len(assistant_message)} 글자")
+    
+    result["stream"] = stream()
+    return result
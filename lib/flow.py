@@ -1,11 +1,16 @@
 # Path: /bedrock_chatbot_app/lib/flow.py
 
 """Amazon Bedrock Flow를 호출하기 위한 기능을 제공하는 모듈"""
-import json
 import logging
 import re
-from lib.bedrock_client import get_bedrock_agent_client, get_bedrock_client
+import time
+from lib.bedrock_client import get_bedrock_agent_client, region_router
 from lib.config import config
+from lib.prompt_cache import build_anthropic_system, normalize_usage, log_usage
+from lib.token_estimator import estimate_tokens, preflight
+from lib.json_codec import JSONDecodeError, dumpb, dumps, loads
+from lib.logging_config import lazy
+from lib.metrics import PARSE_SECONDS, STREAM_SECONDS, track_call
 
 logger = logging.getLogger(__name__)
 
@@ -47,7 +52,7 @@ def invoke_flow(input_text, flow_id=None, flow_alias_id=None, enable_trace=True)
             if input_text.strip().startswith('{') and input_text.strip().endswith('}'):
                 try:
                     # JSON 문자열 파싱
-                    parsed_json = json.loads(input_text)
+                    parsed_json = loads(input_text)
                     input_data = {
                         "income": parsed_json.get("income", 80000),
                         "totalDebt": parsed_json.get("totalDebt", 5000),
@@ -57,7 +62,7 @@ def invoke_flow(input_text, flow_id=None, flow_alias_id=None, enable_trace=True)
                         "mlsId": parsed_json.get("mlsId", "MLS-1234")
                     }
                     logger.info("✅ JSON 문자열 파싱 성공")
-                except json.JSONDecodeError:
+                except JSONDecodeError:
                     # 자연어로 처리 - LLM 프롬프트 템플릿 사용
                     logger.info("⚠️ JSON 형식이지만 파싱 실패, 자연어로 처리")
                     input_data = process_natural_language_with_llm(input_text)
@@ -94,10 +99,11 @@ def invoke_flow(input_text, flow_id=None, flow_alias_id=None, enable_trace=True)
         if flow_alias_id:
             params["flowAliasIdentifier"] = flow_alias_id
         
-        logger.info(f"🚀 Flow 호출 시작: {json.dumps(input_data)}")
+        logger.info("🚀 Flow 호출 시작: %s", lazy(dumps, input_data))
         
         # Flow 호출
-        response = client.invoke_flow(**params)
+        with track_call("invoke_flow"):
+            response = client.invoke_flow(**params)
         logger.info("✅ Flow 호출 성공")
         
         # 응답 처리 (이전과 동일)
@@ -106,6 +112,7 @@ def invoke_flow(input_text, flow_id=None, flow_alias_id=None, enable_trace=True)
         trace_info = {"flow_execution_id": response.get("executionId")}
         
         # 스트림 응답 처리
+        stream_start = time.perf_counter()
         if "responseStream" in response:
             for event in response.get("responseStream"):
                 result.update(event)
@@ -117,13 +124,15 @@ def invoke_flow(input_text, flow_id=None, flow_alias_id=None, enable_trace=True)
                         if isinstance(doc, str):
                             outputs.append(doc)
                         else:
-                            outputs.append(json.dumps(doc, ensure_ascii=False, indent=2))
+                            outputs.append(dumps(doc, pretty=True))
                 
                 elif "flowTraceEvent" in event:
                     if "trace_events" not in trace_info:
                         trace_info["trace_events"] = []
                     trace_info["trace_events"].append(event["flowTraceEvent"])
         
+        STREAM_SECONDS.observe(time.perf_counter() - stream_start, operation="invoke_flow")
+        
         # 성공 여부 확인
         success = False
         reason = "UNKNOWN"
@@ -160,38 +169,50 @@ def process_natural_language_with_llm(text):
     LLM 프롬프트 템플릿을 사용하여 자연어에서 구조화된 데이터 추출
     """
     try:
-        # 프롬프트 템플릿 생성
+        # 프롬프트 템플릿 생성 (고정 지시문은 시스템 프롬프트로 분리)
+        # 지시문 캐싱은 config.model_id가 prompt_caching 지원 모델(예: us.anthropic.claude-3-7-sonnet-20250219-v1:0)이고
+        # 지시문이 해당 모델의 cache_min_tokens 이상일 때만 적용됩니다 (현재 지시문은 약 300~400토큰이라 캐시되지 않음)
         prompt = create_extraction_prompt(text)
         
-        # LLM 호출 (Claude 사용)
-        client = get_bedrock_client()
-        response = client.invoke_model(
-            modelId=config.model_id,
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 1000,
-                "messages": [{"role": "user", "content": prompt}]
-            })
+        # 전송 전 요청 크기 점검 및 max_tokens 결정
+        max_tokens = preflight(
+            config.model_id,
+            estimate_tokens(EXTRACTION_INSTRUCTIONS, config.model_id) + estimate_tokens(prompt, config.model_id),
+            1000, label="데이터 추출 요청", operation="extraction"
         )
         
-        # 응답 파싱
-        response_body = json.loads(response['body'].read().decode('utf-8'))
+        # LLM 호출 (Claude 사용)
+        request_body = dumpb({
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": max_tokens,
+            "system": build_anthropic_system(EXTRACTION_INSTRUCTIONS, config.model_id),
+            "messages": [{"role": "user", "content": prompt}]
+        })
+        
+        def call_model(client):
+            response = client.invoke_model(modelId=config.model_id, body=request_body)
+            with PARSE_SECONDS.time(operation="extraction"):
+                return loads(response['body'].read())
+        
+        # 응답 파싱 (상태가 좋은 리전으로 호출)
+        response_body = region_router.invoke("extraction", call_model)
         extracted_json_text = response_body['content'][0]['text']
+        log_usage("데이터 추출", normalize_usage(response_body.get("usage")))
         
-        logger.info(f"LLM 응답: {extracted_json_text[:100]}...")
+        logger.debug("LLM 응답: %.100s...", extracted_json_text)
         
         # JSON 파싱 시도
         try:
-            extracted_data = json.loads(extracted_json_text)
+            extracted_data = loads(extracted_json_text)
             logger.info("✅ LLM 응답 JSON 파싱 성공")
-        except json.JSONDecodeError:
+        except JSONDecodeError:
             # JSON 부분만 추출 시도
             logger.warning("⚠️ LLM 응답 직접 파싱 실패, 정규식으로 추출 시도")
             json_pattern = r'\{[\s\S]*\}'
             match = re.search(json_pattern, extracted_json_text)
             if match:
                 try:
-                    extracted_data = json.loads(match.group(0))
+                    extracted_data = loads(match.group(0))
                     logger.info("✅ 정규식으로 JSON 추출 성공")
                 except:
                     logger.error("❌ 정규식으로 추출한 JSON 파싱 실패")
@@ -206,7 +227,7 @@ def process_natural_language_with_llm(text):
             if key in result and value is not None and value != "":
                 result[key] = value
         
-        logger.info(f"✅ 자연어 처리 완료: {json.dumps(result)}")
+        logger.info("✅ 자연어 처리 완료: %s", lazy(dumps, result))
         return result
         
     except Exception as e:
@@ -214,16 +235,9 @@ def process_natural_language_with_llm(text):
         return create_default_structure()
 
 
-def create_extraction_prompt(text):
-    """
-    자연어에서 구조화된 데이터를 추출하기 위한 프롬프트 템플릿 생성
-    """
-    # 중괄호를 이스케이프하여 f-string 오류 방지
-    prompt = f"""
-    아래 텍스트에서 대출 관련 정보를 추출하여 JSON 형식으로 변환해주세요.
-    
-    ### 입력 텍스트:
-    {text}
+# 데이터 추출용 고정 지시문 (모든 요청에서 동일하므로 시스템 프롬프트로 전달하여 캐시)
+EXTRACTION_INSTRUCTIONS = """
+    사용자가 입력한 텍스트에서 대출 관련 정보를 추출하여 JSON 형식으로 변환해주세요.
     
     ### 요구사항:
     1. 다음 필드를 정확히 추출해주세요: income(연간 소득), totalDebt(총 부채), loanTerm(대출 기간), loanAmount(대출 금액), creditScore(신용점수), mlsId(MLS 번호)
@@ -236,14 +250,26 @@ def create_extraction_prompt(text):
     ### 출력 형식:
     다음과 같은 형태의 JSON만 출력하세요.
     
-    {{
+    {
       "income": 123456,
       "totalDebt": 1000,
       "loanTerm": 30,
       "loanAmount": 500000,
       "creditScore": 750,
       "mlsId": "MLS-1234"
-    }}
+    }
+    """
+
+
+def create_extraction_prompt(text):
+    """
+    자연어에서 구조화된 데이터를 추출하기 위한 사용자 프롬프트 생성
+    
+    고정 지시문은 EXTRACTION_INSTRUCTIONS(시스템 프롬프트)에 있으며, 여기서는 입력 텍스트만 구성합니다.
+    """
+    prompt = f"""
+    ### 입력 텍스트:
+    {text}
     
     ### 출력:
     """
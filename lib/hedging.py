@@ -0,0 +1,155 @@
+# Path: /bedrock_chatbot_app/lib/hedging.py
+
+"""멱등(부작용 없는) 비스트리밍 호출의 꼬리 지연을 줄이기 위한 헤지 요청 모듈"""
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from lib.config import config
+
+logger = logging.getLogger(__name__)
+
+# 지연 시간 관측 설정
+LATENCY_WINDOW = 200        # 작업별로 유지할 최근 지연 시간 수
+MIN_SAMPLES = 20            # 이보다 관측이 적으면 헤지하지 않음
+
+
+class LatencyTracker:
+    """작업별 최근 지연 시간을 보관하고 백분위수를 계산하는 클래스"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self._samples = {}   # operation -> deque
+        self._lock = threading.Lock()
+
+    def record(self, operation, latency):
+        with self._lock:
+            samples = self._samples.get(operation)
+            if samples is None:
+                samples = self._samples[operation] = deque(maxlen=self.window)
+            samples.append(latency)
+
+    def percentile(self, operation, pct):
+        """
+        작업의 지연 시간 백분위수를 반환합니다.
+
+        Returns:
+            float or None: 지연 시간(초), 관측이 부족하면 None
+        """
+        with self._lock:
+            samples = self._samples.get(operation)
+            if not samples or len(samples) < MIN_SAMPLES:
+                return None
+            ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(len(ordered) * pct))
+        return ordered[index]
+
+
+class HedgeBudget:
+    """
+    헤지로 인한 추가 부하를 전체 요청 대비 일정 비율 이하로 제한하는 토큰 버킷
+
+    요청마다 ratio만큼 토큰이 쌓이고 헤지 요청 하나가 토큰 1개를 사용합니다.
+    """
+
+    def __init__(self, ratio, burst=5.0):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+
+    def on_request(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_acquire(self):
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+latency_tracker = LatencyTracker()
+hedge_budget = HedgeBudget(config.hedge_budget_ratio)
+
+
+def _start_call(operation, call):
+    """
+    호출을 전용 스레드에서 즉시 시작하고 Future를 반환합니다.
+
+    공유 스레드 풀의 대기 시간이 지연 시간이나 헤지 기준에 섞이지 않도록 호출마다 스레드를 만들며,
+    성공한 호출은 헤지 여부와 관계없이 완료 시점에 각자의 지연 시간을 기록합니다.
+    """
+    future = Future()
+    context = contextvars.copy_context()
+
+    def run():
+        start = time.perf_counter()
+        try:
+            result = context.run(call)
+        except BaseException as e:
+            future.set_exception(e)
+            return
+        latency_tracker.record(operation, time.perf_counter() - start)
+        future.set_result(result)
+
+    threading.Thread(target=run, name=f"hedge-{operation}", daemon=True).start()
+    return future
+
+
+def hedged_call(operation, primary, secondary=None, enabled=None):
+    """
+    호출을 실행하고, 관측된 지연 시간 백분위수를 넘도록 응답이 없으면 중복 요청을 보냅니다.
+
+    먼저 성공한 응답을 반환하며 나머지 요청은 끝까지 실행된 뒤 결과를 버립니다
+    (이미 전송된 HTTP 요청은 중단할 수 없음). 헤지하지 않는 경우에는 호출자 스레드에서 바로 실행합니다.
+    스트리밍 호출이나 부작용이 있는 호출에는 사용하지 마세요.
+
+    Args:
+        operation (str): 지연 시간 통계를 구분할 작업 이름
+        primary (callable): 인자 없는 기본 호출
+        secondary (callable, optional): 헤지 시 사용할 호출 (예: 보조 모델/리전, 없으면 primary 재호출)
+        enabled (bool, optional): 헤지 사용 여부 (없으면 config.hedge_enabled)
+
+    Returns:
+        호출 결과
+    """
+    enabled = config.hedge_enabled if enabled is None else enabled
+    delay = None
+    if enabled:
+        hedge_budget.on_request()
+        delay = latency_tracker.percentile(operation, config.hedge_percentile)
+
+    # 헤지 기준이 없으면 호출자 스레드에서 실행
+    if delay is None:
+        start = time.perf_counter()
+        result = primary()
+        latency_tracker.record(operation, time.perf_counter() - start)
+        return result
+
+    # 기본 요청은 즉시 시작하고, 시작 시점부터 기준 지연 시간까지 기다림
+    primary_future = _start_call(operation, primary)
+    done, _ = wait([primary_future], timeout=delay)
+    if done or not hedge_budget.try_acquire():
+        return primary_future.result()
+
+    logger.info(f"🪝 헤지 요청 전송: {operation} (지연 {delay:.2f}s 초과)")
+    hedge_future = _start_call(operation, secondary or primary)
+    pending = {primary_future, hedge_future}
+    last_error = None
+
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                last_error = future.exception()
+                continue
+
+            winner = "헤지" if future is hedge_future else "기본"
+            logger.info(f"🏁 {operation} {winner} 요청 응답 사용")
+            return future.result()
+
+    raise last_error
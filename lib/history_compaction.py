@@ -0,0 +1,169 @@
+# Path: /bedrock_chatbot_app/lib/history_compaction.py
+
+"""토큰 예산에 맞춰 Converse 대화 기록을 압축하는 모듈"""
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from lib.bedrock_client import region_router
+from lib.config import MODEL_OPTIONS, SUMMARY_MODEL_ID
+from lib.conversation import message_text
+from lib.token_estimator import estimate_message_tokens, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_TOKEN_BUDGET = 8000
+SUMMARY_MAX_TOKENS = 512
+
+# 요약은 요청 경로 밖에서 실행
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="history-summary")
+
+
+def get_history_token_budget(model_id):
+    """모델별 대화 기록 토큰 예산을 반환합니다"""
+    return MODEL_OPTIONS.get(model_id, {}).get("history_token_budget", DEFAULT_HISTORY_TOKEN_BUDGET)
+
+
+def summarize_messages(previous_summary, messages, model_id=SUMMARY_MODEL_ID):
+    """
+    이전 요약과 새로 밀려난 메시지를 합쳐 하나의 요약으로 만듭니다.
+
+    Args:
+        previous_summary (str): 기존 요약 (없으면 빈 문자열)
+        messages (list): 요약할 Converse 형식 메시지 목록
+        model_id (str): 요약에 사용할 모델 ID
+
+    Returns:
+        str: 갱신된 요약
+    """
+    transcript = "\n".join(f"{msg['role']}: {message_text(msg)}" for msg in messages)
+    prompt = (
+        "다음은 사용자와 어시스턴트의 이전 대화입니다. 이후 대화를 이어가는 데 필요한 사실, "
+        "수치, 사용자의 요구사항과 결정 사항을 빠짐없이 간결하게 요약해주세요.\n\n"
+        f"### 기존 요약:\n{previous_summary or '(없음)'}\n\n"
+        f"### 추가 대화:\n{transcript}\n\n### 요약:"
+    )
+
+    response = region_router.invoke("summary", lambda client: client.converse(
+        modelId=model_id,
+        messages=[{"role": "user", "content": [{"text": prompt}]}],
+        inferenceConfig={"temperature": 0.0, "maxTokens": SUMMARY_MAX_TOKENS}
+    ))
+    return message_text(response.get("output", {}).get("message", {})).strip()
+
+
+class HistoryCompactor:
+    """
+    세션별 Converse 대화 기록 압축기
+
+    최근 턴은 토큰 예산 안에서 원문 그대로 보내고(슬라이딩 윈도우), 윈도우 밖으로 밀려난
+    오래된 턴은 저비용 모델이 백그라운드에서 누적 요약합니다. 요약은 시스템 프롬프트로 전달되며,
+    요약이 끝나기 전 턴에서는 직전 요약과 함께 밀려난 턴도 원문으로 보내므로(일시적으로 예산 초과)
+    요청 지연 시간에 영향을 주지 않으면서 대화 내용이 빠지지 않습니다.
+
+    Attributes:
+        summary (str): 윈도우 밖 대화의 누적 요약
+        summarized_count (int): 요약에 반영된 앞쪽 메시지 수
+    """
+
+    def __init__(self, summary_model_id=SUMMARY_MODEL_ID):
+        self.summary_model_id = summary_model_id
+        self.summary = ""
+        self.summarized_count = 0
+        self._boundary = None   # 요약되지 않은 첫 메시지 (대화 앞부분이 잘려도 위치를 다시 찾기 위함)
+        self._pending = None    # (future, 요약 후 summarized_count, 요약 후 경계 메시지)
+        self._lock = threading.Lock()
+
+    def prepare(self, conversation, model_id):
+        """
+        요청에 보낼 메시지 목록과 시스템 프롬프트를 계산합니다.
+
+        Args:
+            conversation (Conversation): 현재 사용자 메시지까지 포함한 전체 대화
+            model_id (str): 호출할 모델 ID
+
+        Returns:
+            tuple: (메시지 목록, 시스템 프롬프트 블록 목록 또는 None)
+        """
+        messages = conversation.messages
+        self._collect_summary()
+        start = self._locate_boundary(messages)
+
+        budget = get_history_token_budget(model_id)
+        budget -= estimate_tokens(self.summary, model_id)
+
+        # 최근 메시지부터 예산이 허용하는 만큼 윈도우에 포함 (최소한 마지막 메시지는 포함)
+        window_start = len(messages) - 1
+        used = estimate_message_tokens(messages[-1], model_id)
+        while window_start > start:
+            cost = estimate_message_tokens(messages[window_start - 1], model_id)
+            if used + cost > budget:
+                break
+            used += cost
+            window_start -= 1
+
+        # Converse API는 사용자 메시지로 시작해야 함
+        while window_start < len(messages) - 1 and messages[window_start]["role"] != "user":
+            window_start += 1
+
+        # 윈도우 밖으로 밀려났지만 아직 요약되지 않은 메시지는 백그라운드에서 요약하고,
+        # 요약이 반영될 때까지는 원문 그대로 보내 어느 쪽에도 없는 턴이 생기지 않도록 함
+        if window_start > start:
+            self._schedule_summary(messages[start:window_start], window_start, messages[window_start])
+            logger.debug(f"요약 대기 중인 {window_start - start}개 메시지는 원문으로 전송")
+            window_start = start
+
+        window = messages[window_start:] if window_start else messages
+        system = None
+        if self.summary:
+            system = [{"text": f"다음은 이전 대화의 요약입니다. 이 내용을 바탕으로 대화를 이어가세요.\n\n{self.summary}"}]
+
+        logger.debug(f"대화 기록 윈도우: {len(window)}/{len(messages)}개 메시지, 약 {used} 토큰")
+        return window, system
+
+    def _locate_boundary(self, messages):
+        """요약되지 않은 첫 메시지의 현재 위치를 반환합니다"""
+        with self._lock:
+            if self._boundary is None:
+                return 0
+            if self.summarized_count < len(messages) and messages[self.summarized_count] is self._boundary:
+                return self.summarized_count
+            for idx, msg in enumerate(messages):
+                if msg is self._boundary:
+                    self.summarized_count = idx
+                    return idx
+
+            # 대화가 잘려 경계를 찾을 수 없으면 요약을 초기화
+            self.summary, self.summarized_count, self._boundary = "", 0, None
+            return 0
+
+    def _schedule_summary(self, messages, new_count, boundary):
+        """요약 작업이 진행 중이 아니면 백그라운드 요약을 시작합니다"""
+        with self._lock:
+            if self._pending is not None:
+                return
+            future = _summary_executor.submit(
+                contextvars.copy_context().run, summarize_messages, self.summary, list(messages), self.summary_model_id
+            )
+            self._pending = (future, new_count, boundary)
+        logger.info(f"🗜️ 대화 기록 압축: {len(messages)}개 메시지 백그라운드 요약 시작")
+
+    def _collect_summary(self):
+        """완료된 백그라운드 요약 결과를 반영합니다"""
+        with self._lock:
+            if self._pending is None or not self._pending[0].done():
+                return
+            future, new_count, boundary = self._pending
+            self._pending = None
+
+        try:
+            summary = future.result()
+        except Exception as e:
+            logger.warning(f"⚠️ 대화 요약 실패, 다음 턴에 재시도: {str(e)}")
+            return
+
+        with self._lock:
+            self.summary = summary
+            self.summarized_count = new_count
+            self._boundary = boundary
+        logger.info(f"✅ 대화 요약 갱신: {len(summary)} 글자")
@@ -1,20 +1,24 @@
 # Path: /bedrock_chatbot_app/lib/invoke_model.py
 
 """Amazon Bedrock 파운데이션 모델을 호출하기 위한 기능을 제공하는 모듈"""
-import json
 import logging
-from lib.bedrock_client import get_bedrock_client
+from lib.bedrock_client import region_router
 from lib.config import config
+from lib.hedging import hedged_call
+from lib.token_estimator import estimate_tokens, preflight
+from lib.json_codec import dumpb, loads
+from lib.metrics import PARSE_SECONDS
 
 logger = logging.getLogger(__name__)
 
-def invoke_model(prompt, model_id=None):
+def invoke_model(prompt, model_id=None, max_tokens=None):
     """
     Amazon Bedrock 파운데이션 모델을 호출하여 텍스트 응답을 생성합니다.
     
     Args:
         prompt (str): 모델에게 전달할 프롬프트 텍스트
         model_id (str, optional): 사용할 모델 ID
+        max_tokens (int, optional): 최대 출력 토큰 수 (없으면 기본값을 남은 컨텍스트에 맞춰 사용)
         
     Returns:
         str: 모델이 생성한 텍스트 응답
@@ -22,23 +26,27 @@ def invoke_model(prompt, model_id=None):
     model_id = model_id or config.model_id
     
     logger.info(f"🤖 파운데이션 모델 호출: {model_id}")
-    logger.debug(f"프롬프트: {prompt[:50]}{'...' if len(prompt) > 50 else ''}")
+    logger.debug("프롬프트: %.50s", prompt)
     
     try:
-        client = get_bedrock_client()
+        # 전송 전 요청 크기 점검 및 max_tokens 결정
+        max_tokens = preflight(
+            model_id, estimate_tokens(prompt, model_id), max_tokens,
+            label="파운데이션 모델 요청", operation="invoke_model"
+        )
         
         # 모델별 요청 형식 설정
         if "anthropic.claude" in model_id:
             body = {
                 "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 1024,
+                "max_tokens": max_tokens,
                 "messages": [{"role": "user", "content": prompt}]
             }
         elif "amazon.titan" in model_id:
             body = {
                 "inputText": prompt,
                 "textGenerationConfig": {
-                    "maxTokenCount": 1024,
+                    "maxTokenCount": max_tokens,
                     "temperature": 0.7,
                     "topP": 0.9
                 }
@@ -46,14 +54,20 @@ def invoke_model(prompt, model_id=None):
         else:
             raise ValueError(f"지원되지 않는 모델: {model_id}")
         
-        # 모델 호출
-        response = client.invoke_model(
-            modelId=model_id,
-            body=json.dumps(body)
-        )
+        # 모델 호출 및 응답 본문 읽기 (지연 시 헤지 가능)
+        request_body = dumpb(body)
         
-        # 응답 파싱
-        response_body = json.loads(response['body'].read().decode('utf-8'))
+        def call_model(client):
+            response = client.invoke_model(modelId=model_id, body=request_body)
+            with PARSE_SECONDS.time(operation="invoke_model"):
+                return loads(response['body'].read())
+        
+        # 응답 파싱 (상태가 좋은 리전으로 호출, 헤지 요청은 다음 리전으로 전송)
+        response_body = hedged_call(
+            "invoke_model",
+            lambda: region_router.invoke("invoke_model", call_model),
+            secondary=lambda: region_router.invoke("invoke_model", call_model, prefer_secondary=True)
+        )
         
         # 모델별 응답 텍스트 추출
         if "anthropic.claude" in model_id:
@@ -0,0 +1,95 @@
+# Path: /bedrock_chatbot_app/lib/json_codec.py
+
+"""JSON 인코딩/디코딩을 한곳에서 처리하는 코덱 모듈 (orjson이 설치되어 있으면 사용, 없으면 표준 json)"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 현재 사용 중인 JSON 백엔드 이름과 버전 (시작 시 로그에 기록)
+BACKEND = "orjson" if orjson is not None else "json"
+BACKEND_VERSION = orjson.__version__ if orjson is not None else json.__version__
+
+# 디코딩 오류 (orjson.JSONDecodeError도 json.JSONDecodeError의 하위 클래스)
+JSONDecodeError = json.JSONDecodeError
+
+# 저장/전송용 압축 출력 구분자
+COMPACT_SEPARATORS = (",", ":")
+
+
+def dumpb(obj, pretty=False, sort_keys=False, default=None):
+    """
+    객체를 UTF-8 JSON bytes로 인코딩합니다.
+
+    기본은 공백 없는 압축 출력이며, 사람이 보는 화면/파일에만 pretty=True를 사용합니다.
+    orjson이 처리하지 못하는 값(64비트를 넘는 정수, 서로게이트 문자 등)은 표준 json으로 다시 인코딩합니다.
+
+    Args:
+        obj: 인코딩할 객체
+        pretty (bool): 2칸 들여쓰기 출력 여부
+        sort_keys (bool): 키 정렬 여부 (캐시 키 등 결정적 출력이 필요한 경우)
+        default (callable, optional): 직렬화할 수 없는 객체의 변환 함수
+
+    Returns:
+        bytes: JSON bytes
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except TypeError:
+            pass
+
+    return _stdlib_dumps(obj, pretty, sort_keys, default).encode("utf-8")
+
+
+def dumps(obj, pretty=False, sort_keys=False, default=None):
+    """
+    객체를 JSON 문자열로 인코딩합니다 (옵션은 dumpb()와 동일).
+
+    Returns:
+        str: JSON 문자열
+    """
+    if orjson is None:
+        return _stdlib_dumps(obj, pretty, sort_keys, default)
+    return dumpb(obj, pretty, sort_keys, default).decode("utf-8")
+
+
+def loads(data):
+    """
+    JSON 문자열 또는 bytes/bytearray/memoryview를 디코딩합니다.
+
+    Raises:
+        JSONDecodeError: JSON 형식이 잘못된 경우
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # 표준 json만 허용하는 입력(NaN 리터럴 등)은 표준 json으로 다시 시도
+            pass
+
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    elif isinstance(data, bytearray):
+        data = bytes(data)
+    return json.loads(data)
+
+
+def load(fp):
+    """파일 객체의 내용을 JSON으로 디코딩합니다"""
+    return loads(fp.read())
+
+
+def _stdlib_dumps(obj, pretty, sort_keys, default):
+    """표준 json으로 인코딩합니다 (orjson과 같은 출력 형식)"""
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2, sort_keys=sort_keys, default=default)
+    return json.dumps(obj, ensure_ascii=False, separators=COMPACT_SEPARATORS, sort_keys=sort_keys, default=default)
+
@@ -1,116 +1,529 @@
 # Path: /bedrock_chatbot_app/lib/knowledge_base.py
 
 """Amazon Bedrock Knowledge Base를 활용하기 위한 기능을 제공하는 모듈"""
+import contextvars
+import hashlib
 import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
+from typing import Optional
+from botocore.exceptions import ClientError
 from lib.bedrock_client import get_bedrock_agent_client
 from lib.config import config
+from lib.hedging import hedged_call
+from lib.json_codec import JSONDecodeError, loads
+from lib.local_index import get_local_index
+from lib.metrics import STREAM_SECONDS, track_call
+from lib.reranking import overfetch_size, rerank_results
+from lib.retrieval_cache import retrieval_cache
 
 logger = logging.getLogger(__name__)
 
-def query_knowledge_base(query, knowledge_base_id=None, retrieve_only=False):
+# 상호 순위 융합(RRF) 상수
+RRF_K = 60
+
+_retrieve_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="kb-retrieve")
+
+# 검색 유형 (None이면 서비스 기본값 사용)
+SEARCH_TYPES = ["HYBRID", "SEMANTIC"]
+
+# 검색 백엔드 (관리형 Knowledge Base 또는 로컬 벡터 인덱스)
+BACKEND_BEDROCK = "bedrock"
+BACKEND_LOCAL = "local"
+
+# 메타데이터 필터 표현식 연산자 -> Bedrock 필터 키
+FILTER_OPERATORS = {
+    "!=": "notEquals",
+    ">=": "greaterThanOrEquals",
+    "<=": "lessThanOrEquals",
+    "=": "equals",
+    ">": "greaterThan",
+    "<": "lessThan",
+    " in ": "in",
+}
+FILTER_CLAUSE_PATTERN = re.compile(r"^\s*([\w.\-]+)\s*(!=|>=|<=|=|>|<|\s+in\s+)\s*(.+?)\s*$", re.IGNORECASE)
+
+
+@dataclass
+class RetrievalConfig:
+    """
+    Knowledge Base 검색 설정
+
+    Attributes:
+        top_k (int): 한 번에 가져올 결과 수
+        search_type (str): "HYBRID", "SEMANTIC" 또는 None (서비스 기본값)
+        filter (dict): Bedrock 메타데이터 필터 (벡터 저장소에서 먼저 걸러냄)
+        rerank (bool): 후보를 더 많이 가져와 로컬에서 재정렬/중복 제거 후 top_k개로 줄일지 여부
+            (검색 모드에만 적용, RetrieveAndGenerate는 서버에서 검색하므로 적용되지 않음)
+        backend (str): 검색 백엔드 (None이면 config.knowledge_base_backend)
+    """
+    top_k: int = 5
+    search_type: Optional[str] = None
+    filter: Optional[dict] = None
+    rerank: bool = False
+    backend: Optional[str] = None
+
+    @property
+    def is_local(self):
+        """로컬 벡터 인덱스를 사용하는지 여부"""
+        return (self.backend or config.knowledge_base_backend) == BACKEND_LOCAL
+
+    def to_api(self):
+        """Retrieve/RetrieveAndGenerate API의 retrievalConfiguration 형식으로 변환합니다"""
+        vector_config = {"numberOfResults": self.top_k}
+        if self.search_type:
+            vector_config["overrideSearchType"] = self.search_type
+        if self.filter:
+            vector_config["filter"] = self.filter
+        return {"vectorSearchConfiguration": vector_config}
+
+
+def _parse_filter_value(raw):
+    """필터 값 문자열을 숫자/불리언/문자열로 변환합니다"""
+    raw = raw.strip()
+    if len(raw) >= 2 and raw[0] == raw[-1] and raw[0] in "'\"":
+        return raw[1:-1]
+    if raw.lower() in ("true", "false"):
+        return raw.lower() == "true"
+    try:
+        return int(raw)
+    except ValueError:
+        pass
+    try:
+        return float(raw)
+    except ValueError:
+        return raw
+
+
+def parse_filter_expression(expression):
+    """
+    메타데이터 필터 표현식을 Bedrock 필터 형식으로 변환합니다.
+
+    JSON 객체(Bedrock 필터 형식 그대로) 또는 세미콜론으로 구분한 간단한 조건식을 지원하며,
+    여러 조건은 모두 만족(andAll)해야 합니다.
+    예: "category = guidelines; year >= 2023; state in CA, NY"
+
+    Args:
+        expression (str): 필터 표현식
+
+    Returns:
+        dict or None: Bedrock 필터 (표현식이 비어 있으면 None)
+
+    Raises:
+        ValueError: 표현식 형식이 잘못된 경우
+    """
+    expression = (expression or "").strip()
+    if not expression:
+        return None
+
+    if expression.startswith("{"):
+        try:
+            return loads(expression)
+        except JSONDecodeError as e:
+            raise ValueError(f"필터 JSON 형식 오류: {str(e)}")
+
+    conditions = []
+    for clause in filter(None, (part.strip() for part in expression.split(";"))):
+        match = FILTER_CLAUSE_PATTERN.match(clause)
+        if not match:
+            raise ValueError(f"필터 조건 형식 오류: '{clause}'")
+
+        key, operator, raw_value = match.groups()
+        operator = " in " if operator.strip().lower() == "in" else operator
+        if operator == " in ":
+            value = [_parse_filter_value(item) for item in raw_value.split(",") if item.strip()]
+        else:
+            value = _parse_filter_value(raw_value)
+        conditions.append({FILTER_OPERATORS[operator]: {"key": key, "value": value}})
+
+    return conditions[0] if len(conditions) == 1 else {"andAll": conditions}
+
+
+def parse_knowledge_base_ids(knowledge_base_id):
+    """
+    Knowledge Base ID 입력을 ID 목록으로 변환합니다.
+
+    Args:
+        knowledge_base_id (str or list): 단일 ID, 쉼표로 구분한 ID 문자열, 또는 ID 목록
+
+    Returns:
+        list: 중복을 제거한 ID 목록
+    """
+    if not knowledge_base_id:
+        return []
+    if isinstance(knowledge_base_id, str):
+        knowledge_base_id = knowledge_base_id.split(",")
+    return list(dict.fromkeys(kb_id.strip() for kb_id in knowledge_base_id if kb_id and kb_id.strip()))
+
+
+def parse_retrieval_result(result, knowledge_base_id=None):
+    """Retrieve API 결과 항목을 화면 표시용 딕셔너리로 변환합니다"""
+    content = result.get("content", {}).get("text", "")
+    metadata = result.get("metadata", {})
+    source = result.get("location", {}).get("s3Location", {}).get("uri", "Unknown source")
+    source_filename = source.split("/")[-1] if "/" in source else source
+    score = result.get("score", 0)
+
+    return {
+        "content": content,
+        "metadata": metadata,
+        "source": source,
+        "source_filename": source_filename,
+        "score": score,
+        "knowledge_base_id": knowledge_base_id
+    }
+
+
+def retrieve_from_knowledge_base(client, knowledge_base_id, query, retrieval_config=None, use_cache=True):
+    """
+    단일 Knowledge Base에 Retrieve API를 호출하여 첫 페이지의 파싱된 결과 목록을 반환합니다.
+    
+    같은 KB/쿼리/설정의 결과가 검색 캐시에 있으면 API를 호출하지 않습니다.
+    """
+    retrieval_config = retrieval_config or RetrievalConfig()
+    if retrieval_config.is_local:
+        # 로컬 인덱스는 밀리초 단위로 응답하므로 캐시하지 않음 (KB ID는 무시)
+        return get_local_index().search(query, retrieval_config.top_k, retrieval_config.filter)
+    
+    if use_cache:
+        retrieval_cache.refresh_version(knowledge_base_id)
+        cached = retrieval_cache.get(knowledge_base_id, query, retrieval_config)
+        if cached is not None:
+            logger.info(f"♻️ 검색 캐시 적중: {knowledge_base_id} ({len(cached)}개 결과)")
+            return cached
+    
+    def call_retrieve():
+        with track_call("retrieve"):
+            return client.retrieve(
+                knowledgeBaseId=knowledge_base_id,
+                retrievalQuery={"text": query},
+                retrievalConfiguration=retrieval_config.to_api()
+            )
+    
+    response = hedged_call("retrieve", call_retrieve)
+    results = [parse_retrieval_result(result, knowledge_base_id) for result in response.get("retrievalResults", [])]
+    
+    if use_cache:
+        retrieval_cache.put(knowledge_base_id, query, retrieval_config, results)
+    return results
+
+
+def fuse_results(result_lists, top_k):
+    """
+    여러 Knowledge Base의 검색 결과를 상호 순위 융합(RRF)으로 병합합니다.
+
+    각 목록의 순위로 RRF 점수를 합산하고, 동점은 Knowledge Base별로 최소-최대 정규화한 점수로
+    가립니다. 같은 출처 URI와 같은 내용(해시)의 청크는 하나로 합칩니다.
+
+    Args:
+        result_lists (list): Knowledge Base별 결과 목록의 목록 (각 목록은 점수 내림차순)
+        top_k (int): 반환할 결과 수
+
+    Returns:
+        list: 병합된 결과 목록 (score는 0~1로 정규화된 융합 점수, raw_score는 원래 점수)
+    """
+    fused = {}
+    for results in result_lists:
+        if not results:
+            continue
+        scores = [result["score"] for result in results]
+        low, high = min(scores), max(scores)
+        span = high - low
+
+        for rank, result in enumerate(results):
+            content_hash = hashlib.sha1(result["content"].strip().encode("utf-8")).hexdigest()
+            key = (result["source"], content_hash)
+            normalized = (result["score"] - low) / span if span else 1.0
+
+            entry = fused.get(key)
+            if entry is None:
+                entry = fused[key] = {
+                    "result": dict(result, raw_score=result["score"]),
+                    "rrf": 0.0,
+                    "normalized": 0.0
+                }
+            entry["rrf"] += 1.0 / (RRF_K + rank + 1)
+            entry["normalized"] = max(entry["normalized"], normalized)
+
+    ranked = sorted(fused.values(), key=lambda entry: (entry["rrf"], entry["normalized"]), reverse=True)[:top_k]
+    if not ranked:
+        return []
+
+    best = ranked[0]["rrf"]
+    merged = []
+    for entry in ranked:
+        result = entry["result"]
+        result["score"] = entry["rrf"] / best
+        merged.append(result)
+    return merged
+
+
+def federated_retrieve(query, knowledge_base_ids, retrieval_config=None, deadline_seconds=None):
+    """
+    여러 Knowledge Base를 동시에 검색하고 결과를 병합합니다.
+
+    모든 Knowledge Base는 공통 마감 시간을 공유하며, 마감 시간 안에 응답하지 않은
+    Knowledge Base는 결과에서 제외됩니다. 전체 지연 시간은 가장 느린 단일 검색 수준입니다.
+
+    Args:
+        query (str): 검색 쿼리
+        knowledge_base_ids (list): 검색할 Knowledge Base ID 목록
+        retrieval_config (RetrievalConfig, optional): 각 KB에 적용할 검색 설정 (top_k는 병합 후 결과 수)
+        deadline_seconds (float, optional): 공통 마감 시간 (없으면 config 값)
+
+    Returns:
+        tuple: (병합된 결과 목록, 응답하지 않거나 실패한 Knowledge Base ID 목록)
+    """
+    deadline_seconds = deadline_seconds or config.kb_federation_deadline_seconds
+    retrieval_config = retrieval_config or RetrievalConfig()
+    client = get_bedrock_agent_client()
+    start = time.perf_counter()
+
+    futures = {
+        _retrieve_executor.submit(
+            contextvars.copy_context().run, retrieve_from_knowledge_base, client, kb_id, query, retrieval_config
+        ): kb_id
+        for kb_id in knowledge_base_ids
+    }
+    done, not_done = wait(futures, timeout=deadline_seconds)
+
+    result_lists, failed = [], []
+    for future in done:
+        kb_id = futures[future]
+        try:
+            result_lists.append(future.result())
+        except Exception as e:
+            logger.warning(f"⚠️ Knowledge Base 검색 실패: {kb_id} ({str(e)})")
+            failed.append(kb_id)
+
+    for future in not_done:
+        future.cancel()
+        logger.warning(f"⏱️ Knowledge Base 검색 마감 시간 초과: {futures[future]}")
+        failed.append(futures[future])
+
+    merged = fuse_results(result_lists, retrieval_config.top_k)
+    logger.info(
+        f"✅ 통합 검색 완료: {len(knowledge_base_ids) - len(failed)}/{len(knowledge_base_ids)}개 KB, "
+        f"{len(merged)}개 결과, {time.perf_counter() - start:.2f}s"
+    )
+    return merged, failed
+
+def build_retrieve_and_generate_params(query, knowledge_base_id, retrieval_config, session_id=None):
+    """RetrieveAndGenerate(Stream) API 요청 파라미터를 구성합니다"""
+    # 모델 ARN 구성
+    model_arn = f"arn:aws:bedrock:{config.region_name}::foundation-model/{config.model_id}"
+    
+    params = {
+        "input": {"text": query},
+        "retrieveAndGenerateConfiguration": {
+            "type": "KNOWLEDGE_BASE",
+            "knowledgeBaseConfiguration": {
+                "knowledgeBaseId": knowledge_base_id,
+                "modelArn": model_arn,
+                "retrievalConfiguration": retrieval_config.to_api()
+            }
+        }
+    }
+    # 같은 세션을 이어서 사용하면 서비스가 이전 대화를 기억하므로 질문만 보내면 됨
+    if session_id:
+        params["sessionId"] = session_id
+    return params
+
+
+def is_session_error(error):
+    """만료되었거나 찾을 수 없는 세션으로 인한 오류인지 확인합니다"""
+    code = error.response.get("Error", {}).get("Code")
+    message = error.response.get("Error", {}).get("Message", "").lower()
+    return code in ("ValidationException", "ResourceNotFoundException") and "session" in message
+
+
+def parse_citation(citation):
+    """
+    RetrieveAndGenerate 인용 정보를 출처 목록으로 변환합니다.
+    
+    Args:
+        citation (dict): 응답의 citations 항목 또는 스트림의 citation 이벤트
+        
+    Returns:
+        list: generated_part, source_file, source_uri, referenced_content를 포함한 딕셔너리 목록
+    """
+    citation_text = citation.get("generatedResponsePart", {}).get("textResponsePart", {}).get("text", "")
+    details = []
+    
+    for ref in citation.get("retrievedReferences", []):
+        location = ref.get("location", {})
+        source = "Unknown"
+        for loc_type in ["s3Location", "webLocation", "confluenceLocation", "salesforceLocation", "sharePointLocation"]:
+            if loc_type in location:
+                source = location[loc_type].get("uri", location[loc_type].get("url", "Unknown"))
+                break
+                
+        source_filename = source.split("/")[-1] if "/" in source else source
+        content = ref.get("content", {}).get("text", "")
+        
+        details.append({
+            "generated_part": citation_text,
+            "source_file": source_filename,
+            "source_uri": source,
+            "referenced_content": content
+        })
+    return details
+
+
+def retrieve_and_generate_stream(client, params, query):
+    """
+    RetrieveAndGenerateStream API를 호출하여 텍스트와 인용 정보를 도착하는 대로 전달합니다.
+    
+    반환된 딕셔너리의 "stream" 제너레이터가 텍스트 조각을 생성하며, 끝까지 소비하면
+    같은 딕셔너리에 "output"과 "citation_details"가 채워집니다.
+    
+    Returns:
+        dict: "stream" 제너레이터와 "session_id"를 포함한 응답 딕셔너리
+    """
+    try:
+        with track_call("retrieve_and_generate_stream"):
+            response = client.retrieve_and_generate_stream(**params)
+    except ClientError as e:
+        if not (params.get("sessionId") and is_session_error(e)):
+            raise
+        logger.warning(f"⚠️ RetrieveAndGenerate 세션 만료, 새 세션으로 재시도: {params['sessionId']}")
+        params = {key: value for key, value in params.items() if key != "sessionId"}
+        with track_call("retrieve_and_generate_stream"):
+            response = client.retrieve_and_generate_stream(**params)
+    
+    result = {
+        "response_type": "retrieve_and_generate",
+        "query": query,
+        "output": "",
+        "citation_details": [],
+        "session_id": response.get("sessionId")
+    }
+    
+    def stream():
+        chunks = []
+        start = time.perf_counter()
+        try:
+            for event in response.get("stream", []):
+                if "output" in event:
+                    text = event["output"].get("text")
+                    if text:
+                        chunks.append(text)
+                        yield text
+                elif "citation" in event:
+                    # 이전 형식은 citation 이벤트 안에 citation 항목이 한 번 더 중첩됨
+                    citation = event["citation"].get("citation", event["citation"])
+                    result["citation_details"].extend(parse_citation(citation))
+        except Exception as e:
+            error_msg = f"Knowledge Base 스트림 오류: {str(e)}"
+            logger.error(f"❌ {error_msg}")
+            result["response_type"] = "error"
+            result["output"] = "".join(chunks) + f"\n\n⚠️ {error_msg}"
+            return
+        
+        result["output"] = "".join(chunks)
+        STREAM_SECONDS.observe(time.perf_counter() - start, operation="retrieve_and_generate_stream")
+        logger.info(f"✅ 스트리밍 응답 완료: {len(result['output'])} 글자, {len(result['citation_details'])} 인용")
+    
+    result["stream"] = stream()
+    return result
+
+
+def query_knowledge_base(query, knowledge_base_id=None, retrieve_only=False, retrieval_config=None,
+                         session_id=None, stream=False, backend=None):
     """
     Knowledge Base에 쿼리를 실행하여 정보를 검색하거나 생성형 응답을 얻습니다.
     
     Args:
         query (str): 검색 쿼리
-        knowledge_base_id (str, optional): 사용할 Knowledge Base ID
+        knowledge_base_id (str or list, optional): 사용할 Knowledge Base ID
+            (쉼표로 구분하거나 목록으로 여러 개를 지정하면 검색 모드에서 통합 검색)
         retrieve_only (bool): 검색만 수행할지 여부 (False면 생성형 응답 포함)
+        retrieval_config (RetrievalConfig, optional): top-k, 검색 유형, 메타데이터 필터 설정
+        session_id (str, optional): 이어서 사용할 RetrieveAndGenerate 세션 ID
+        stream (bool): RetrieveAndGenerateStream API로 응답을 스트리밍할지 여부
+        backend (str, optional): 검색 백엔드 ("bedrock" 또는 "local", 없으면 검색 설정/config 값)
         
     Returns:
-        dict: 검색 결과 또는 생성된 응답
+        dict: 검색 결과 또는 생성된 응답 (생성형 응답에는 다음 턴에 사용할 "session_id" 포함,
+            stream이면 "stream" 제너레이터 포함)
     """
-    knowledge_base_id = knowledge_base_id or config.knowledge_base_id
+    knowledge_base_ids = parse_knowledge_base_ids(knowledge_base_id) or [config.knowledge_base_id]
+    knowledge_base_id = knowledge_base_ids[0]
+    retrieval_config = retrieval_config or RetrievalConfig()
+    if backend:
+        retrieval_config = replace(retrieval_config, backend=backend)
+    
+    if not retrieve_only and retrieval_config.is_local:
+        return {
+            "response_type": "error",
+            "query": query,
+            "output": "로컬 인덱스는 Retrieve 및 RAG 모드에서만 사용할 수 있습니다."
+        }
     
     logger.info(f"📚 Knowledge Base 쿼리 시작: {retrieve_only and '검색만' or '검색 및 생성'}")
-    logger.info(f"쿼리: {query[:50]}{'...' if len(query) > 50 else ''}")
+    logger.debug("쿼리: %.50s", query)
     
     try:
         client = get_bedrock_agent_client()
         
         if retrieve_only:
-            # retrieve API - 검색만 수행
-            logger.info("🔍 Retrieve API 호출")
+            # retrieve API - 검색만 수행 (여러 KB면 동시 검색 후 병합)
+            logger.info(f"🔍 Retrieve API 호출: {len(knowledge_base_ids)}개 KB")
             
-            response = client.retrieve(
-                knowledgeBaseId=knowledge_base_id,
-                retrievalQuery={"text": query},
-                retrievalConfiguration={
-                    "vectorSearchConfiguration": {
-                        "numberOfResults": 5
-                    }
-                }
-            )
+            # 재정렬 시 후보를 더 많이 가져온 뒤 top_k개로 줄임
+            fetch_config = retrieval_config
+            if retrieval_config.rerank:
+                fetch_config = replace(retrieval_config, top_k=overfetch_size(retrieval_config.top_k))
             
-            # 검색 결과 파싱
-            retrieval_results = []
-            for result in response.get("retrievalResults", []):
-                content = result.get("content", {}).get("text", "")
-                metadata = result.get("metadata", {})
-                source = result.get("location", {}).get("s3Location", {}).get("uri", "Unknown source")
-                source_filename = source.split("/")[-1] if "/" in source else source
-                score = result.get("score", 0)
-                
-                retrieval_results.append({
-                    "content": content,
-                    "metadata": metadata,
-                    "source": source,
-                    "source_filename": source_filename,
-                    "score": score
-                })
+            failed_knowledge_bases = []
+            if len(knowledge_base_ids) > 1 and not retrieval_config.is_local:
+                retrieval_results, failed_knowledge_bases = federated_retrieve(query, knowledge_base_ids, fetch_config)
+            else:
+                retrieval_results = retrieve_from_knowledge_base(client, knowledge_base_id, query, fetch_config)
+            
+            rerank_cost = None
+            if retrieval_config.rerank:
+                retrieval_results, rerank_cost = rerank_results(query, retrieval_results, retrieval_config.top_k)
             
             logger.info(f"✅ 검색 결과: {len(retrieval_results)}개 문서")
             
             return {
                 "response_type": "retrieve",
                 "query": query,
-                "results": retrieval_results
+                "results": retrieval_results,
+                "failed_knowledge_bases": failed_knowledge_bases,
+                "rerank": rerank_cost
             }
         
         else:
-            # retrieve_and_generate API - 검색 + 생성형 응답
-            logger.info("🔍 RetrieveAndGenerate API 호출")
+            # retrieve_and_generate API - 검색 + 생성형 응답 (단일 KB만 지원)
+            logger.info(f"🔍 RetrieveAndGenerate{'Stream' if stream else ''} API 호출 (세션: {session_id or '새 세션'})")
+            if len(knowledge_base_ids) > 1:
+                logger.warning(f"⚠️ RetrieveAndGenerate는 단일 KB만 지원하여 첫 번째 KB 사용: {knowledge_base_id}")
             
-            # 모델 ARN 구성
-            model_arn = f"arn:aws:bedrock:{config.region_name}::foundation-model/{config.model_id}"
+            params = build_retrieve_and_generate_params(query, knowledge_base_id, retrieval_config, session_id)
+            if stream:
+                return retrieve_and_generate_stream(client, params, query)
             
-            response = client.retrieve_and_generate(
-                input={"text": query},
-                retrieveAndGenerateConfiguration={
-                    "type": "KNOWLEDGE_BASE",
-                    "knowledgeBaseConfiguration": {
-                        "knowledgeBaseId": knowledge_base_id,
-                        "modelArn": model_arn
-                    }
-                }
-            )
+            try:
+                with track_call("retrieve_and_generate"):
+                    response = client.retrieve_and_generate(**params)
+            except ClientError as e:
+                # 만료된 세션이면 새 세션으로 다시 시도
+                if not (session_id and is_session_error(e)):
+                    raise
+                logger.warning(f"⚠️ RetrieveAndGenerate 세션 만료, 새 세션으로 재시도: {session_id}")
+                params.pop("sessionId")
+                with track_call("retrieve_and_generate"):
+                    response = client.retrieve_and_generate(**params)
             
             # 생성된 응답과 인용 정보 추출
             output = response.get("output", {}).get("text", "")
-            citations = response.get("citations", [])
-            
-            # 인용 정보 처리
             citation_details = []
-            for citation in citations:
-                citation_text = citation.get("generatedResponsePart", {}).get("textResponsePart", {}).get("text", "")
-                references = citation.get("retrievedReferences", [])
-                
-                for ref in references:
-                    location = ref.get("location", {})
-                    source = "Unknown"
-                    for loc_type in ["s3Location", "webLocation", "confluenceLocation", "salesforceLocation", "sharePointLocation"]:
-                        if loc_type in location:
-                            source = location[loc_type].get("uri", location[loc_type].get("url", "Unknown"))
-                            break
-                            
-                    source_filename = source.split("/")[-1] if "/" in source else source
-                    content = ref.get("content", {}).get("text", "")
-                    
-                    citation_details.append({
-                        "generated_part": citation_text,
-                        "source_file": source_filename,
-                        "source_uri": source,
-                        "referenced_content": content
-                    })
+            for citation in response.get("citations", []):
+                citation_details.extend(parse_citation(citation))
             
             logger.info(f"✅ 응답 생성 완료: {len(output)} 글자, {len(citation_details)} 인용")
             
@@ -118,7 +531,8 @@ def query_knowledge_base(query, knowledge_base_id=None, retrieve_only=False):
                 "response_type": "retrieve_and_generate",
                 "query": query,
                 "output": output,
-                "citation_details": citation_details
+                "citation_details": citation_details,
+                "session_id": response.get("sessionId")
             }
             
     except Exception as e:
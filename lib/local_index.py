@@ -0,0 +1,440 @@
+# Path: /bedrock_chatbot_app/lib/local_index.py
+
+"""
+관리형 Knowledge Base 없이 검색할 수 있는 로컬 벡터 인덱스 모듈
+
+로컬 디렉터리의 문서를 청크로 나누고 임베딩하여 메모리 매핑 NumPy 파일과
+IVF(역파일) 근사 최근접 이웃 인덱스로 저장합니다. 검색 결과는 Retrieve API와
+같은 형식(parse_retrieval_result)으로 반환합니다.
+
+사용법:
+    python -m lib.local_index build <문서 디렉터리> [인덱스 디렉터리] [--embedding-model MODEL_ID]
+    python -m lib.local_index query <인덱스 디렉터리> "<질문>"
+"""
+import logging
+import math
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+import numpy as np
+from lib.config import config
+from lib.json_codec import dumps, load, loads
+
+logger = logging.getLogger(__name__)
+
+# 로컬 인덱스 결과에 표시할 Knowledge Base ID
+LOCAL_KNOWLEDGE_BASE_ID = "local"
+
+# 청크 분할 설정 (문자 수 기준)
+CHUNK_CHARS = 1200
+CHUNK_OVERLAP_CHARS = 200
+
+# 해싱 임베딩 차원
+HASHING_DIMENSIONS = 512
+
+# IVF 설정
+BRUTE_FORCE_MAX_VECTORS = 4096   # 이 이하이면 전체 비교
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_SIZE = 20000
+DEFAULT_NPROBE = 8
+
+SUPPORTED_EXTENSIONS = {".txt", ".md", ".html", ".htm", ".csv", ".json"}
+METADATA_SUFFIX = ".metadata.json"
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+TAG_PATTERN = re.compile(r"<[^>]+>")
+
+VECTORS_FILE = "vectors.npy"
+CHUNKS_FILE = "chunks.jsonl"
+IVF_FILE = "ivf.npz"
+MANIFEST_FILE = "manifest.json"
+
+
+class HashingEmbedder:
+    """
+    단어와 단어 내부 문자 3-gram을 해싱하여 고정 차원 벡터로 만드는 로컬 임베더
+
+    네트워크 호출 없이 동작하므로 Bedrock 장애나 부하 테스트 시에도 사용할 수 있습니다.
+    해시는 프로세스와 무관하게 같은 값을 내도록 CRC32를 사용합니다.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dimensions=HASHING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def _features(self, text):
+        for word in TOKEN_PATTERN.findall(text.lower()):
+            yield word
+            padded = f"#{word}#"
+            for start in range(len(padded) - 2):
+                yield padded[start:start + 3]
+
+    def embed(self, texts):
+        """텍스트 목록을 L2 정규화된 (텍스트 수 x 차원) 행렬로 변환합니다"""
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                hashed = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if hashed & 0x80000000 else -1.0
+                vectors[row, hashed % self.dimensions] += sign
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        return _normalize_rows(vectors)
+
+    def manifest(self):
+        return {"embedder": self.name, "dimensions": self.dimensions}
+
+
+class BedrockEmbedder:
+    """Bedrock 임베딩 모델(예: Titan)로 벡터를 만드는 임베더 (재정렬 모듈의 임베딩 캐시 공유)"""
+
+    name = "bedrock"
+
+    def __init__(self, model_id):
+        self.model_id = model_id
+
+    def embed(self, texts):
+        from lib.reranking import embed_texts
+        vectors, _, _ = embed_texts(texts, self.model_id)
+        return _normalize_rows(vectors)
+
+    def manifest(self):
+        return {"embedder": self.name, "model_id": self.model_id}
+
+
+def create_embedder(manifest):
+    """매니페스트에 기록된 임베더를 생성합니다"""
+    if manifest.get("embedder") == BedrockEmbedder.name:
+        return BedrockEmbedder(manifest["model_id"])
+    return HashingEmbedder(manifest.get("dimensions", HASHING_DIMENSIONS))
+
+
+def _normalize_rows(vectors):
+    """행 벡터를 L2 정규화합니다"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.maximum(norms, 1e-9)).astype(np.float32)
+
+
+def chunk_text(text, chunk_chars=CHUNK_CHARS, overlap_chars=CHUNK_OVERLAP_CHARS):
+    """
+    텍스트를 문단 경계를 우선하여 일정 길이의 겹치는 청크로 나눕니다.
+
+    Returns:
+        list: 청크 문자열 목록
+    """
+    text = text.strip()
+    if len(text) <= chunk_chars:
+        return [text] if text else []
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + chunk_chars)
+        if end < len(text):
+            # 문단 또는 문장 경계에서 자르기
+            boundary = max(text.rfind("\n\n", start, end), text.rfind(". ", start, end))
+            if boundary > start + chunk_chars // 2:
+                end = boundary + 1
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        start = max(end - overlap_chars, start + 1)
+    return [chunk for chunk in chunks if chunk]
+
+
+def read_document(path):
+    """지원하는 형식의 문서 텍스트를 읽습니다 (HTML은 태그 제거)"""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    if os.path.splitext(path)[1].lower() in (".html", ".htm"):
+        text = TAG_PATTERN.sub(" ", text)
+    return text
+
+
+def read_metadata(path):
+    """Knowledge Base와 같은 형식의 <문서>.metadata.json 파일에서 메타데이터 속성을 읽습니다"""
+    metadata_path = path + METADATA_SUFFIX
+    if not os.path.exists(metadata_path):
+        return {}
+    with open(metadata_path, "r", encoding="utf-8") as f:
+        return load(f).get("metadataAttributes", {})
+
+
+def iter_documents(directory):
+    """디렉터리에서 인덱싱할 문서 경로를 정렬된 순서로 반환합니다"""
+    for root, _, files in sorted(os.walk(directory)):
+        for filename in sorted(files):
+            if filename.endswith(METADATA_SUFFIX):
+                continue
+            if os.path.splitext(filename)[1].lower() in SUPPORTED_EXTENSIONS:
+                yield os.path.join(root, filename)
+
+
+def _spherical_kmeans(vectors, list_count, seed=0):
+    """정규화된 벡터에 대해 코사인 유사도 기준 k-means 중심을 계산합니다"""
+    rng = np.random.default_rng(seed)
+    sample = vectors
+    if len(vectors) > KMEANS_SAMPLE_SIZE:
+        sample = vectors[np.sort(rng.choice(len(vectors), KMEANS_SAMPLE_SIZE, replace=False))]
+    sample = np.asarray(sample)
+
+    centroids = sample[rng.choice(len(sample), list_count, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        for index in range(list_count):
+            members = sample[assignments == index]
+            if len(members):
+                centroids[index] = members.sum(axis=0)
+        centroids = _normalize_rows(centroids)
+    return centroids
+
+
+def _match_filter(metadata, condition):
+    """Bedrock 메타데이터 필터 조건을 청크 메타데이터에 적용합니다"""
+    if "andAll" in condition:
+        return all(_match_filter(metadata, item) for item in condition["andAll"])
+    if "orAll" in condition:
+        return any(_match_filter(metadata, item) for item in condition["orAll"])
+
+    operator, operand = next(iter(condition.items()))
+    key, expected = operand["key"], operand["value"]
+    if key not in metadata:
+        return operator in ("notEquals", "notIn")
+    actual = metadata[key]
+
+    try:
+        if operator == "equals":
+            return actual == expected
+        if operator == "notEquals":
+            return actual != expected
+        if operator == "greaterThan":
+            return actual > expected
+        if operator == "greaterThanOrEquals":
+            return actual >= expected
+        if operator == "lessThan":
+            return actual < expected
+        if operator == "lessThanOrEquals":
+            return actual <= expected
+        if operator == "in":
+            return actual in expected
+        if operator == "notIn":
+            return actual not in expected
+        if operator == "startsWith":
+            return str(actual).startswith(str(expected))
+        if operator == "stringContains":
+            return str(expected) in str(actual)
+    except TypeError:
+        return False
+
+    logger.warning(f"⚠️ 로컬 인덱스에서 지원하지 않는 필터 연산자: {operator}")
+    return True
+
+
+def build_index(document_dir, index_dir, embedding_model_id=None, batch_size=64):
+    """
+    문서 디렉터리를 청크로 나누고 임베딩하여 로컬 인덱스를 만듭니다.
+
+    Args:
+        document_dir (str): 문서 디렉터리 (S3 데이터 소스와 같은 구조, .metadata.json 지원)
+        index_dir (str): 인덱스를 저장할 디렉터리
+        embedding_model_id (str, optional): Bedrock 임베딩 모델 ID (없으면 로컬 해싱 임베딩)
+        batch_size (int): 임베딩 배치 크기
+
+    Returns:
+        dict: 인덱스 매니페스트
+    """
+    start = time.perf_counter()
+    embedder = BedrockEmbedder(embedding_model_id) if embedding_model_id else HashingEmbedder()
+    os.makedirs(index_dir, exist_ok=True)
+
+    chunks = []
+    for path in iter_documents(document_dir):
+        metadata = read_metadata(path)
+        relative = os.path.relpath(path, document_dir).replace(os.sep, "/")
+        for text in chunk_text(read_document(path)):
+            chunks.append({
+                "content": text,
+                "source": f"file://{os.path.abspath(path)}",
+                "source_filename": relative,
+                "metadata": metadata
+            })
+
+    if not chunks:
+        raise ValueError(f"인덱싱할 문서가 없습니다: {document_dir}")
+
+    vectors = np.concatenate([
+        embedder.embed([chunk["content"] for chunk in chunks[offset:offset + batch_size]])
+        for offset in range(0, len(chunks), batch_size)
+    ])
+
+    # IVF 목록 구성 (작은 인덱스는 전체 비교)
+    list_count = 0
+    if len(chunks) > BRUTE_FORCE_MAX_VECTORS:
+        list_count = int(math.sqrt(len(chunks)))
+        centroids = _spherical_kmeans(vectors, list_count)
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+
+        # 같은 목록의 벡터가 연속되도록 정렬하여 저장 (검색 시 연속 구간만 읽음)
+        order = np.argsort(assignments, kind="stable")
+        vectors = vectors[order]
+        chunks = [chunks[index] for index in order]
+        offsets = np.searchsorted(assignments[order], np.arange(list_count + 1))
+        np.savez(os.path.join(index_dir, IVF_FILE), centroids=centroids, offsets=offsets)
+
+    np.save(os.path.join(index_dir, VECTORS_FILE), vectors)
+    with open(os.path.join(index_dir, CHUNKS_FILE), "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(dumps(chunk) + "\n")
+
+    manifest = dict(embedder.manifest(), chunks=len(chunks), lists=list_count, created_at=time.time())
+    with open(os.path.join(index_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        f.write(dumps(manifest, pretty=True))
+
+    logger.info(f"🗂️ 로컬 인덱스 생성 완료: 청크 {len(chunks)}개, IVF 목록 {list_count}개, {time.perf_counter() - start:.1f}s")
+    return manifest
+
+
+class LocalVectorIndex:
+    """
+    build_index()로 만든 로컬 인덱스를 검색하는 클래스
+
+    벡터는 메모리 매핑으로 열어 필요한 구간만 읽으며, IVF 목록이 있으면 쿼리와 가까운
+    nprobe개 목록의 벡터만 비교합니다.
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            self.manifest = load(f)
+        with open(os.path.join(index_dir, CHUNKS_FILE), "r", encoding="utf-8") as f:
+            self.chunks = [loads(line) for line in f]
+
+        self.vectors = np.load(os.path.join(index_dir, VECTORS_FILE), mmap_mode="r")
+        self.embedder = create_embedder(self.manifest)
+
+        self.centroids = None
+        self.offsets = None
+        ivf_path = os.path.join(index_dir, IVF_FILE)
+        if os.path.exists(ivf_path):
+            with np.load(ivf_path) as ivf:
+                self.centroids = ivf["centroids"]
+                self.offsets = ivf["offsets"]
+
+    def _candidate_ranges(self, query_vector, nprobe):
+        """쿼리와 가까운 IVF 목록의 (시작, 끝) 구간 목록을 반환합니다"""
+        if self.centroids is None or len(self.centroids) == 0:
+            return [(0, len(self.chunks))]
+        nprobe = max(1, min(nprobe, len(self.centroids)))
+        nearest = np.argpartition(-(self.centroids @ query_vector), nprobe - 1)[:nprobe]
+        return [(int(self.offsets[index]), int(self.offsets[index + 1])) for index in sorted(nearest)]
+
+    def search(self, query, top_k=5, metadata_filter=None, nprobe=DEFAULT_NPROBE):
+        """
+        쿼리와 가장 가까운 청크를 검색합니다.
+
+        Args:
+            query (str): 검색 쿼리
+            top_k (int): 반환할 결과 수
+            metadata_filter (dict, optional): Bedrock 형식 메타데이터 필터
+            nprobe (int): 비교할 IVF 목록 수
+
+        Returns:
+            list: parse_retrieval_result와 같은 형식의 결과 목록
+        """
+        # 빈 인덱스는 임베딩 호출 없이 바로 반환
+        if not self.chunks:
+            return []
+
+        query_vector = self.embedder.embed([query])[0]
+
+        ids, scores = [], []
+        for start, end in self._candidate_ranges(query_vector, nprobe):
+            if end > start:
+                ids.append(np.arange(start, end))
+                scores.append(np.asarray(self.vectors[start:end]) @ query_vector)
+        if not ids:
+            return []
+        ids = np.concatenate(ids)
+        scores = np.concatenate(scores)
+
+        if metadata_filter:
+            mask = np.fromiter(
+                (_match_filter(self.chunks[index].get("metadata", {}), metadata_filter) for index in ids),
+                dtype=bool, count=len(ids)
+            )
+            ids, scores = ids[mask], scores[mask]
+
+        if not len(ids):
+            return []
+
+        # argpartition의 k는 [1, 후보 수] 범위여야 함
+        top_k = max(1, min(int(top_k), len(ids)))
+        if len(ids) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(ids))
+        best = best[np.argsort(-scores[best])]
+
+        results = []
+        for position in best:
+            chunk = self.chunks[int(ids[position])]
+            results.append({
+                "content": chunk["content"],
+                "score": float(scores[position]),
+                "source": chunk["source"],
+                "source_filename": chunk["source_filename"],
+                "metadata": chunk.get("metadata", {}),
+                "knowledge_base_id": LOCAL_KNOWLEDGE_BASE_ID
+            })
+        return results
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_local_index(index_dir=None):
+    """로컬 인덱스를 열어 재사용합니다 (경로별로 한 번만 로드)"""
+    index_dir = index_dir or config.local_index_path
+    index = _indexes.get(index_dir)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(index_dir)
+            if index is None:
+                index = _indexes[index_dir] = LocalVectorIndex(index_dir)
+                logger.info(f"🗂️ 로컬 인덱스 로드: {index_dir} (청크 {len(index.chunks)}개)")
+    return index
+
+
+def main(argv):
+    """명령줄 진입점"""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if len(argv) >= 2 and argv[0] == "build":
+        embedding_model_id = None
+        if "--embedding-model" in argv:
+            position = argv.index("--embedding-model")
+            embedding_model_id = argv[position + 1]
+            argv = argv[:position] + argv[position + 2:]
+        index_dir = argv[2] if len(argv) > 2 else config.local_index_path
+        print(dumps(build_index(argv[1], index_dir, embedding_model_id), pretty=True))
+        return 0
+
+    if len(argv) == 3 and argv[0] == "query":
+        index = get_local_index(argv[1])
+        start = time.perf_counter()
+        results = index.search(argv[2])
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        for result in results:
+            print(f"{result['score']:.4f}  {result['source_filename']}  {result['content'][:80]!r}")
+        print(f"검색 시간: {elapsed_ms:.2f}ms")
+        return 0
+
+    print(__doc__)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
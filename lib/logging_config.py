@@ -1,63 +1,226 @@
 # Path: /bedrock_chatbot_app/lib/logging_config.py
 
 """애플리케이션 전체에서 일관된 로깅 시스템을 제공하는 모듈"""
+import atexit
+import contextvars
+import copy
 import logging
-import sys
+import logging.handlers
 import os
+import queue
+import random
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from lib.config import config
+from lib.json_codec import BACKEND, BACKEND_VERSION, dumps
+from lib.metrics import LOG_RECORDS_DROPPED
+
+# 로그 레벨을 설정할 애플리케이션 로거 (레코드는 전파되어 루트 로거의 큐 핸들러로 전달)
+APP_LOGGERS = ("bedrock_app", "lib", "ui")
+
+# 로그 큐 최대 크기 (가득 차면 요청 스레드를 막지 않고 레코드를 버림)
+LOG_QUEUE_SIZE = 10000
+
+# 요청/세션 ID (요청을 처리하는 스레드의 컨텍스트에서 읽음)
+_request_id = contextvars.ContextVar("request_id", default=None)
+_session_id = contextvars.ContextVar("session_id", default=None)
+
+_listener = None
+_exception_formatter = logging.Formatter()
+
+
+@contextmanager
+def log_context(request_id=None, session_id=None):
+    """
+    블록 안에서 기록되는 로그에 요청/세션 ID를 붙입니다.
+
+    스레드 풀에서 실행되는 작업은 contextvars.copy_context().run으로 제출해야 ID가 이어집니다.
+    """
+    request_token = _request_id.set(request_id)
+    session_token = _session_id.set(session_id)
+    try:
+        yield
+    finally:
+        _request_id.reset(request_token)
+        _session_id.reset(session_token)
+
+
+class lazy:
+    """
+    로그 레벨이 활성화되어 메시지를 포맷할 때만 값을 계산하는 인자 래퍼
+
+    메시지는 큐에 넣기 전 호출 스레드에서 포맷하므로 호출 시점의 값이 기록됩니다.
 
-def setup_logging(level=logging.INFO):
+    예: logger.debug("입력: %s", lazy(dumps, input_data))
+    """
+    __slots__ = ("func", "args")
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __str__(self):
+        return str(self.func(*self.args))
+
+
+class ContextFilter(logging.Filter):
+    """호출 스레드에서 레코드에 요청/세션 ID를 기록하는 필터"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        record.session_id = _session_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    로거별 샘플링 비율에 따라 레코드를 통과시키는 필터
+
+    비율은 가장 긴 접두어가 일치하는 로거 이름으로 정하며(예: {"lib.hedging": 0.1}),
+    WARNING 이상 레코드는 항상 통과합니다.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = dict(rates or {})
+        self._resolved = {}
+
+    def rate_for(self, name):
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            matched = -1
+            for prefix, prefix_rate in self.rates.items():
+                if (name == prefix or name.startswith(prefix + ".")) and len(prefix) > matched:
+                    rate, matched = prefix_rate, len(prefix)
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """레코드를 한 줄 JSON으로 변환하는 포맷터"""
+
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "session_id": getattr(record, "session_id", None),
+            "thread": record.threadName
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return dumps(entry, default=str)
+
+
+class ColoredFormatter(logging.Formatter):
+    """로그 레벨별 색상을 붙이는 텍스트 포맷터 (로컬 개발용)"""
+    RESET = "\033[0m"
+    COLORS = {
+        'DEBUG': "\033[1;36m",
+        'INFO': "\033[1;32m",
+        'WARNING': "\033[1;33m",
+        'ERROR': "\033[1;31m",
+        'CRITICAL': "\033[1m\033[1;31m",
+    }
+
+    def format(self, record):
+        record.color = self.COLORS.get(record.levelname, "\033[1;37m")
+        return super().format(record)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    레코드를 큐에 넣는 핸들러
+
+    메시지 문자열(%-인자, lazy 인자 포함)과 예외 정보는 호출 스레드에서 확정하여, 요청 스레드가
+    이후에 바꾸는 객체를 리스너 스레드가 읽지 않도록 합니다. JSON/텍스트 출력 포맷은 리스너 스레드에서 수행합니다.
+    큐가 가득 차면 요청 스레드를 막지 않고 레코드를 버리며, 버린 수는 log_records_dropped_total 메트릭으로 노출합니다.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+def _build_formatter(log_format):
+    """출력 형식에 맞는 포맷터를 생성합니다"""
+    if log_format == "json":
+        return JsonFormatter()
+
+    # 색상 지원 확인 (Windows CMD에서는 컬러 지원이 제한적)
+    use_colors = hasattr(sys, 'ps1') or os.name != 'nt' or 'ANSICON' in os.environ
+    if use_colors:
+        fmt = "%(asctime)s - %(name)s - %(color)s%(levelname)s" + ColoredFormatter.RESET + ": %(message)s"
+        return ColoredFormatter(fmt, datefmt="%Y-%m-%d %H:%M:%S")
+    return logging.Formatter('%(asctime)s - %(name)s - %(levelname)s: %(message)s', datefmt="%Y-%m-%d %H:%M:%S")
+
+
+def setup_logging(level=None, log_format=None, sampling=None):
     """
     애플리케이션 전체에서 사용할 로깅 시스템을 설정합니다.
-    색상으로 구분된 로그 메시지를 출력합니다.
-    
+
+    큐 핸들러는 루트 로거에 연결하고 애플리케이션 로거는 전파를 유지하므로, 루트에 연결된 다른 핸들러
+    (pytest caplog, 플랫폼 로그 수집기 등)도 같은 레코드를 받습니다. 요청 스레드에서는 요청/세션 ID 기록,
+    샘플링, 메시지 확정만 수행하고 별도 리스너 스레드가 포맷하여 stdout에 출력합니다.
+    여러 번 호출해도 한 번만 설정합니다.
+
     Args:
-        level: 로깅 레벨 (기본값: logging.INFO)
-        
+        level: 로깅 레벨 (없으면 config.log_level)
+        log_format (str): "json"(구조화 로그) 또는 "text"(색상 텍스트), 없으면 config.log_format
+        sampling (dict): 로거 이름 접두어별 샘플링 비율, 없으면 config.log_sampling
+
     Returns:
         logging.Logger: 설정된 로거 객체
     """
+    global _listener
+
     logger = logging.getLogger('bedrock_app')
-    logger.setLevel(level)
-    
-    # 이미 핸들러가 설정되어 있으면 추가하지 않음
-    if not logger.handlers:
-        handler = logging.StreamHandler(sys.stdout)
-        
-        # 색상 지원 확인 (Windows CMD에서는 컬러 지원이 제한적)
-        use_colors = hasattr(sys, 'ps1') or os.name != 'nt' or 'ANSICON' in os.environ
-        
-        if use_colors:
-            # 색상 코드
-            RESET = "\033[0m"
-            BOLD = "\033[1m"
-            BLACK, RED, GREEN, YELLOW, BLUE, MAGENTA, CYAN, WHITE = ["\033[1;%dm" % (30 + i) for i in range(8)]
-            
-            fmt = "%(asctime)s - %(name)s - {color}%(levelname)s{reset}: %(message)s".format(
-                color="%(color)s", reset=RESET
-            )
-            
-            class ColoredFormatter(logging.Formatter):
-                COLORS = {
-                    'DEBUG': CYAN,
-                    'INFO': GREEN,
-                    'WARNING': YELLOW,
-                    'ERROR': RED,
-                    'CRITICAL': BOLD + RED,
-                }
-                
-                def format(self, record):
-                    record.color = self.COLORS.get(record.levelname, WHITE)
-                    return super(ColoredFormatter, self).format(record)
-                    
-            formatter = ColoredFormatter(fmt, datefmt="%Y-%m-%d %H:%M:%S")
-        else:
-            # 색상 없는 기본 포맷터
-            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s: %(message)s', 
-                                         datefmt="%Y-%m-%d %H:%M:%S")
-                                         
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-    
+    if _listener is not None:
+        return logger
+
+    level = level or config.log_level
+
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(config.log_sampling if sampling is None else sampling))
+    queue_handler.addFilter(ContextFilter())
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(_build_formatter(log_format or config.log_format))
+
+    # 루트 로거 레벨은 그대로 두어 외부 라이브러리(botocore 등)는 기존 레벨(WARNING)로 기록
+    logging.getLogger().addHandler(queue_handler)
+    for name in APP_LOGGERS:
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    logger.info(f"🧩 JSON 코덱: {BACKEND} {BACKEND_VERSION}")
     return logger
 
 # 기본 로거 생성
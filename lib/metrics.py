@@ -0,0 +1,333 @@
+# Path: /bedrock_chatbot_app/lib/metrics.py
+
+"""요청 수, 지연 시간, 오류, 토큰 사용량 등을 수집하여 Prometheus 텍스트 형식으로 노출하는 메트릭 모듈"""
+import bisect
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from lib.config import config
+
+logger = logging.getLogger(__name__)
+
+# 지연 시간 히스토그램 기본 버킷 (초)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 스로틀링으로 집계할 오류 코드
+THROTTLE_ERROR_CODES = {"ThrottlingException", "TooManyRequestsException"}
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value):
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """
+    레이블별 값을 보관하는 메트릭의 기본 클래스
+
+    Attributes:
+        name (str): 메트릭 이름
+        documentation (str): HELP 설명
+        labelnames (tuple): 레이블 이름 목록 (값은 키워드 인자로 전달)
+    """
+    metric_type = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self):
+        """(이름 접미사, 레이블 값, 추가 레이블, 값) 목록을 반환합니다"""
+        with self._lock:
+            return [("", key, None, value) for key, value in self._values.items()]
+
+    def render(self):
+        """Prometheus 텍스트 형식으로 변환합니다"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """증가만 하는 누적 값 메트릭"""
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """증가/감소하는 현재 값 메트릭"""
+    metric_type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_in_progress(self, **labels):
+        """블록 실행 중에만 값을 1 증가시킵니다"""
+        self.inc(1, **labels)
+        try:
+            yield
+        finally:
+            self.dec(1, **labels)
+
+
+class Histogram(Metric):
+    """값의 분포를 누적 버킷으로 집계하는 메트릭"""
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            state["counts"][index] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """블록 실행 시간을 기록합니다"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            states = [(key, list(state["counts"]), state["sum"], state["count"]) for key, state in self._values.items()]
+
+        samples = []
+        for key, counts, total, count in states:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                samples.append(("_bucket", key, ("le", _format_value(bound)), cumulative))
+            samples.append(("_sum", key, None, total))
+            samples.append(("_count", key, None, count))
+        return samples
+
+
+class MetricsRegistry:
+    """메트릭을 이름별로 등록하고 한 번에 내보내는 레지스트리"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric_class, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        """등록된 모든 메트릭을 Prometheus 텍스트 형식으로 반환합니다"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+# 프로세스 전역 메트릭 레지스트리
+registry = MetricsRegistry()
+
+# Bedrock API 호출
+CLIENT_CREATE_SECONDS = registry.histogram(
+    "bedrock_client_create_seconds", "boto3 클라이언트 생성 시간", ("service", "region")
+)
+CALL_SECONDS = registry.histogram(
+    "bedrock_call_seconds", "API 호출 응답 시간 (스트리밍은 스트림 시작까지)", ("operation", "region")
+)
+CALLS_TOTAL = registry.counter(
+    "bedrock_calls_total", "API 호출 수 (status: success, throttled, error)", ("operation", "region", "status")
+)
+THROTTLES_TOTAL = registry.counter(
+    "bedrock_throttles_total", "스로틀링된 API 호출 수", ("operation", "region")
+)
+STREAM_SECONDS = registry.histogram(
+    "bedrock_stream_seconds", "응답 스트림을 끝까지 소비한 시간", ("operation",)
+)
+PARSE_SECONDS = registry.histogram(
+    "bedrock_parse_seconds", "응답 본문/이벤트 파싱 시간 (호출당 합계)", ("operation",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+)
+TOKENS_TOTAL = registry.counter(
+    "bedrock_tokens_total", "모델 토큰 사용량 (kind: input, output, cache_read, cache_write)", ("operation", "kind")
+)
+
+# 요청 크기 사전 점검 (token_estimator.preflight)
+REQUEST_INPUT_TOKENS = registry.histogram(
+    "bedrock_request_input_tokens", "전송 전 추정 입력 토큰 수", ("operation", "model"),
+    buckets=(256, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072, 200000)
+)
+PREFLIGHT_REJECTED_TOTAL = registry.counter(
+    "bedrock_preflight_rejected_total", "컨텍스트 한도를 넘어 전송 전에 거부된 요청 수", ("operation", "model")
+)
+MAX_TOKENS_CLAMPED_TOTAL = registry.counter(
+    "bedrock_max_tokens_clamped_total", "남은 컨텍스트나 모델 한도에 맞춰 max_tokens를 줄인 요청 수", ("operation", "model")
+)
+
+# 채팅 요청 처리 (UI)
+CHAT_REQUESTS_TOTAL = registry.counter(
+    "chat_requests_total", "응답 모드별 채팅 요청 수 (status: success, error)", ("mode", "status")
+)
+CHAT_REQUEST_SECONDS = registry.histogram(
+    "chat_request_seconds", "응답 모드별 채팅 요청 처리 시간 (스트림 표시 포함)", ("mode",)
+)
+CHAT_REQUESTS_IN_FLIGHT = registry.gauge(
+    "chat_requests_in_flight", "처리 중인 채팅 요청 수", ("mode",)
+)
+
+# 로깅
+LOG_RECORDS_DROPPED = registry.counter(
+    "log_records_dropped_total", "로그 큐가 가득 차서 버린 로그 레코드 수"
+)
+
+
+def error_status(error):
+    """예외를 호출 상태 레이블(throttled 또는 error)로 분류합니다"""
+    response = getattr(error, "response", None)
+    code = response.get("Error", {}).get("Code") if isinstance(response, dict) else None
+    return "throttled" if code in THROTTLE_ERROR_CODES else "error"
+
+
+def record_call(operation, region, seconds, error=None):
+    """API 호출 한 건의 시간과 결과를 기록합니다"""
+    status = "success" if error is None else error_status(error)
+    region = region or config.region_name
+    CALL_SECONDS.observe(seconds, operation=operation, region=region)
+    CALLS_TOTAL.inc(operation=operation, region=region, status=status)
+    if status == "throttled":
+        THROTTLES_TOTAL.inc(operation=operation, region=region)
+
+
+@contextmanager
+def track_call(operation, region=None):
+    """블록에서 수행한 API 호출의 시간과 결과(성공/스로틀링/오류)를 기록합니다"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        record_call(operation, region, time.perf_counter() - start, e)
+        raise
+    record_call(operation, region, time.perf_counter() - start)
+
+
+def record_usage(operation, usage):
+    """정규화된 토큰 사용량(normalize_usage 결과)을 누적합니다"""
+    for kind in ("input", "output", "cache_read", "cache_write"):
+        amount = usage.get(f"{kind}_tokens") or 0
+        if amount:
+            TOKENS_TOTAL.inc(amount, operation=operation, kind=kind)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """/metrics(Prometheus), /healthz(liveness), /readyz(readiness) 요청 처리기"""
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            self._respond(200, registry.render().encode("utf-8"), PROMETHEUS_CONTENT_TYPE)
+        elif path in ("/healthz", "/readyz"):
+            self._respond(200, b"ok\n", "text/plain; charset=utf-8")
+        else:
+            self._respond(404, b"not found\n", "text/plain; charset=utf-8")
+
+    def _respond(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 스크레이프 요청마다 접근 로그를 남기지 않음
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=None, host="0.0.0.0"):
+    """
+    메트릭 HTTP 서버를 별도 포트의 데몬 스레드로 시작합니다 (여러 번 호출해도 한 번만 시작).
+
+    Args:
+        port (int, optional): 포트 (없으면 config.metrics_port, 그것도 없으면 시작 안 함)
+        host (str): 바인딩 주소
+
+    Returns:
+        ThreadingHTTPServer or None: 실행 중인 서버
+    """
+    global _server
+
+    port = port or config.metrics_port
+    if not port:
+        return None
+
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                logger.warning(f"⚠️ 메트릭 서버 시작 실패: 포트 {port} ({str(e)})")
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+            logger.info(f"📈 메트릭 서버 시작: http://{host}:{port}/metrics")
+    return _server
@@ -0,0 +1,280 @@
+# Path: /bedrock_chatbot_app/lib/model_router.py
+
+"""요청 복잡도와 모델별 지연 시간/오류율을 기준으로 모델을 자동 선택하는 모듈"""
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, asdict
+from lib.config import MODEL_OPTIONS
+from lib.token_estimator import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# 사이드바에서 자동 라우팅을 선택할 때 사용하는 모델 ID
+AUTO_MODEL_ID = "auto"
+
+# EWMA 가중치 (최근 관측값 비중)
+EWMA_ALPHA = 0.2
+
+# 복잡도 판단 기준
+COMPLEXITY_THRESHOLD = 1.0
+LONG_PROMPT_TOKENS = 1500
+COMPLEX_KEYWORDS = [
+    "비교", "분석", "계산", "자격", "왜", "이유", "설명", "추천", "단계", "전략", "장단점",
+    "compare", "analy", "calculat", "why", "explain", "step", "strategy"
+]
+NUMBER_PATTERN = re.compile(r"\d[\d,.]*")
+
+# 오류율이 이 값을 넘는 모델은 다른 모델이 있으면 선택하지 않음
+MAX_ERROR_RATE = 0.5
+
+# 관측된 모델이 하나도 없을 때 사용할 사전 지연 시간(초)
+DEFAULT_PRIOR_LATENCY = 2.0
+
+# 약한 응답 판단 기준
+MIN_ANSWER_CHARS = 20
+WEAK_ANSWER_PHRASES = [
+    "잘 모르겠", "알 수 없", "확실하지 않", "답변할 수 없", "정보가 부족",
+    "i'm not sure", "i don't know", "i cannot", "i can't"
+]
+
+
+@dataclass
+class RoutingDecision:
+    """
+    라우팅 결정 정보
+
+    Attributes:
+        model_id (str): 최종 사용한 모델 ID
+        reason (str): 선택 이유
+        complexity (float): 추정 복잡도 점수
+        escalated (bool): 저비용 모델 응답이 약해 상위 모델로 승격했는지 여부
+    """
+    model_id: str
+    reason: str
+    complexity: float
+    escalated: bool = False
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class ModelStats:
+    """모델별 지연 시간과 오류율의 지수 가중 이동 평균(EWMA)을 관리하는 클래스"""
+
+    def __init__(self, alpha=EWMA_ALPHA):
+        self.alpha = alpha
+        self._stats = {}   # model_id -> {"latency": 초, "error_rate": 0~1, "count": n}
+        self._lock = threading.Lock()
+
+    def record(self, model_id, latency, success):
+        """호출 결과를 반영합니다"""
+        error = 0.0 if success else 1.0
+        with self._lock:
+            stats = self._stats.get(model_id)
+            if stats is None:
+                self._stats[model_id] = {"latency": latency, "error_rate": error, "count": 1}
+                return
+            stats["latency"] += self.alpha * (latency - stats["latency"])
+            stats["error_rate"] += self.alpha * (error - stats["error_rate"])
+            stats["count"] += 1
+
+    def get(self, model_id):
+        """모델의 현재 통계를 반환합니다 (관측 전이면 None)"""
+        with self._lock:
+            stats = self._stats.get(model_id)
+            return dict(stats) if stats else None
+
+    def median_latency(self):
+        """관측된 모델들의 EWMA 지연 시간 중앙값을 반환합니다 (관측이 없으면 None)"""
+        with self._lock:
+            latencies = sorted(stats["latency"] for stats in self._stats.values())
+        if not latencies:
+            return None
+        middle = len(latencies) // 2
+        if len(latencies) % 2:
+            return latencies[middle]
+        return (latencies[middle - 1] + latencies[middle]) / 2
+
+
+def estimate_complexity(prompt, context_tokens=0):
+    """
+    프롬프트의 복잡도를 휴리스틱으로 추정합니다.
+
+    길이, 분석/비교/계산 관련 키워드, 숫자 개수, 질문 개수를 합산합니다.
+
+    Args:
+        prompt (str): 사용자 프롬프트
+        context_tokens (int): 함께 전송될 대화 기록 등의 토큰 수
+
+    Returns:
+        tuple: (복잡도 점수, 점수 근거 문자열)
+    """
+    text = prompt if isinstance(prompt, str) else str(prompt)
+    lowered = text.lower()
+    tokens = estimate_tokens(text) + context_tokens
+
+    keyword_hits = sum(1 for keyword in COMPLEX_KEYWORDS if keyword in lowered)
+    number_count = len(NUMBER_PATTERN.findall(text))
+    question_count = text.count("?")
+
+    score = (
+        0.4 * tokens / 500
+        + 0.5 * keyword_hits
+        + (0.3 if number_count >= 3 else 0.0)
+        + 0.2 * max(0, question_count - 1)
+    )
+    if tokens >= LONG_PROMPT_TOKENS:
+        score = max(score, COMPLEXITY_THRESHOLD)
+
+    reason = f"토큰 {tokens}, 키워드 {keyword_hits}, 숫자 {number_count}, 질문 {question_count}"
+    return score, reason
+
+
+def is_weak_answer(prompt, response):
+    """
+    응답이 약한지(상위 모델로 승격할지) 휴리스틱으로 판단합니다.
+
+    Returns:
+        str or None: 약한 응답으로 판단한 이유 (괜찮으면 None)
+    """
+    if is_error_response(response):
+        return "오류 응답"
+
+    output = (response.get("output") or "").strip()
+    if len(output) < MIN_ANSWER_CHARS:
+        return "응답이 너무 짧음"
+
+    lowered = output.lower()
+    for phrase in WEAK_ANSWER_PHRASES:
+        if phrase in lowered:
+            return f"불확실한 표현 포함: '{phrase}'"
+
+    if response.get("stop_reason") == "max_tokens":
+        return "최대 토큰 수에서 잘림"
+    return None
+
+
+def is_error_response(response):
+    """응답 딕셔너리가 오류인지 확인합니다"""
+    output = response.get("output") or ""
+    return response.get("response_type") == "error" or (isinstance(output, str) and output.startswith("오류:"))
+
+
+class ModelRouter:
+    """
+    MODEL_OPTIONS의 router_tier를 기준으로 요청마다 모델을 선택하는 라우터
+
+    복잡도가 낮은 요청은 "fast" 등급에서, 높은 요청은 "strong" 등급에서 고르며,
+    같은 등급 안에서는 관측된 EWMA 지연 시간·오류율과 상대 비용이 낮은 모델을 선택합니다.
+    "fast" 모델 응답이 약하다고 판단될 때만 "strong" 모델로 한 번 승격합니다.
+    """
+
+    def __init__(self, stats=None, verifier=None):
+        """
+        Args:
+            stats (ModelStats, optional): 모델 통계 (없으면 새로 생성)
+            verifier (callable, optional): verifier(prompt, response) -> 약한 이유 또는 None.
+                저비용 모델 기반 검증기를 연결할 때 사용하며, 없으면 휴리스틱만 사용합니다.
+        """
+        self.stats = stats or ModelStats()
+        self.verifier = verifier
+
+    def candidates(self, tier, context_tokens=0):
+        """등급에 속하고 컨텍스트 크기가 충분한 모델 목록을 반환합니다"""
+        return [
+            model_id for model_id, options in MODEL_OPTIONS.items()
+            if options.get("router_tier") == tier and options.get("context_window", 0) > context_tokens
+        ]
+
+    def _rank(self, model_ids):
+        """
+        지연 시간, 오류율, 비용을 합한 점수가 낮은 순으로 정렬합니다.
+
+        관측 전인 모델은 다른 모델들의 지연 시간 중앙값(없으면 DEFAULT_PRIOR_LATENCY)과
+        오류율 0을 사전값으로 사용하여 관측된 모델과 같은 식으로 비교합니다.
+        """
+        prior_latency = self.stats.median_latency() or DEFAULT_PRIOR_LATENCY
+
+        def score(model_id):
+            stats = self.stats.get(model_id) or {"latency": prior_latency, "error_rate": 0.0}
+            cost = MODEL_OPTIONS[model_id].get("relative_cost", 1.0)
+            unhealthy = stats["error_rate"] > MAX_ERROR_RATE
+            return (unhealthy, stats["latency"] * (1 + stats["error_rate"]) * (0.5 + cost))
+        return sorted(model_ids, key=score)
+
+    def choose(self, prompt, context_tokens=0):
+        """
+        프롬프트에 사용할 모델을 선택합니다.
+
+        Returns:
+            RoutingDecision: 라우팅 결정
+        """
+        complexity, detail = estimate_complexity(prompt, context_tokens)
+        tier = "strong" if complexity >= COMPLEXITY_THRESHOLD else "fast"
+
+        ranked = self._rank(self.candidates(tier, context_tokens))
+        if not ranked:
+            # 해당 등급 모델이 없으면 다른 등급 사용
+            tier = "fast" if tier == "strong" else "strong"
+            ranked = self._rank(self.candidates(tier, context_tokens))
+
+        model_id = ranked[0]
+        stats = self.stats.get(model_id)
+        health = f", 지연 {stats['latency']:.2f}s, 오류율 {stats['error_rate']:.0%}" if stats else ""
+        reason = f"{tier} 등급 (복잡도 {complexity:.2f}: {detail}{health})"
+        return RoutingDecision(model_id=model_id, reason=reason, complexity=round(complexity, 2))
+
+    def execute(self, prompt, call, context_tokens=0):
+        """
+        모델을 선택하여 호출하고, 필요하면 상위 모델로 승격하여 다시 호출합니다.
+
+        Args:
+            prompt (str): 사용자 프롬프트
+            call (callable): call(model_id) -> 응답 딕셔너리 ("output", "response_type" 포함)
+            context_tokens (int): 함께 전송될 대화 기록 등의 토큰 수
+
+        Returns:
+            tuple: (응답 딕셔너리, RoutingDecision)
+        """
+        decision = self.choose(prompt, context_tokens)
+        logger.info(f"🧭 모델 라우팅: {decision.model_id} - {decision.reason}")
+        response = self._timed_call(call, decision.model_id)
+
+        if MODEL_OPTIONS[decision.model_id].get("router_tier") != "fast":
+            return response, decision
+
+        weak_reason = is_weak_answer(prompt, response)
+        if weak_reason is None and self.verifier is not None and not is_error_response(response):
+            weak_reason = self.verifier(prompt, response)
+        if weak_reason is None:
+            return response, decision
+
+        strong = self._rank(self.candidates("strong", context_tokens))
+        if not strong:
+            return response, decision
+
+        logger.info(f"⬆️ 모델 승격: {decision.model_id} → {strong[0]} ({weak_reason})")
+        decision = RoutingDecision(
+            model_id=strong[0],
+            reason=f"{decision.reason} → 승격: {weak_reason}",
+            complexity=decision.complexity,
+            escalated=True
+        )
+        return self._timed_call(call, decision.model_id), decision
+
+    def _timed_call(self, call, model_id):
+        """호출 시간을 측정하여 모델 통계에 반영합니다"""
+        start = time.perf_counter()
+        try:
+            response = call(model_id)
+        except Exception:
+            self.stats.record(model_id, time.perf_counter() - start, success=False)
+            raise
+        self.stats.record(model_id, time.perf_counter() - start, success=not is_error_response(response))
+        return response
+
+
+# 프로세스 전역 모델 라우터
+model_router = ModelRouter()
@@ -0,0 +1,137 @@
+# Path: /bedrock_chatbot_app/lib/prompt_cache.py
+
+"""Bedrock 프롬프트 캐싱(cache point)을 요청에 적용하고 캐시 사용량을 정리하는 모듈"""
+import logging
+from lib.config import MODEL_OPTIONS
+from lib.metrics import record_usage
+from lib.token_estimator import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Converse API 캐시 체크포인트 블록
+CACHE_POINT_BLOCK = {"cachePoint": {"type": "default"}}
+
+# 모델 설정에 최소 토큰 수가 없을 때 사용할 값
+DEFAULT_CACHE_MIN_TOKENS = 1024
+
+# InvokeModel(Anthropic Messages 형식) 캐시 지정
+ANTHROPIC_CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def supports_prompt_caching(model_id):
+    """모델이 프롬프트 캐싱을 지원하는지 확인합니다"""
+    return MODEL_OPTIONS.get(model_id, {}).get("prompt_caching", False)
+
+
+def cache_min_tokens(model_id):
+    """캐시 체크포인트 하나에 필요한 최소 접두부 토큰 수를 반환합니다"""
+    return MODEL_OPTIONS.get(model_id, {}).get("cache_min_tokens", DEFAULT_CACHE_MIN_TOKENS)
+
+
+def supports_system_prompt(model_id):
+    """모델이 Converse 시스템 프롬프트를 지원하는지 확인합니다 (알 수 없는 모델은 지원으로 간주)"""
+    return MODEL_OPTIONS.get(model_id, {}).get("system_prompt", True)
+
+
+def add_system_cache_point(system):
+    """
+    시스템 프롬프트 블록 끝에 캐시 체크포인트를 추가한 새 목록을 반환합니다.
+
+    Args:
+        system (list): Converse 시스템 프롬프트 블록 목록
+
+    Returns:
+        list: 캐시 체크포인트가 추가된 블록 목록
+    """
+    if not system:
+        return system
+    return list(system) + [CACHE_POINT_BLOCK]
+
+
+def add_history_cache_point(messages):
+    """
+    마지막 사용자 메시지 직전 메시지에 캐시 체크포인트를 추가한 새 목록을 반환합니다.
+
+    이전 턴까지의 대화가 다음 요청의 접두부로 재사용되도록 캐시합니다.
+    공유되는 메시지는 수정하지 않고 해당 메시지만 복사합니다.
+
+    Args:
+        messages (list): Converse 형식 메시지 목록
+
+    Returns:
+        list: 캐시 체크포인트가 추가된 메시지 목록
+    """
+    if len(messages) < 2:
+        return messages
+
+    prefix_end = messages[-2]
+    cached = {"role": prefix_end["role"], "content": list(prefix_end["content"]) + [CACHE_POINT_BLOCK]}
+    return messages[:-2] + [cached, messages[-1]]
+
+
+def merge_system_into_messages(system, messages):
+    """
+    시스템 프롬프트를 지원하지 않는 모델을 위해 시스템 텍스트를 첫 사용자 메시지 앞에 넣습니다.
+
+    Args:
+        system (list): 시스템 프롬프트 블록 목록
+        messages (list): Converse 형식 메시지 목록
+
+    Returns:
+        list: 시스템 텍스트가 병합된 메시지 목록
+    """
+    system_text = "\n\n".join(block["text"] for block in system if "text" in block)
+    if not system_text or not messages:
+        return messages
+
+    first = messages[0]
+    merged = {"role": first["role"], "content": [{"text": system_text}] + list(first["content"])}
+    return [merged] + messages[1:]
+
+
+def build_anthropic_system(text, model_id):
+    """
+    InvokeModel(Anthropic Messages 형식)용 시스템 프롬프트를 구성합니다.
+
+    캐싱을 지원하는 모델(MODEL_OPTIONS의 prompt_caching)이고 지시문이 cache_min_tokens 이상이면
+    cache_control을 지정하여 고정 지시문을 캐시합니다. 그보다 짧은 접두부는 캐시되지 않으므로 지정하지 않습니다.
+    """
+    block = {"type": "text", "text": text}
+    if not supports_prompt_caching(model_id):
+        return [block]
+
+    tokens = estimate_tokens(text, model_id)
+    if tokens < cache_min_tokens(model_id):
+        logger.debug(f"시스템 프롬프트가 캐시 최소 토큰 수 미만이라 캐시하지 않음: {model_id}, 약 {tokens} 토큰")
+        return [block]
+
+    block["cache_control"] = ANTHROPIC_CACHE_CONTROL
+    return [block]
+
+
+def normalize_usage(usage):
+    """
+    Converse(camelCase) 또는 Anthropic InvokeModel(snake_case) 사용량을 공통 형식으로 변환합니다.
+
+    Args:
+        usage (dict): 응답의 usage 필드
+
+    Returns:
+        dict: input_tokens, output_tokens, cache_read_tokens, cache_write_tokens
+    """
+    usage = usage or {}
+    return {
+        "input_tokens": usage.get("inputTokens", usage.get("input_tokens", 0)),
+        "output_tokens": usage.get("outputTokens", usage.get("output_tokens", 0)),
+        "cache_read_tokens": usage.get("cacheReadInputTokens", usage.get("cache_read_input_tokens", 0)),
+        "cache_write_tokens": usage.get("cacheWriteInputTokens", usage.get("cache_creation_input_tokens", 0))
+    }
+
+
+def log_usage(label, usage):
+    """토큰 및 캐시 사용량을 로그와 메트릭에 기록합니다"""
+    record_usage(label, usage)
+    logger.info(
+        f"📊 {label} 토큰 사용량: 입력={usage['input_tokens']}, 출력={usage['output_tokens']}, "
+        f"캐시 읽기={usage['cache_read_tokens']}, 캐시 쓰기={usage['cache_write_tokens']}"
+    )
@@ -0,0 +1,220 @@
+# Path: /bedrock_chatbot_app/lib/rag.py
+
+"""Knowledge Base 검색 결과를 직접 패킹하여 ConverseStream으로 답변을 생성하는 클라이언트 측 RAG 모듈"""
+import hashlib
+import logging
+import re
+from collections import OrderedDict
+from dataclasses import replace
+from lib.config import config
+from lib.converse import converse_stream
+from lib.knowledge_base import RetrievalConfig, parse_knowledge_base_ids, federated_retrieve, retrieve_from_knowledge_base
+from lib.bedrock_client import get_bedrock_agent_client
+from lib.reranking import overfetch_size, rerank_results
+from lib.token_estimator import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# 컨텍스트에 넣을 검색 청크의 토큰 예산
+DEFAULT_CONTEXT_TOKEN_BUDGET = 3000
+
+# 세션별로 보관할 이전 턴 검색 청크 수
+MAX_SESSION_CHUNKS = 50
+
+RAG_INSTRUCTIONS = (
+    "당신은 제공된 검색 문서를 근거로 답변하는 어시스턴트입니다. "
+    "아래 <sources>의 내용만 사용하여 답변하고, 근거로 사용한 문장 뒤에 [1]처럼 출처 번호를 표시하세요. "
+    "문서에서 답을 찾을 수 없으면 모른다고 답하세요."
+)
+
+CITATION_PATTERN = re.compile(r"\[(\d+)\]")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def chunk_key(chunk):
+    """청크 내용 기준 중복 판별 키를 반환합니다 (공백/대소문자 차이는 무시)"""
+    normalized = WHITESPACE_PATTERN.sub(" ", chunk.get("content", "").strip().lower())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def dedupe_chunks(chunks):
+    """내용이 같은 청크를 제거합니다 (먼저 나온 청크 유지)"""
+    seen = set()
+    unique = []
+    for chunk in chunks:
+        key = chunk_key(chunk)
+        if key not in seen:
+            seen.add(key)
+            unique.append(chunk)
+    return unique
+
+
+def pack_context(chunks, budget_tokens, model_id=None):
+    """
+    청크를 순서대로 토큰 예산 안에 채워 넣고 인용 번호를 붙입니다.
+
+    예산을 넘는 청크는 건너뛰고 더 작은 다음 청크를 계속 시도합니다.
+
+    Args:
+        chunks (list): 우선순위 순으로 정렬된 청크 목록
+        budget_tokens (int): 컨텍스트 토큰 예산
+        model_id (str, optional): 토큰 추정 대상 모델 ID
+
+    Returns:
+        tuple: (인용 번호("citation")가 추가된 청크 목록, 사용한 토큰 수)
+    """
+    packed = []
+    used = 0
+    for chunk in chunks:
+        tokens = estimate_tokens(chunk.get("content", ""), model_id)
+        if used + tokens > budget_tokens:
+            continue
+        packed.append(dict(chunk, citation=len(packed) + 1))
+        used += tokens
+    return packed, used
+
+
+def format_context(packed):
+    """패킹된 청크를 시스템 프롬프트에 넣을 출처 블록으로 변환합니다"""
+    parts = ["<sources>"]
+    for chunk in packed:
+        parts.append(f"[{chunk['citation']}] (출처: {chunk.get('source_filename', 'Unknown')})\n{chunk.get('content', '')}")
+    parts.append("</sources>")
+    return "\n\n".join(parts)
+
+
+def map_citations(output, packed):
+    """
+    응답에 표시된 출처 번호를 청크 출처 정보로 변환합니다.
+
+    Returns:
+        list: 응답에서 인용된 청크의 출처 정보 (인용 번호 순)
+    """
+    cited = {int(number) for number in CITATION_PATTERN.findall(output)}
+    return [
+        {
+            "citation": chunk["citation"],
+            "source_file": chunk.get("source_filename", "Unknown"),
+            "source_uri": chunk.get("source", "Unknown"),
+            "referenced_content": chunk.get("content", ""),
+            "knowledge_base_id": chunk.get("knowledge_base_id")
+        }
+        for chunk in packed if chunk["citation"] in cited
+    ]
+
+
+class RagSession:
+    """
+    채팅 세션별 RAG 검색 상태
+
+    이전 턴에서 가져온 청크를 보관하여 후속 질문의 컨텍스트 후보로 함께 사용합니다.
+    같은 검색의 결과 재사용은 프로세스 전역 검색 캐시(retrieval_cache)가 담당합니다.
+    """
+
+    def __init__(self, max_chunks=MAX_SESSION_CHUNKS):
+        self.max_chunks = max_chunks
+        self._chunks = OrderedDict()    # chunk_key -> 청크
+
+    def remember(self, results):
+        """검색한 청크를 보관합니다 (오래된 항목부터 제거)"""
+        for chunk in results:
+            chunk_id = chunk_key(chunk)
+            self._chunks[chunk_id] = chunk
+            self._chunks.move_to_end(chunk_id)
+        while len(self._chunks) > self.max_chunks:
+            self._chunks.popitem(last=False)
+
+    def previous_chunks(self):
+        """이전 턴 청크를 최근에 사용한 순서로 반환합니다"""
+        return list(reversed(self._chunks.values()))
+
+
+def retrieve_chunks(query, knowledge_base_ids, retrieval_config):
+    """
+    Knowledge Base에서 청크를 검색합니다 (KB별 결과는 검색 캐시를 거침).
+
+    Returns:
+        tuple: (청크 목록, 응답하지 않은 KB 목록)
+    """
+    fetch_config = retrieval_config
+    if retrieval_config.rerank:
+        fetch_config = replace(retrieval_config, top_k=overfetch_size(retrieval_config.top_k))
+
+    failed_knowledge_bases = []
+    if len(knowledge_base_ids) > 1 and not retrieval_config.is_local:
+        results, failed_knowledge_bases = federated_retrieve(query, knowledge_base_ids, fetch_config)
+    else:
+        results = retrieve_from_knowledge_base(get_bedrock_agent_client(), knowledge_base_ids[0], query, fetch_config)
+
+    if retrieval_config.rerank:
+        results, _ = rerank_results(query, results, retrieval_config.top_k)
+
+    return results, failed_knowledge_bases
+
+
+def rag_converse_stream(query, knowledge_base_id=None, retrieval_config=None, conversation_history=None,
+                        model_id=None, rag_session=None, context_token_budget=DEFAULT_CONTEXT_TOKEN_BUDGET,
+                        temperature=0.3, max_tokens=1024, compactor=None):
+    """
+    검색 → 중복 제거 → 토큰 예산 패킹 → ConverseStream 생성 순서로 RAG 응답을 스트리밍합니다.
+
+    검색 청크는 이번 턴의 시스템 프롬프트로만 전달하고 대화 기록에는 사용자 질문과 답변만
+    남기므로, 후속 턴의 프롬프트가 이전 컨텍스트만큼 커지지 않습니다.
+
+    Args:
+        query (str): 사용자 질문
+        knowledge_base_id (str or list, optional): Knowledge Base ID (여러 개면 통합 검색)
+        retrieval_config (RetrievalConfig, optional): 검색 설정
+        conversation_history (Conversation, optional): 이전 RAG 대화 기록
+        model_id (str, optional): 생성 모델 ID
+        rag_session (RagSession, optional): 이전 턴 청크를 보관하는 세션 상태
+        context_token_budget (int): 검색 청크에 사용할 토큰 예산
+        temperature (float): 응답의 무작위성 조절 (0~1)
+        max_tokens (int): 생성할 최대 토큰 수
+        compactor (HistoryCompactor, optional): 대화 기록 압축기
+
+    Returns:
+        dict: converse_stream() 응답에 "sources"가 추가된 딕셔너리.
+            스트림을 끝까지 소비하면 "citation_details"가 채워집니다.
+    """
+    model_id = model_id or config.model_id
+    knowledge_base_ids = parse_knowledge_base_ids(knowledge_base_id) or [config.knowledge_base_id]
+    retrieval_config = retrieval_config or RetrievalConfig()
+
+    logger.info("📚 RAG 시작: %d개 KB, 쿼리: %.50s", len(knowledge_base_ids), query)
+
+    try:
+        results, failed_knowledge_bases = retrieve_chunks(query, knowledge_base_ids, retrieval_config)
+    except Exception as e:
+        error_msg = f"Knowledge Base API 오류: {str(e)}"
+        logger.error(f"❌ {error_msg}")
+        return {"response_type": "error", "query": query, "output": error_msg}
+
+    # 이번 검색 결과를 먼저, 이전 턴 청크를 뒤에 두어 예산이 남을 때만 사용
+    candidates = list(results)
+    if rag_session is not None:
+        candidates.extend(rag_session.previous_chunks())
+        rag_session.remember(results)
+    packed, context_tokens = pack_context(dedupe_chunks(candidates), context_token_budget, model_id)
+    logger.info(f"📦 컨텍스트 패킹: 후보 {len(candidates)}개 → {len(packed)}개 ({context_tokens} 토큰)")
+
+    system = [{"text": RAG_INSTRUCTIONS}, {"text": format_context(packed)}]
+    response = converse_stream(
+        query, conversation_history, model_id=model_id, temperature=temperature, max_tokens=max_tokens,
+        system=system, compactor=compactor, cache_prefix=False, response_type="rag"
+    )
+    response["query"] = query
+    response["sources"] = packed
+    response["failed_knowledge_bases"] = failed_knowledge_bases
+
+    if "stream" not in response:
+        return response
+
+    text_stream = response["stream"]
+
+    def stream():
+        yield from text_stream
+        response["citation_details"] = map_citations(response.get("output", ""), packed)
+
+    response["stream"] = stream()
+    return response
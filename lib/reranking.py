@@ -0,0 +1,220 @@
+# Path: /bedrock_chatbot_app/lib/reranking.py
+
+"""Knowledge Base 검색 결과를 로컬에서 재정렬(BM25, 임베딩 유사도)하고 MMR로 다양화하는 모듈"""
+import logging
+import re
+import time
+from functools import lru_cache
+import numpy as np
+from lib.bedrock_client import region_router
+from lib.config import config
+from lib.json_codec import dumpb, loads
+
+logger = logging.getLogger(__name__)
+
+# BM25 파라미터
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# MMR 가중치 (1이면 관련도만, 0이면 다양성만 고려)
+MMR_LAMBDA = 0.7
+
+# 이미 선택된 청크와 이 값 이상 유사하면 중복으로 보고 제외
+DUPLICATE_SIMILARITY = 0.9
+
+# 과다 검색 배수와 Retrieve API의 최대 결과 수
+OVERFETCH_FACTOR = 3
+MAX_RETRIEVE_RESULTS = 100
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def overfetch_size(top_k):
+    """재정렬 전에 가져올 후보 수를 반환합니다"""
+    return min(MAX_RETRIEVE_RESULTS, max(top_k, top_k * OVERFETCH_FACTOR))
+
+
+def tokenize(text):
+    """소문자 단어 토큰 목록을 반환합니다"""
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+def _term_matrix(token_lists):
+    """문서별 단어 빈도 행렬(문서 수 x 어휘 수)과 어휘 사전을 만듭니다"""
+    vocabulary = {}
+    rows, cols = [], []
+    for row, tokens in enumerate(token_lists):
+        for token in tokens:
+            rows.append(row)
+            cols.append(vocabulary.setdefault(token, len(vocabulary)))
+
+    matrix = np.zeros((len(token_lists), max(1, len(vocabulary))), dtype=np.float32)
+    np.add.at(matrix, (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)), 1.0)
+    return matrix, vocabulary
+
+
+def bm25_scores(query_tokens, term_matrix, vocabulary):
+    """
+    후보 문서 집합을 말뭉치로 보고 쿼리의 BM25 점수를 계산합니다.
+
+    Returns:
+        numpy.ndarray: 문서별 BM25 점수
+    """
+    columns = [vocabulary[token] for token in set(query_tokens) if token in vocabulary]
+    doc_count = term_matrix.shape[0]
+    if not columns or doc_count == 0:
+        return np.zeros(doc_count, dtype=np.float32)
+
+    tf = term_matrix[:, columns]
+    doc_lengths = term_matrix.sum(axis=1, keepdims=True)
+    avg_length = max(float(doc_lengths.mean()), 1.0)
+
+    df = (tf > 0).sum(axis=0)
+    idf = np.log(1.0 + (doc_count - df + 0.5) / (df + 0.5))
+    norm = tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths / avg_length))
+    return (norm * idf).sum(axis=1)
+
+
+def _normalize(scores):
+    """점수를 0~1 범위로 변환합니다"""
+    scores = np.asarray(scores, dtype=np.float32)
+    low, high = float(scores.min()), float(scores.max())
+    if high - low < 1e-9:
+        return np.ones_like(scores) if high > 0 else np.zeros_like(scores)
+    return (scores - low) / (high - low)
+
+
+def _cosine_matrix(vectors):
+    """행 벡터 간 코사인 유사도 행렬을 계산합니다"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = vectors / np.maximum(norms, 1e-9)
+    return unit @ unit.T
+
+
+@lru_cache(maxsize=4096)
+def _embed_cached(text, model_id):
+    """텍스트 임베딩을 계산합니다 (같은 청크는 캐시 사용)"""
+    def call_model(client):
+        response = client.invoke_model(
+            modelId=model_id,
+            body=dumpb({"inputText": text})
+        )
+        return loads(response["body"].read())
+
+    result = region_router.invoke("embedding", call_model)
+    return tuple(result["embedding"]), result.get("inputTextTokenCount", 0)
+
+
+def embed_texts(texts, model_id):
+    """
+    텍스트 목록의 임베딩 행렬을 반환합니다.
+
+    Returns:
+        tuple: (numpy.ndarray, 실제 임베딩 API 호출 수, 입력 토큰 수(캐시된 텍스트 포함))
+    """
+    misses_before = _embed_cached.cache_info().misses
+    vectors, tokens = [], 0
+    for text in texts:
+        vector, token_count = _embed_cached(text, model_id)
+        vectors.append(vector)
+        tokens += token_count
+    calls = _embed_cached.cache_info().misses - misses_before
+    return np.asarray(vectors, dtype=np.float32), calls, tokens
+
+
+def mmr_select(relevance, similarity, top_k, lambda_weight=MMR_LAMBDA):
+    """
+    최대 한계 관련도(MMR)로 관련도가 높으면서 서로 겹치지 않는 후보를 고릅니다.
+
+    선택된 후보와 DUPLICATE_SIMILARITY 이상 유사한 후보는 중복으로 보고 제외하므로
+    남은 후보가 부족하면 top_k개보다 적게 반환할 수 있습니다.
+
+    Args:
+        relevance (numpy.ndarray): 후보별 관련도 (0~1)
+        similarity (numpy.ndarray): 후보 간 유사도 행렬
+        top_k (int): 선택할 수
+        lambda_weight (float): 관련도 가중치
+
+    Returns:
+        list: 선택된 후보 인덱스 (선택 순서)
+    """
+    count = len(relevance)
+    selected = []
+    max_similarity = np.zeros(count, dtype=np.float32)
+    available = np.ones(count, dtype=bool)
+
+    for _ in range(min(top_k, count)):
+        if not available.any():
+            break
+        scores = lambda_weight * relevance - (1 - lambda_weight) * max_similarity
+        scores = np.where(available, scores, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        available &= similarity[:, best] < DUPLICATE_SIMILARITY
+        max_similarity = np.maximum(max_similarity, similarity[:, best])
+
+    return selected
+
+
+def rerank_results(query, results, top_k, embedding_model_id=None):
+    """
+    과다 검색한 결과를 재정렬하고 중복에 가까운 청크를 걸러 top_k개로 줄입니다.
+
+    관련도는 Knowledge Base 점수, 후보 집합 기준 BM25 점수, (선택 시) 쿼리-청크 임베딩
+    유사도를 정규화하여 평균하고, 청크 간 유사도는 임베딩이 있으면 임베딩, 없으면
+    TF-IDF 벡터의 코사인 유사도를 사용합니다.
+
+    Args:
+        query (str): 검색 쿼리
+        results (list): parse_retrieval_result 형식의 검색 결과
+        top_k (int): 반환할 결과 수
+        embedding_model_id (str, optional): 임베딩 모델 ID (없으면 config 값, 그것도 없으면 사용 안 함)
+
+    Returns:
+        tuple: (재정렬된 결과 목록, 비용 정보 딕셔너리)
+    """
+    start = time.perf_counter()
+    embedding_model_id = embedding_model_id or config.rerank_embedding_model_id
+    cost = {"candidates": len(results), "selected": 0, "embedding_calls": 0, "embedding_tokens": 0}
+
+    if len(results) <= 1:
+        cost["selected"] = len(results[:top_k])
+        cost["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return results[:top_k], cost
+
+    contents = [result.get("content", "") for result in results]
+    term_matrix, vocabulary = _term_matrix([tokenize(text) for text in contents])
+
+    signals = [
+        _normalize([result.get("score", 0.0) for result in results]),
+        _normalize(bm25_scores(tokenize(query), term_matrix, vocabulary))
+    ]
+
+    if embedding_model_id:
+        vectors, calls, tokens = embed_texts([query] + contents, embedding_model_id)
+        cost["embedding_calls"], cost["embedding_tokens"] = calls, tokens
+        similarity_all = _cosine_matrix(vectors)
+        signals.append(_normalize(similarity_all[0, 1:]))
+        similarity = similarity_all[1:, 1:]
+    else:
+        df = (term_matrix > 0).sum(axis=0)
+        idf = np.log((1 + len(results)) / (1 + df)) + 1.0
+        similarity = _cosine_matrix(term_matrix * idf)
+
+    relevance = np.mean(signals, axis=0)
+    selected = mmr_select(relevance, similarity, top_k)
+
+    reranked = []
+    for index in selected:
+        result = dict(results[index])
+        result["rerank_score"] = round(float(relevance[index]), 4)
+        reranked.append(result)
+
+    cost["selected"] = len(reranked)
+    cost["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    logger.info(
+        f"🔀 재정렬: 후보 {cost['candidates']}개 → {cost['selected']}개, {cost['elapsed_ms']}ms, "
+        f"임베딩 호출 {cost['embedding_calls']}회 ({cost['embedding_tokens']} 토큰)"
+    )
+    return reranked, cost
@@ -0,0 +1,190 @@
+# Path: /bedrock_chatbot_app/lib/retrieval_cache.py
+
+"""Knowledge Base 검색 결과를 (KB ID, 정규화 쿼리, 검색 설정) 기준으로 캐시하는 모듈"""
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from lib.bedrock_client import get_bedrock_agent_control_client
+from lib.config import config
+from lib.json_codec import dumps
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+TRAILING_PUNCTUATION = "?!.。？！ "
+
+
+def normalize_query(query):
+    """대소문자, 연속 공백, 끝 문장부호 차이를 무시하도록 쿼리를 정규화합니다"""
+    return WHITESPACE_PATTERN.sub(" ", (query or "").strip().lower()).rstrip(TRAILING_PUNCTUATION)
+
+
+def fetch_ingestion_version(knowledge_base_id):
+    """
+    KB의 데이터 소스별 최근 완료된 수집 작업 ID를 이어 붙인 버전 문자열을 반환합니다.
+
+    데이터 소스를 다시 동기화하면 작업 ID가 바뀌므로 캐시 무효화 기준으로 사용합니다.
+    """
+    client = get_bedrock_agent_control_client()
+    data_sources = client.list_data_sources(knowledgeBaseId=knowledge_base_id).get("dataSourceSummaries", [])
+
+    parts = []
+    for data_source in sorted(data_sources, key=lambda item: item["dataSourceId"]):
+        jobs = client.list_ingestion_jobs(
+            knowledgeBaseId=knowledge_base_id,
+            dataSourceId=data_source["dataSourceId"],
+            filters=[{"attribute": "STATUS", "operator": "EQ", "values": ["COMPLETE"]}],
+            sortBy={"attribute": "STARTED_AT", "order": "DESCENDING"},
+            maxResults=1
+        ).get("ingestionJobSummaries", [])
+        parts.append(f"{data_source['dataSourceId']}:{jobs[0]['ingestionJobId'] if jobs else '-'}")
+    return "|".join(parts)
+
+
+class RetrievalCache:
+    """
+    Retrieve API 결과를 보관하는 TTL + LRU 캐시
+
+    키는 (KB ID, KB 버전, 정규화된 쿼리, 검색 설정)이며, KB 버전은 데이터 소스 동기화(수집 작업)
+    시 갱신하여 이전 결과를 한 번에 무효화합니다. 결과 목록은 호출자가 수정하지 않는 것으로 간주하고
+    목록만 복사하여 반환합니다.
+
+    Attributes:
+        max_entries (int): 보관할 최대 항목 수
+        ttl_seconds (float): 항목 유효 시간(초)
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()   # key -> (만료 시각, 결과 목록)
+        self._versions = {}             # kb_id -> 버전
+        self._version_checked = {}      # kb_id -> 마지막 버전 확인 시각
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def _key(self, knowledge_base_id, query, retrieval_config):
+        config_key = dumps(retrieval_config.to_api(), sort_keys=True)
+        version = self._versions.get(knowledge_base_id, 0)
+        return (knowledge_base_id, version, normalize_query(query), config_key)
+
+    def get(self, knowledge_base_id, query, retrieval_config):
+        """
+        캐시된 검색 결과를 반환합니다.
+
+        Returns:
+            list or None: 검색 결과 목록 (없거나 만료되었으면 None)
+        """
+        with self._lock:
+            key = self._key(knowledge_base_id, query, retrieval_config)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self._expirations += 1
+                entry = None
+
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return list(entry[1])
+
+    def put(self, knowledge_base_id, query, retrieval_config, results):
+        """검색 결과를 저장합니다 (한도를 넘으면 가장 오래 사용하지 않은 항목부터 제거)"""
+        with self._lock:
+            key = self._key(knowledge_base_id, query, retrieval_config)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, list(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, knowledge_base_id=None):
+        """
+        캐시를 무효화합니다.
+
+        Args:
+            knowledge_base_id (str, optional): 무효화할 KB ID (없으면 전체)
+
+        Returns:
+            int: 제거된 항목 수
+        """
+        with self._lock:
+            if knowledge_base_id is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                keys = [key for key in self._entries if key[0] == knowledge_base_id]
+                for key in keys:
+                    del self._entries[key]
+                removed = len(keys)
+
+        logger.info(f"🧹 검색 캐시 무효화: {knowledge_base_id or '전체'} ({removed}개 항목)")
+        return removed
+
+    def set_version(self, knowledge_base_id, version):
+        """
+        KB 데이터 버전(예: 데이터 소스 동기화 작업 ID)을 지정합니다.
+
+        버전이 바뀌면 해당 KB의 이전 항목은 더 이상 조회되지 않으므로 함께 제거합니다.
+
+        Returns:
+            bool: 버전이 바뀌었는지 여부
+        """
+        with self._lock:
+            if self._versions.get(knowledge_base_id, 0) == version:
+                return False
+            self._versions[knowledge_base_id] = version
+
+        logger.info(f"🔄 KB 버전 변경: {knowledge_base_id} → {version}")
+        self.invalidate(knowledge_base_id)
+        return True
+
+    def refresh_version(self, knowledge_base_id, interval_seconds=None):
+        """
+        KB 데이터 소스의 최근 완료된 수집 작업을 조회하여 버전을 갱신합니다.
+
+        interval_seconds 안에 이미 확인했으면 조회하지 않으며, 조회에 실패하면 기존 버전을 유지합니다.
+
+        Args:
+            knowledge_base_id (str): 확인할 KB ID
+            interval_seconds (float, optional): 확인 주기 (없으면 config 값, 그것도 없으면 확인 안 함)
+        """
+        interval_seconds = interval_seconds or config.retrieval_cache_version_check_seconds
+        if not interval_seconds:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            if now - self._version_checked.get(knowledge_base_id, float("-inf")) < interval_seconds:
+                return
+            self._version_checked[knowledge_base_id] = now
+
+        try:
+            self.set_version(knowledge_base_id, fetch_ingestion_version(knowledge_base_id))
+        except Exception as e:
+            logger.warning(f"⚠️ KB 버전 확인 실패: {knowledge_base_id} ({str(e)})")
+
+    def stats(self):
+        """캐시 적중률 등 통계를 반환합니다"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations
+            }
+
+
+# 프로세스 전역 검색 캐시 (모든 세션이 공유)
+retrieval_cache = RetrievalCache(config.retrieval_cache_max_entries, config.retrieval_cache_ttl_seconds)
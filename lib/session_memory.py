@@ -0,0 +1,452 @@
+# Path: /bedrock_chatbot_app/lib/session_memory.py
+
+"""세션별/프로세스별 메모리 사용량을 제한하고 유휴 세션을 정리하는 모듈"""
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from lib.conversation import Conversation
+from lib.json_codec import dumpb
+from lib.trace_store import TraceStore, trace_store
+
+logger = logging.getLogger(__name__)
+
+# 기본 메모리 한도
+DEFAULT_SESSION_BUDGET_BYTES = 8 * 1024 * 1024     # 세션당 최대 크기 (8MB)
+DEFAULT_PROCESS_BUDGET_BYTES = 384 * 1024 * 1024   # 프로세스 전체 최대 크기 (384MB, 파드 한도 1Gi)
+DEFAULT_IDLE_TTL_SECONDS = 30 * 60                 # 유휴 세션 정리 기준 (30분)
+DEFAULT_KEEP_RECENT_MESSAGES = 20                  # 압축하지 않고 유지할 최근 메시지 수
+COMPRESS_MIN_BYTES = 512                           # 이보다 작은 메시지는 압축하지 않음
+
+# 세션 상태에서 메모리 관리 대상 키
+MANAGED_KEYS = ["chat_messages", "converse_history", "current_trace", "flow_extracted_data"]
+
+# 오래된 메시지를 내보낼 저장소 (세션 상태 밖의 작은 메모리 계층을 거쳐 디스크로 내보냄)
+# 화면은 다시 실행될 때마다 모든 메시지를 읽으므로, 최근에 내보낸 메시지는 메모리에서 바로 읽습니다.
+SPILL_MEMORY_BYTES = 16 * 1024 * 1024   # 내보낸 메시지를 메모리에 유지할 최대 크기 (16MB)
+SPILL_MEMORY_ITEMS = 2000               # 내보낸 메시지를 메모리에 유지할 최대 수
+
+message_spill_store = TraceStore(
+    max_memory_bytes=SPILL_MEMORY_BYTES,
+    max_memory_items=SPILL_MEMORY_ITEMS,
+    max_disk_items=20000,
+    spill_dir=os.path.join(tempfile.gettempdir(), "bedrock_chatbot_messages")
+)
+
+
+def estimate_size(obj):
+    """
+    객체의 대략적인 메모리 크기(바이트)를 추정합니다.
+
+    재귀 없이 스택으로 순회하며 각 객체의 sys.getsizeof를 더합니다. 컨테이너는 요소를,
+    일반 객체(Conversation, RagSession 등)는 __dict__와 __slots__ 속성을 따라가므로
+    객체가 참조하는 데이터까지 포함한 깊은 크기를 계산합니다. 여러 곳에서 참조하는 객체는 한 번만 셉니다.
+
+    Args:
+        obj: 크기를 추정할 객체
+
+    Returns:
+        int: 추정 바이트 수
+    """
+    total = 0
+    stack = [obj]
+    seen = set()
+
+    while stack:
+        item = stack.pop()
+        if item is None or id(item) in seen:
+            continue
+        seen.add(id(item))
+
+        total += sys.getsizeof(item)
+        if isinstance(item, (str, bytes, bytearray, int, float, bool)):
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        else:
+            attributes = getattr(item, "__dict__", None)
+            if isinstance(attributes, dict):
+                stack.append(attributes)
+            for slot in getattr(type(item), "__slots__", ()):
+                stack.append(getattr(item, slot, None))
+
+    return total
+
+
+def get_message_content(message):
+    """
+    압축되거나 디스크로 내보낸 메시지의 원래 내용을 반환합니다.
+
+    Args:
+        message (dict): 채팅 메시지
+
+    Returns:
+        str: 메시지 내용
+    """
+    if message.get("content") is not None:
+        return message["content"]
+
+    if "content_z" in message:
+        return zlib.decompress(message["content_z"]).decode("utf-8")
+
+    if "spill_ref" in message:
+        spilled = message_spill_store.get(message["spill_ref"])
+        if spilled is not None:
+            return spilled
+
+    return "(만료된 메시지입니다)"
+
+
+class SessionMemoryManager:
+    """
+    Streamlit 세션 상태의 메모리 사용량을 관리하는 클래스
+
+    세션이 실행될 때마다 enforce()를 호출하면 세션 크기를 측정하여 보고하고,
+    세션 한도를 넘으면 오래된 메시지를 압축한 뒤 디스크로 내보냅니다.
+    크기는 메시지 단위로 캐시하므로 재실행 시에는 새로 추가되거나 바뀐 메시지만 측정합니다.
+
+    세션 상태 자체는 Streamlit이 관리하므로 여기서는 세션이 참조하는 트레이스/메시지 저장소 항목만 정리합니다.
+    연결이 끊긴(is_session_active가 False인) 세션이 유휴 시간을 넘으면 참조를 해제하고,
+    저장소 항목은 참조하는 세션이 하나도 남지 않았을 때만 삭제합니다. 열려 있는 세션은 정리하지 않으며,
+    프로세스 전체 한도를 넘으면 연결이 끊긴 세션을 먼저 정리한 뒤 저장소의 메모리 항목을 디스크로 내보냅니다.
+
+    Attributes:
+        session_budget_bytes (int): 세션당 최대 크기
+        process_budget_bytes (int): 프로세스 전체 최대 크기
+        idle_ttl_seconds (float): 연결이 끊긴 세션을 정리하기까지의 유휴 시간
+        keep_recent_messages (int): 원본으로 유지할 최근 메시지 수
+        is_session_active (callable): 세션 ID로 세션이 아직 열려 있는지 확인하는 함수
+            (없으면 모든 세션을 열려 있는 것으로 보고 정리하지 않음)
+    """
+
+    def __init__(self, session_budget_bytes=DEFAULT_SESSION_BUDGET_BYTES,
+                 process_budget_bytes=DEFAULT_PROCESS_BUDGET_BYTES,
+                 idle_ttl_seconds=DEFAULT_IDLE_TTL_SECONDS,
+                 keep_recent_messages=DEFAULT_KEEP_RECENT_MESSAGES,
+                 is_session_active=None):
+        self.session_budget_bytes = session_budget_bytes
+        self.process_budget_bytes = process_budget_bytes
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.keep_recent_messages = keep_recent_messages
+        self.is_session_active = is_session_active
+
+        # session_id -> {"last_seen", "bytes", "trace_refs", "spill_refs"}
+        self._sessions = {}
+        self._evicted = set()
+        # 저장소 항목 ID -> 참조하는 세션 ID 집합
+        self._trace_owners = {}
+        self._spill_owners = {}
+        # session_id -> {id(항목): (항목, 크기)} (메시지 단위 크기 캐시)
+        self._size_cache = {}
+        self._lock = threading.Lock()
+
+    def enforce(self, session_id, state):
+        """
+        세션 상태의 크기를 측정하고 한도를 적용합니다.
+
+        Args:
+            session_id (str): 세션 식별자
+            state: 세션 상태 (st.session_state 등 딕셔너리형 객체)
+
+        Returns:
+            dict: 키별 크기와 합계를 담은 세션 사용량 보고서
+        """
+        with self._lock:
+            was_evicted = session_id in self._evicted
+            self._evicted.discard(session_id)
+
+        # 유휴 정리된 세션이 다시 접속한 경우 만료된 참조를 정리
+        if was_evicted:
+            logger.info(f"♻️ 유휴 정리된 세션 재접속: {session_id}")
+            self._drop_expired_refs(state)
+
+        report = self.footprint(state, session_id)
+        if report["total"] > self.session_budget_bytes:
+            logger.warning(f"⚠️ 세션 메모리 한도 초과: {session_id}, {report['total']} 바이트")
+            self._compact(state, session_id)
+            report = self.footprint(state, session_id)
+
+        trace_refs, spill_refs = self._collect_refs(state)
+        with self._lock:
+            previous = self._sessions.get(session_id) or {"trace_refs": (), "spill_refs": ()}
+            self._update_owners(self._trace_owners, session_id, previous["trace_refs"], trace_refs)
+            self._update_owners(self._spill_owners, session_id, previous["spill_refs"], spill_refs)
+            self._sessions[session_id] = {
+                "last_seen": time.time(),
+                "bytes": report["total"],
+                "trace_refs": trace_refs,
+                "spill_refs": spill_refs
+            }
+
+        self.evict_idle(exclude=session_id)
+        self._enforce_process_budget(exclude=session_id)
+
+        logger.debug(f"세션 메모리 사용량: {session_id}, {report}")
+        return report
+
+    def footprint(self, state, session_id=None):
+        """
+        세션 상태의 관리 대상 키별 크기를 추정합니다.
+
+        session_id를 지정하면 메시지 목록(chat_messages, Conversation)은 메시지 단위로 크기를 캐시하여
+        캐시에 없는 메시지만 측정합니다. 캐시는 현재 상태에 있는 메시지만 유지하며,
+        메시지를 제자리에서 수정한 경우 _forget_sizes()로 해당 항목을 지워야 합니다.
+
+        Args:
+            state: 세션 상태
+            session_id (str, optional): 크기 캐시를 사용할 세션 ID
+
+        Returns:
+            dict: 키별 크기와 합계
+        """
+        if session_id is None:
+            report = {key: estimate_size(state.get(key)) for key in MANAGED_KEYS}
+            report["total"] = sum(report.values())
+            return report
+
+        with self._lock:
+            cached = self._size_cache.get(session_id, {})
+        sizes = {}
+        report = {}
+
+        for key in MANAGED_KEYS:
+            value = state.get(key)
+            items = value.messages if isinstance(value, Conversation) else value
+            if not isinstance(items, list):
+                report[key] = estimate_size(value)
+                continue
+
+            total = sys.getsizeof(items) + (sys.getsizeof(value) if items is not value else 0)
+            for item in items:
+                entry = sizes.get(id(item)) or cached.get(id(item))
+                if entry is None:
+                    entry = (item, estimate_size(item))
+                sizes[id(item)] = entry
+                total += entry[1]
+            report[key] = total
+
+        with self._lock:
+            self._size_cache[session_id] = sizes
+        report["total"] = sum(report.values())
+        return report
+
+    def process_footprint(self):
+        """
+        추적 중인 세션과 트레이스/메시지 저장소의 메모리 사용량을 반환합니다.
+
+        세션 크기는 각 세션이 마지막으로 측정된 값입니다.
+        """
+        with self._lock:
+            sessions_bytes = sum(info["bytes"] for info in self._sessions.values())
+            session_count = len(self._sessions)
+        trace_bytes = trace_store.stats()["memory_bytes"]
+        spill_bytes = message_spill_store.stats()["memory_bytes"]
+
+        return {
+            "sessions": session_count,
+            "sessions_bytes": sessions_bytes,
+            "trace_store_bytes": trace_bytes,
+            "message_spill_bytes": spill_bytes,
+            "total": sessions_bytes + trace_bytes + spill_bytes
+        }
+
+    def evict_idle(self, exclude=None):
+        """
+        연결이 끊기고 유휴 시간이 TTL을 넘은 세션을 정리합니다.
+
+        연결이 끊긴 세션은 TTL 전이라도 크기 캐시를 비워 메시지를 붙잡지 않습니다.
+
+        Args:
+            exclude (str, optional): 정리 대상에서 제외할 세션 ID
+
+        Returns:
+            list: 정리된 세션 ID 목록
+        """
+        deadline = time.time() - self.idle_ttl_seconds
+        with self._lock:
+            sessions = [(sid, info["last_seen"]) for sid, info in self._sessions.items() if sid != exclude]
+
+        evicted = []
+        for session_id, last_seen in sessions:
+            if self._is_active(session_id):
+                continue
+            with self._lock:
+                self._size_cache.pop(session_id, None)
+            if last_seen < deadline:
+                self.evict(session_id)
+                evicted.append(session_id)
+        return evicted
+
+    def evict(self, session_id):
+        """
+        세션의 저장소 참조를 해제하고 추적 대상에서 제거합니다.
+
+        다른 세션이 참조하지 않게 된 트레이스/메시지 저장소 항목만 삭제합니다.
+
+        Returns:
+            int: 삭제한 저장소 항목 수
+        """
+        with self._lock:
+            info = self._sessions.pop(session_id, None)
+            self._size_cache.pop(session_id, None)
+            if info is None:
+                return 0
+            self._evicted.add(session_id)
+            unused_traces = self._update_owners(self._trace_owners, session_id, info["trace_refs"], ())
+            unused_spills = self._update_owners(self._spill_owners, session_id, info["spill_refs"], ())
+
+        for trace_id in unused_traces:
+            trace_store.delete(trace_id)
+        for spill_id in unused_spills:
+            message_spill_store.delete(spill_id)
+
+        released = len(unused_traces) + len(unused_spills)
+        logger.info(f"🧹 세션 정리: {session_id}, 저장소 항목 {released}개 삭제")
+        return released
+
+    def _is_active(self, session_id):
+        """세션이 아직 열려 있는지 확인합니다 (확인할 수 없으면 열려 있는 것으로 봄)"""
+        if self.is_session_active is None:
+            return True
+        try:
+            return self.is_session_active(session_id)
+        except Exception as e:
+            logger.warning(f"세션 상태 확인 실패: {str(e)}")
+            return True
+
+    def _enforce_process_budget(self, exclude=None):
+        """
+        프로세스 한도를 넘으면 연결이 끊긴 세션을 오래된 순으로 정리하고,
+        그래도 넘으면 저장소의 메모리 항목을 디스크로 내보냅니다.
+        """
+        excess = self.process_footprint()["total"] - self.process_budget_bytes
+        if excess <= 0:
+            return
+
+        with self._lock:
+            candidates = sorted(
+                (info["last_seen"], sid) for sid, info in self._sessions.items() if sid != exclude
+            )
+        for _, session_id in candidates:
+            if self._is_active(session_id):
+                continue
+            self.evict(session_id)
+            excess = self.process_footprint()["total"] - self.process_budget_bytes
+            if excess <= 0:
+                return
+
+        # 저장소 항목은 열린 세션이 참조할 수 있으므로 삭제하지 않고 디스크로 옮김
+        for store in (message_spill_store, trace_store):
+            excess -= store.spill_memory(excess)
+            if excess <= 0:
+                return
+
+        logger.warning(f"⚠️ 프로세스 메모리 한도 초과, 열린 세션만 남아 정리할 수 없음: {excess} 바이트 초과")
+
+    def _compact(self, state, session_id=None):
+        """오래된 메시지를 압축하고, 그래도 한도를 넘으면 디스크로 내보냅니다"""
+        messages = state.get("chat_messages") or []
+        old_messages = messages[:-self.keep_recent_messages] if self.keep_recent_messages else messages
+
+        # 1단계: 오래된 메시지 압축
+        changed = []
+        for message in old_messages:
+            content = message.get("content")
+            if isinstance(content, str) and len(content) >= COMPRESS_MIN_BYTES:
+                message["content_z"] = zlib.compress(content.encode("utf-8"))
+                message["content"] = None
+                changed.append(message)
+        self._forget_sizes(session_id, changed)
+
+        if self.footprint(state, session_id)["total"] <= self.session_budget_bytes:
+            return
+
+        # 2단계: 오래된 메시지부터 세션 상태 밖으로 내보내기 (트레이스용 길이 제한 없이 원문 그대로 저장)
+        changed = []
+        for message in old_messages:
+            if message.get("content") is None and "spill_ref" not in message:
+                message["spill_ref"] = message_spill_store.put_payload(dumpb(get_message_content(message)))
+                message.pop("content_z", None)
+                changed.append(message)
+            elif isinstance(message.get("content"), str):
+                message["spill_ref"] = message_spill_store.put_payload(dumpb(message["content"]))
+                message["content"] = None
+                changed.append(message)
+        self._forget_sizes(session_id, changed)
+
+        if self.footprint(state, session_id)["total"] <= self.session_budget_bytes:
+            return
+
+        # 3단계: Converse 대화 기록의 가장 오래된 턴 제거 (마지막 수단)
+        history = Conversation.from_history(state.get("converse_history"))
+        while len(history) > 2 and estimate_size(history) > self.session_budget_bytes // 2:
+            history = history.tail(len(history) - 2)
+            logger.warning("⚠️ 세션 메모리 한도로 가장 오래된 Converse 대화 턴 제거")
+        state["converse_history"] = history
+
+    def _forget_sizes(self, session_id, items):
+        """제자리에서 수정한 항목의 캐시된 크기를 지웁니다"""
+        if session_id is None or not items:
+            return
+        with self._lock:
+            cached = self._size_cache.get(session_id)
+            if cached:
+                for item in items:
+                    cached.pop(id(item), None)
+
+    @staticmethod
+    def _update_owners(owners, session_id, old_refs, new_refs):
+        """
+        잠금을 보유한 상태에서 세션의 참조 목록 변경을 반영합니다.
+
+        Returns:
+            list: 해제되어 참조하는 세션이 없어진 항목 ID 목록
+        """
+        unused = []
+        for ref in set(old_refs) - set(new_refs):
+            sessions = owners.get(ref)
+            if sessions is None:
+                continue
+            sessions.discard(session_id)
+            if not sessions:
+                del owners[ref]
+                unused.append(ref)
+        for ref in new_refs:
+            owners.setdefault(ref, set()).add(session_id)
+        return unused
+
+    @staticmethod
+    def _collect_refs(state):
+        """세션이 참조하는 트레이스/메시지 저장소 ID를 수집합니다"""
+        trace_refs, spill_refs = set(), set()
+        for message in state.get("chat_messages") or []:
+            if message.get("trace_ref"):
+                trace_refs.add(message["trace_ref"])
+            if message.get("spill_ref"):
+                spill_refs.add(message["spill_ref"])
+
+        current_trace = state.get("current_trace")
+        if isinstance(current_trace, dict) and current_trace.get("trace_id"):
+            trace_refs.add(current_trace["trace_id"])
+        return trace_refs, spill_refs
+
+    @staticmethod
+    def _drop_expired_refs(state):
+        """저장소에서 삭제된 트레이스 참조를 세션 상태에서 제거합니다"""
+        for message in state.get("chat_messages") or []:
+            if message.get("trace_ref") and message["trace_ref"] not in trace_store:
+                message.pop("trace_ref")
+
+        current_trace = state.get("current_trace")
+        if isinstance(current_trace, dict) and current_trace.get("trace_id") not in trace_store:
+            state["current_trace"] = None
+
+
+# 프로세스 전역 세션 메모리 관리자
+session_memory = SessionMemoryManager()
@@ -0,0 +1,48 @@
+# Path: /bedrock_chatbot_app/lib/stream_decoder.py
+
+"""
+이벤트 스트림의 바이트 조각을 복사와 문자 깨짐 없이 텍스트로 변환하는 모듈
+
+바이트 조각으로 텍스트가 도착하는 곳은 Agent 응답 스트림(completion의 chunk)뿐입니다.
+Converse 스트림의 텍스트 델타는 이미 문자열이고, Flow/InvokeModel 응답과 트레이스 이벤트는
+완성된 JSON 문서이므로 lib.json_codec.loads에 bytes를 그대로 전달합니다.
+"""
+
+# 버퍼 초기 크기 (긴 응답은 두 배씩 확장)
+DEFAULT_BUFFER_CAPACITY = 64 * 1024
+
+
+class StreamTextDecoder:
+    """
+    스트림으로 도착하는 UTF-8 바이트 조각을 이어 붙여 텍스트로 변환하는 클래스
+
+    바이트는 미리 할당한 bytearray에 memoryview로 복사하여 조각마다 문자열을 만들지 않으며,
+    전체 텍스트는 마지막에 한 번만 디코딩하므로 조각 경계에서 나뉜 한글 등 멀티바이트 문자가 깨지지 않습니다.
+    """
+
+    def __init__(self, capacity=DEFAULT_BUFFER_CAPACITY):
+        self._buffer = bytearray(capacity)
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def _append(self, data):
+        """버퍼 끝에 바이트를 복사합니다 (부족하면 두 배로 확장)"""
+        end = self._length + len(data)
+        if end > len(self._buffer):
+            grown = bytearray(max(end, len(self._buffer) * 2))
+            grown[:self._length] = memoryview(self._buffer)[:self._length]
+            self._buffer = grown
+        self._buffer[self._length:end] = data
+        self._length = end
+
+    def feed(self, data):
+        """바이트 조각을 버퍼에 추가합니다"""
+        if data:
+            self._append(data)
+
+    def getvalue(self):
+        """지금까지 받은 전체 바이트를 텍스트로 반환합니다 (중간 bytes 복사 없이 디코딩)"""
+        return str(memoryview(self._buffer)[:self._length], "utf-8", "replace")
+
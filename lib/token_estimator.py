@@ -0,0 +1,195 @@
+# Path: /bedrock_chatbot_app/lib/token_estimator.py
+
+"""모델 호출 전에 로컬에서 토큰 수를 추정하고 요청 크기를 사전 점검하는 모듈"""
+import logging
+import threading
+from collections import OrderedDict
+from lib.config import MODEL_OPTIONS
+from lib.metrics import MAX_TOKENS_CLAMPED_TOTAL, PREFLIGHT_REJECTED_TOTAL, REQUEST_INPUT_TOKENS
+
+logger = logging.getLogger(__name__)
+
+# 모델 계열별 추정 비율 (ASCII 문자당 토큰, 비ASCII 문자당 토큰)
+# 한글 등 멀티바이트 문자는 영문보다 토큰 밀도가 높아 따로 계산합니다.
+TOKEN_RATIOS = {
+    "anthropic.claude": (0.28, 1.0),
+    "amazon.titan": (0.25, 1.2),
+}
+DEFAULT_TOKEN_RATIO = (0.3, 1.2)
+
+# 메시지별 구조 오버헤드 (역할 표시 등)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# 사전 점검 기본값
+DEFAULT_MAX_TOKENS = 1024          # 요청자가 지정하지 않은 경우의 출력 토큰 수
+MIN_OUTPUT_TOKENS = 64             # 이보다 적은 출력만 가능하면 요청을 보내지 않음
+SAFETY_MARGIN_RATIO = 0.05         # 추정 오차를 고려한 컨텍스트 여유분
+DEFAULT_CONTEXT_WINDOW = 8192
+DEFAULT_MAX_OUTPUT_TOKENS = 4096
+
+
+class RequestTooLargeError(ValueError):
+    """요청이 모델 컨텍스트 한도를 넘어 전송 전에 거부된 경우 발생하는 예외"""
+
+
+def _ratio_for(model_id):
+    """모델 ID에 해당하는 추정 비율을 반환합니다"""
+    if model_id:
+        for prefix, ratio in TOKEN_RATIOS.items():
+            if prefix in model_id:
+                return ratio
+    return DEFAULT_TOKEN_RATIO
+
+
+# 텍스트별 추정 결과 캐시 (원문을 붙잡지 않도록 문자열 해시와 길이를 키로 사용)
+ESTIMATE_CACHE_SIZE = 8192
+_estimate_cache = OrderedDict()
+_estimate_cache_lock = threading.Lock()
+
+
+def _estimate(text, ratio):
+    """UTF-8 길이와 문자 수의 차이로 텍스트의 토큰 수를 추정합니다"""
+    char_count = len(text)
+    extra_bytes = len(text.encode("utf-8")) - char_count
+    # 한글(3바이트)은 문자당 2바이트가 추가되므로 절반으로 비ASCII 문자 수를 근사
+    non_ascii = min(char_count, (extra_bytes + 1) // 2)
+    ascii_count = char_count - non_ascii
+
+    ascii_ratio, non_ascii_ratio = ratio
+    return int(ascii_count * ascii_ratio + non_ascii * non_ascii_ratio) + 1
+
+
+def _estimate_cached(text, ratio):
+    """
+    텍스트별 추정 결과를 캐시합니다.
+
+    키는 (문자열 해시, 길이, 비율)이므로 캐시가 긴 대화 텍스트를 메모리에 붙잡지 않으며,
+    문자열 해시는 객체에 캐시되므로 같은 문자열의 재조회 비용이 작습니다.
+    """
+    key = (hash(text), len(text), ratio)
+    with _estimate_cache_lock:
+        tokens = _estimate_cache.get(key)
+        if tokens is not None:
+            _estimate_cache.move_to_end(key)
+            return tokens
+
+    tokens = _estimate(text, ratio)
+    with _estimate_cache_lock:
+        _estimate_cache[key] = tokens
+        if len(_estimate_cache) > ESTIMATE_CACHE_SIZE:
+            _estimate_cache.popitem(last=False)
+    return tokens
+
+
+def estimate_tokens(text, model_id=None):
+    """
+    텍스트의 토큰 수를 추정합니다.
+
+    UTF-8 인코딩 길이와 문자 수의 차이로 비ASCII 문자 수를 계산하므로
+    문자 단위 순회 없이 빠르게 동작하며, 같은 텍스트는 캐시된 결과를 사용합니다.
+
+    Args:
+        text (str): 추정할 텍스트
+        model_id (str, optional): 대상 모델 ID
+
+    Returns:
+        int: 추정 토큰 수
+    """
+    if not text:
+        return 0
+    return _estimate_cached(text, _ratio_for(model_id))
+
+
+def estimate_message_tokens(message, model_id=None):
+    """
+    Converse 형식 메시지의 토큰 수를 추정합니다 (텍스트 블록 기준).
+
+    대화 기록의 메시지는 턴마다 반복해서 추정되지만 블록 텍스트별 캐시로 한 번만 계산됩니다.
+
+    Args:
+        message (dict): {"role": ..., "content": [블록, ...]} 형식 메시지
+        model_id (str, optional): 대상 모델 ID
+
+    Returns:
+        int: 추정 토큰 수
+    """
+    content = message.get("content", [])
+    if isinstance(content, str):
+        return estimate_tokens(content, model_id) + MESSAGE_OVERHEAD_TOKENS
+
+    tokens = MESSAGE_OVERHEAD_TOKENS
+    for block in content:
+        if "text" in block:
+            tokens += estimate_tokens(block["text"], model_id)
+        elif "cachePoint" in block:
+            continue
+        else:
+            # 도구 사용 등 텍스트 외 블록은 직렬화 길이로 근사
+            tokens += estimate_tokens(str(block), model_id)
+    return tokens
+
+
+def estimate_request_tokens(messages, system=None, model_id=None):
+    """
+    메시지 목록과 시스템 프롬프트를 합한 요청 입력 토큰 수를 추정합니다.
+
+    Args:
+        messages (list): Converse 형식 메시지 목록
+        system (list, optional): 시스템 프롬프트 블록 목록
+        model_id (str, optional): 대상 모델 ID
+
+    Returns:
+        int: 추정 입력 토큰 수
+    """
+    tokens = sum(estimate_message_tokens(msg, model_id) for msg in messages)
+    for block in system or []:
+        tokens += estimate_tokens(block.get("text", ""), model_id)
+    return tokens
+
+
+def get_model_limits(model_id):
+    """모델의 (컨텍스트 크기, 최대 출력 토큰 수)를 반환합니다"""
+    options = MODEL_OPTIONS.get(model_id, {})
+    return (
+        options.get("context_window", DEFAULT_CONTEXT_WINDOW),
+        options.get("max_output_tokens", DEFAULT_MAX_OUTPUT_TOKENS)
+    )
+
+
+def preflight(model_id, input_tokens, max_tokens=None, label="요청", operation="unknown"):
+    """
+    요청 전송 전에 크기를 점검하고 사용할 max_tokens를 결정합니다.
+
+    요청한 출력 토큰 수(없으면 기본값)를 모델의 최대 출력 토큰 수와 남은 컨텍스트에 맞춰 줄이며,
+    남은 컨텍스트가 너무 작으면 네트워크 호출 없이 즉시 실패합니다.
+
+    Args:
+        model_id (str): 호출할 모델 ID
+        input_tokens (int): 추정 입력 토큰 수
+        max_tokens (int, optional): 요청한 최대 출력 토큰 수
+        label (str): 로그에 표시할 요청 이름
+        operation (str): 메트릭 operation 레이블 (추정 입력 크기, 거부/조정 횟수 집계)
+
+    Returns:
+        int: 실제로 사용할 max_tokens
+
+    Raises:
+        RequestTooLargeError: 입력이 컨텍스트 한도를 넘는 경우
+    """
+    context_window, max_output_tokens = get_model_limits(model_id)
+    available = int(context_window * (1 - SAFETY_MARGIN_RATIO)) - input_tokens
+    REQUEST_INPUT_TOKENS.observe(input_tokens, operation=operation, model=model_id)
+
+    if available < MIN_OUTPUT_TOKENS:
+        PREFLIGHT_REJECTED_TOTAL.inc(operation=operation, model=model_id)
+        raise RequestTooLargeError(
+            f"요청이 너무 큽니다: 추정 입력 {input_tokens} 토큰, 모델 컨텍스트 {context_window} 토큰"
+        )
+
+    sized_max_tokens = min(max_tokens or DEFAULT_MAX_TOKENS, max_output_tokens, available)
+    if max_tokens and sized_max_tokens < max_tokens:
+        MAX_TOKENS_CLAMPED_TOTAL.inc(operation=operation, model=model_id)
+        logger.info(f"📏 {label} max_tokens 조정: {max_tokens} → {sized_max_tokens}")
+
+    logger.info(f"📏 {label} 크기: 추정 입력 {input_tokens} 토큰, max_tokens {sized_max_tokens}")
+    return sized_max_tokens
@@ -0,0 +1,208 @@
+# Path: /bedrock_chatbot_app/lib/trace_store.py
+
+"""메시지별 트레이스를 세션 상태 밖에 보관하는 저장소 모듈"""
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from lib.json_codec import loads
+from lib.trace_utils import serialize_json
+
+logger = logging.getLogger(__name__)
+
+# 기본 저장소 한도
+DEFAULT_MAX_MEMORY_BYTES = 64 * 1024 * 1024   # 메모리에 유지할 최대 직렬화 크기 (64MB)
+DEFAULT_MAX_MEMORY_ITEMS = 200                # 메모리에 유지할 최대 트레이스 수
+DEFAULT_MAX_DISK_ITEMS = 2000                 # 디스크에 보관할 최대 트레이스 수
+DEFAULT_SPILL_DIR = os.path.join(tempfile.gettempdir(), "bedrock_chatbot_traces")
+
+
+class TraceStore:
+    """
+    트레이스를 ID별로 보관하는 크기 제한 저장소
+
+    트레이스는 직렬화된 바이트로 메모리에 보관되며, 한도를 넘으면 가장 오래 사용되지 않은
+    항목부터 디스크로 내보냅니다. 채팅 메시지에는 트레이스 ID만 저장하고,
+    실제 데이터는 화면에 표시할 때만 역직렬화합니다.
+
+    Attributes:
+        max_memory_bytes (int): 메모리에 유지할 최대 바이트 수
+        max_memory_items (int): 메모리에 유지할 최대 항목 수
+        max_disk_items (int): 디스크에 보관할 최대 항목 수
+        spill_dir (str): 디스크로 내보낸 트레이스를 저장할 디렉터리
+    """
+
+    def __init__(self, max_memory_bytes=DEFAULT_MAX_MEMORY_BYTES, max_memory_items=DEFAULT_MAX_MEMORY_ITEMS,
+                 max_disk_items=DEFAULT_MAX_DISK_ITEMS, spill_dir=DEFAULT_SPILL_DIR):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self.spill_dir = spill_dir
+
+        self._memory = OrderedDict()   # trace_id -> 직렬화된 bytes
+        self._memory_bytes = 0
+        self._spilled = OrderedDict()  # trace_id -> 파일 경로
+        self._lock = threading.Lock()
+
+    def put(self, trace_record, trace_id=None):
+        """
+        트레이스를 저장하고 참조용 ID를 반환합니다.
+
+        Args:
+            trace_record: 저장할 트레이스 (크기 한도 안에서 JSON으로 직렬화됨)
+            trace_id (str, optional): 사용할 ID (없으면 새로 생성)
+
+        Returns:
+            str: 저장된 트레이스의 ID
+        """
+        _, payload = serialize_json(trace_record)
+        return self.put_payload(payload, trace_id)
+
+    def put_payload(self, payload, trace_id=None):
+        """
+        이미 직렬화된 트레이스(UTF-8 JSON bytes)를 저장하고 참조용 ID를 반환합니다.
+
+        Args:
+            payload (bytes): serialize_json()으로 직렬화한 트레이스
+            trace_id (str, optional): 사용할 ID (없으면 새로 생성)
+
+        Returns:
+            str: 저장된 트레이스의 ID
+        """
+        trace_id = trace_id or uuid.uuid4().hex
+
+        with self._lock:
+            self._discard(trace_id)
+            self._memory[trace_id] = payload
+            self._memory_bytes += len(payload)
+            self._enforce_limits()
+
+        logger.debug(f"트레이스 저장: id={trace_id}, 크기={len(payload)} 바이트")
+        return trace_id
+
+    def get(self, trace_id):
+        """
+        트레이스를 역직렬화하여 반환합니다.
+
+        Args:
+            trace_id (str): 트레이스 ID
+
+        Returns:
+            트레이스 데이터 또는 None (없는 경우)
+        """
+        payload = self.get_payload(trace_id)
+        if payload is None:
+            return None
+        return loads(payload)
+
+    def get_payload(self, trace_id):
+        """
+        직렬화된 트레이스(UTF-8 JSON bytes)를 역직렬화하지 않고 반환합니다.
+
+        Args:
+            trace_id (str): 트레이스 ID
+
+        Returns:
+            bytes or None: 직렬화된 트레이스 (없거나 읽기에 실패한 경우 None)
+        """
+        if not trace_id:
+            return None
+
+        with self._lock:
+            payload = self._memory.get(trace_id)
+            if payload is not None:
+                self._memory.move_to_end(trace_id)
+            path = self._spilled.get(trace_id)
+
+        if payload is None and path:
+            try:
+                with open(path, "rb") as f:
+                    payload = f.read()
+            except OSError as e:
+                logger.warning(f"⚠️ 디스크 트레이스 읽기 실패: {str(e)}")
+                return None
+
+        return payload
+
+    def delete(self, trace_id):
+        """트레이스를 메모리와 디스크에서 삭제합니다"""
+        with self._lock:
+            self._discard(trace_id)
+
+    def spill_memory(self, max_bytes):
+        """
+        가장 오래 사용되지 않은 메모리 항목부터 디스크로 내보냅니다 (항목은 삭제하지 않음).
+
+        Args:
+            max_bytes (int): 메모리에서 줄일 목표 바이트 수
+
+        Returns:
+            int: 실제로 줄어든 메모리 바이트 수
+        """
+        released = 0
+        with self._lock:
+            while self._memory and released < max_bytes:
+                trace_id, payload = self._memory.popitem(last=False)
+                self._memory_bytes -= len(payload)
+                released += len(payload)
+                self._spill(trace_id, payload)
+        return released
+
+    def __contains__(self, trace_id):
+        with self._lock:
+            return trace_id in self._memory or trace_id in self._spilled
+
+    def stats(self):
+        """저장소 사용량 정보를 반환합니다"""
+        with self._lock:
+            return {
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_items": len(self._spilled)
+            }
+
+    def _discard(self, trace_id):
+        """잠금을 보유한 상태에서 항목을 제거합니다"""
+        payload = self._memory.pop(trace_id, None)
+        if payload is not None:
+            self._memory_bytes -= len(payload)
+
+        path = self._spilled.pop(trace_id, None)
+        if path:
+            self._remove_file(path)
+
+    def _enforce_limits(self):
+        """잠금을 보유한 상태에서 메모리/디스크 한도를 맞춥니다"""
+        while self._memory and (len(self._memory) > self.max_memory_items or
+                                self._memory_bytes > self.max_memory_bytes):
+            trace_id, payload = self._memory.popitem(last=False)
+            self._memory_bytes -= len(payload)
+            self._spill(trace_id, payload)
+
+        while len(self._spilled) > self.max_disk_items:
+            _, path = self._spilled.popitem(last=False)
+            self._remove_file(path)
+
+    def _spill(self, trace_id, payload):
+        """트레이스를 디스크로 내보냅니다 (실패하면 버림)"""
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            path = os.path.join(self.spill_dir, f"{trace_id}.json")
+            with open(path, "wb") as f:
+                f.write(payload)
+            self._spilled[trace_id] = path
+        except OSError as e:
+            logger.warning(f"⚠️ 트레이스 디스크 저장 실패, 항목 삭제: {str(e)}")
+
+    @staticmethod
+    def _remove_file(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# 프로세스 전역 트레이스 저장소
+trace_store = TraceStore()
@@ -6,44 +6,343 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-def ensure_json_serializable(obj):
+# 직렬화 한도 기본값
+DEFAULT_MAX_DEPTH = 64                        # 최대 중첩 깊이
+DEFAULT_MAX_STRING_LENGTH = 32 * 1024         # 문자열 최대 길이 (문자 수)
+DEFAULT_MAX_BYTES_LENGTH = 64 * 1024          # bytes 값 최대 길이 (바이트 수)
+DEFAULT_MAX_TOTAL_BYTES = 8 * 1024 * 1024     # 직렬화 결과 최대 크기 (근사, 문자 수 기준)
+
+# 잘린 위치를 표시하는 마커
+TRUNCATION_MARKER = "…[truncated]"
+DEPTH_MARKER = "…[max depth]"
+SIZE_MARKER = "…[max size]"
+CIRCULAR_MARKER = "…[circular]"
+
+_encode_string = json.encoder.encode_basestring
+
+
+def _add_value(parent, key, value):
+    """부모 컨테이너(리스트 또는 딕셔너리)에 값을 추가합니다"""
+    container = parent[0]
+    if isinstance(container, list):
+        container.append(value)
+    else:
+        container[key] = value
+
+
+def _truncate(parts, parent, key, prefix):
+    """크기 한도에 걸린 값을 SIZE_MARKER로 대체하고 같은 컨테이너의 나머지 항목을 생략하게 합니다"""
+    parent[1] = True
+    parts.append(prefix + _encode_string(SIZE_MARKER))
+    _add_value(parent, key, SIZE_MARKER)
+
+
+def serialize_json(obj, max_depth=DEFAULT_MAX_DEPTH, max_string_length=DEFAULT_MAX_STRING_LENGTH,
+                   max_bytes_length=DEFAULT_MAX_BYTES_LENGTH, max_total_bytes=DEFAULT_MAX_TOTAL_BYTES):
     """
-    객체가 JSON 직렬화 가능하도록 변환합니다.
+    객체를 JSON 직렬화 가능한 구조와 UTF-8 JSON 바이트로 한 번에 변환합니다.
+    
+    재귀 대신 명시적 스택으로 순회하므로 깊은 트레이스에서도 재귀 한도에 걸리지 않으며,
+    한도를 넘는 부분은 마커 문자열로 대체합니다.
+    - 깊이 초과: DEPTH_MARKER, 문자열/bytes 길이 초과: 앞부분 + TRUNCATION_MARKER
+    - 전체 크기 초과: 해당 값을 SIZE_MARKER로 바꾸고 같은 컨테이너의 나머지 항목은 생략
+      (닫는 괄호와 마커만큼은 한도를 넘을 수 있음)
+    - 순환 참조: CIRCULAR_MARKER
+    같은 객체가 여러 번 나오면(병합된 트레이스의 공유 하위 트리 등) 처음 변환한 구조와
+    인코딩 조각을 재사용합니다. 재사용한 조각도 남은 크기와 깊이 한도를 지켜야 하며,
+    크기가 맞지 않으면 SIZE_MARKER로, 더 깊은 위치에서 나오면 다시 변환합니다. bytes는 JSON으로 다시 파싱하지 않고 UTF-8 텍스트로 변환합니다.
     
     Args:
         obj: 변환할 객체
+        max_depth (int): 최대 중첩 깊이
+        max_string_length (int): 문자열 최대 길이
+        max_bytes_length (int): bytes 값 최대 길이
+        max_total_bytes (int): 직렬화 결과 최대 크기
         
     Returns:
-        JSON 직렬화 가능한 객체
+        tuple: (JSON 직렬화 가능한 객체, 압축 JSON bytes)
     """
-    if obj is None:
-        return None
+    parts = []
+    size = 0
+    memo = {}        # id(컨테이너) -> (변환된 컨테이너, 시작 조각, 끝 조각, 크기, 깊이)
+    active = set()   # 변환 중인 컨테이너 id (순환 참조 감지)
+    root = [{}, False]
     
-    if isinstance(obj, (str, int, float, bool)):
-        return obj
+    # 스택 항목: (객체, 깊이, 부모 상태 [컨테이너, 잘림 여부], 키, 접두 문자열)
+    # 컨테이너 종료 항목: (None, 종료 정보, None, None, 닫는 문자열)
+    stack = [(obj, 0, root, "value", "")]
     
-    if isinstance(obj, dict):
-        return {k: ensure_json_serializable(v) for k, v in obj.items()}
+    while stack:
+        value, depth, parent, key, prefix = stack.pop()
+        
+        # 컨테이너 종료: 닫는 괄호 출력 후 메모에 기록
+        if parent is None:
+            obj_id, container, start_part, start_size, container_depth = depth
+            parts.append(prefix)
+            size += 1
+            active.discard(obj_id)
+            memo[obj_id] = (container, start_part, len(parts), size - start_size, container_depth)
+            continue
+        
+        # 같은 컨테이너에서 이미 크기 한도로 잘렸으면 나머지 항목 생략
+        if parent[1]:
+            continue
+        
+        if size >= max_total_bytes:
+            _truncate(parts, parent, key, prefix)
+            continue
+        
+        # 재사용할 하위 트리가 남은 크기 한도에 맞지 않으면 마커로 대체
+        cached = memo.get(id(value)) if isinstance(value, (dict, list, tuple, set)) else None
+        if cached is not None and size + len(prefix) + cached[3] > max_total_bytes:
+            _truncate(parts, parent, key, prefix)
+            continue
+        
+        if prefix:
+            parts.append(prefix)
+            size += len(prefix)
+        
+        # 기본 타입
+        if value is None or value is True or value is False:
+            _add_value(parent, key, value)
+            encoded = "null" if value is None else ("true" if value else "false")
+            parts.append(encoded)
+            size += len(encoded)
+            continue
+        
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            if isinstance(value, float) and (value != value or value in (float("inf"), float("-inf"))):
+                value = None
+                encoded = "null"
+            else:
+                encoded = int.__repr__(value) if isinstance(value, int) else float.__repr__(value)
+            _add_value(parent, key, value)
+            parts.append(encoded)
+            size += len(encoded)
+            continue
+        
+        # 컨테이너
+        if isinstance(value, (dict, list, tuple, set)):
+            obj_id = id(value)
+            if obj_id in active:
+                _add_value(parent, key, CIRCULAR_MARKER)
+                encoded = _encode_string(CIRCULAR_MARKER)
+                parts.append(encoded)
+                size += len(encoded)
+                continue
+            
+            # 처음 변환한 위치보다 깊지 않을 때만 재사용 (더 깊으면 깊이 한도를 다시 적용)
+            if cached is not None and depth <= cached[4]:
+                container, start_part, end_part, cached_size, _ = cached
+                _add_value(parent, key, container)
+                parts.extend(parts[start_part:end_part])
+                size += cached_size
+                continue
+            
+            if depth >= max_depth:
+                _add_value(parent, key, DEPTH_MARKER)
+                encoded = _encode_string(DEPTH_MARKER)
+                parts.append(encoded)
+                size += len(encoded)
+                continue
+            
+            start_part, start_size = len(parts), size
+            active.add(obj_id)
+            
+            if isinstance(value, dict):
+                container = {}
+                parts.append("{")
+                children = [
+                    (child, depth + 1, None, child_key if isinstance(child_key, str) else str(child_key))
+                    for child_key, child in value.items()
+                ]
+                closing = "}"
+            else:
+                container = []
+                parts.append("[")
+                children = [(child, depth + 1, None, None) for child in value]
+                closing = "]"
+            size += 1
+            _add_value(parent, key, container)
+            
+            state = [container, False]
+            stack.append((None, (obj_id, container, start_part, start_size, depth), None, None, closing))
+            for index in range(len(children) - 1, -1, -1):
+                child, child_depth, _, child_key = children[index]
+                separator = "," if index else ""
+                child_prefix = separator + (_encode_string(child_key) + ":" if child_key is not None else "")
+                stack.append((child, child_depth, state, child_key, child_prefix))
+            continue
+        
+        # 문자열 (bytes는 UTF-8 텍스트로, 그 외 타입은 str()로 변환)
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            raw = bytes(value[:max_bytes_length])
+            text = raw.decode("utf-8", "replace")
+            if len(value) > max_bytes_length:
+                text += TRUNCATION_MARKER
+        else:
+            text = value if isinstance(value, str) else str(value)
+            if len(text) > max_string_length:
+                text = text[:max_string_length] + TRUNCATION_MARKER
+        
+        encoded = _encode_string(text)
+        if size + len(encoded) > max_total_bytes:
+            # 접두 문자열은 이미 출력했으므로 값 자리에 마커만 출력
+            _truncate(parts, parent, key, "")
+            continue
+        _add_value(parent, key, text)
+        parts.append(encoded)
+        size += len(encoded)
     
-    if isinstance(obj, list):
-        return [ensure_json_serializable(i) for i in obj]
+    return root[0]["value"], "".join(parts).encode("utf-8")
+
+
+def ensure_json_serializable(obj, **limits):
+    """
+    객체가 JSON 직렬화 가능하도록 변환합니다.
     
-    if isinstance(obj, bytes):
+    Args:
+        obj: 변환할 객체
+        **limits: serialize_json()의 한도 설정
+        
+    Returns:
+        JSON 직렬화 가능한 객체 (한도를 넘는 부분은 마커로 대체)
+    """
+    return serialize_json(obj, **limits)[0]
+
+
+# 트레이스 수집 시 경로를 색인할 키
+INDEXED_TRACE_KEYS = (
+    "finalResponse", "invocationInput", "observation", "rationale", "modelInvocationOutput", "steps"
+)
+
+
+class TraceIndex:
+    """
+    트레이스에서 주요 키가 나타나는 경로를 기록하는 색인
+
+    이벤트가 도착할 때마다 해당 이벤트 조각만 순회하여 경로를 추가하므로, 스트림이 끝난 뒤
+    병합된 전체 트리를 다시 탐색하지 않고 경로를 따라가 바로 값을 찾을 수 있습니다.
+    경로는 병합된 트레이스 기준이며, 값은 조회 시 병합된 트레이스에서 가져옵니다.
+    """
+
+    def __init__(self, paths=None):
+        # key -> 경로 목록 (처음 나타난 순서)
+        self._paths = {key: [tuple(path) for path in value] for key, value in (paths or {}).items()}
+        self._seen = {path for value in self._paths.values() for path in value}
+
+    @classmethod
+    def build(cls, trace):
+        """이미 병합된 트레이스 전체로 색인을 만듭니다 (색인 없이 저장된 트레이스용)"""
+        index = cls()
+        index.add(trace)
+        return index
+
+    def add(self, fragment, prefix=()):
+        """
+        트레이스 조각의 주요 키 경로를 색인에 추가합니다.
+
+        Args:
+            fragment: 병합 전 이벤트 트레이스 조각
+            prefix (tuple): 병합된 트레이스에서 조각이 위치하는 경로
+        """
+        stack = [(fragment, tuple(prefix))]
+        while stack:
+            obj, path = stack.pop()
+            if isinstance(obj, dict):
+                items = obj.items()
+            elif isinstance(obj, list):
+                items = enumerate(obj)
+            else:
+                continue
+
+            children = []
+            for key, value in items:
+                child_path = path + (key,)
+                if key in INDEXED_TRACE_KEYS and child_path not in self._seen:
+                    self._seen.add(child_path)
+                    self._paths.setdefault(key, []).append(child_path)
+                if isinstance(value, (dict, list)):
+                    children.append((value, child_path))
+            # 문서 순서대로 기록되도록 역순으로 쌓음
+            stack.extend(reversed(children))
+
+    def paths(self, key):
+        """키가 나타나는 경로 목록을 반환합니다"""
+        return list(self._paths.get(key, []))
+
+    def get_all(self, trace, key):
+        """병합된 트레이스에서 키의 모든 값을 경로 순서대로 반환합니다"""
+        values = []
+        for path in self._paths.get(key, []):
+            value = resolve_path(trace, path)
+            if value is not None:
+                values.append(value)
+        return values
+
+    def get(self, trace, key):
+        """병합된 트레이스에서 키의 첫 번째 값을 반환합니다 (없으면 None)"""
+        for path in self._paths.get(key, []):
+            value = resolve_path(trace, path)
+            if value is not None:
+                return value
+        return None
+
+    def final_response_text(self, trace):
+        """finalResponse 텍스트를 반환합니다 (없으면 None)"""
+        for final_response in self.get_all(trace, "finalResponse"):
+            if isinstance(final_response, dict) and final_response.get("text"):
+                return final_response["text"]
+        return None
+
+    def steps(self, trace):
+        """실행 단계 목록을 반환합니다 (steps 목록, 없으면 invocationInput/observation 목록)"""
+        for steps in self.get_all(trace, "steps"):
+            if isinstance(steps, list):
+                return steps
+        for key in ("invocationInput", "observation"):
+            for value in self.get_all(trace, key):
+                if isinstance(value, list):
+                    return value
+        return []
+
+    def to_dict(self):
+        """저장용 딕셔너리 {키: [경로 목록]}를 반환합니다"""
+        return {key: [list(path) for path in paths] for key, paths in self._paths.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        """to_dict()로 저장한 색인을 복원합니다"""
+        return cls(data)
+
+
+def resolve_path(obj, path):
+    """경로를 따라가 값을 반환합니다 (경로가 없으면 None)"""
+    for part in path:
         try:
-            return json.loads(obj.decode('utf-8'))
-        except Exception:
-            return str(obj)
-    
-    # 그 외 모든 타입은 문자열로 변환
-    return str(obj)
+            obj = obj[part]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return obj
+
 
-def extract_trace_summary(trace, response_type):
+def get_trace_index(trace, index=None):
+    """저장된 색인(딕셔너리 또는 TraceIndex)을 반환하거나, 없으면 트레이스로 새로 만듭니다"""
+    if isinstance(index, TraceIndex):
+        return index
+    if index:
+        return TraceIndex.from_dict(index)
+    return TraceIndex.build(trace or {})
+
+
+def extract_trace_summary(trace, response_type, index=None):
     """
     트레이스 정보에서 주요 요약 정보를 추출합니다.
     
     Args:
         trace (dict): 트레이스 정보
         response_type (str): 응답 유형 ('agent' 또는 'flow')
+        index (TraceIndex or dict, optional): 수집 시 만든 트레이스 색인
         
     Returns:
         dict: 요약 정보
@@ -54,21 +353,8 @@ def extract_trace_summary(trace, response_type):
     summary = {}
     
     if response_type == "agent":
-        # Agent 트레이스에서 단계 정보 추출
-        steps = []
-        invocation_inputs = None
-        
-        # 가능한 여러 경로 확인
-        if "orchestrationTrace" in trace and "invocationInput" in trace["orchestrationTrace"]:
-            invocation_inputs = trace["orchestrationTrace"]["invocationInput"]
-        elif "invocationInput" in trace:
-            invocation_inputs = trace["invocationInput"]
-        
-        # 단계 추출
-        if isinstance(invocation_inputs, list):
-            steps = invocation_inputs
-        elif isinstance(invocation_inputs, dict) and "steps" in invocation_inputs:
-            steps = invocation_inputs["steps"]
+        # Agent 트레이스에서 단계 정보 추출 (색인된 경로로 바로 조회)
+        steps = get_trace_index(trace, index).steps(trace)
         
         # 요약 정보 구성
         if steps:
@@ -109,12 +395,13 @@ def extract_trace_summary(trace, response_type):
     
     return summary
 
-def find_steps_in_trace(trace_data):
+def find_steps_in_trace(trace_data, index=None):
     """
     트레이스 데이터에서 실행 단계(steps) 정보를 추출합니다.
     
     Args:
         trace_data (dict): 트레이스 데이터
+        index (TraceIndex or dict, optional): 수집 시 만든 트레이스 색인 (없으면 한 번 순회하여 생성)
         
     Returns:
         list: 스텝 정보 목록이나 빈 리스트
@@ -122,49 +409,7 @@ def find_steps_in_trace(trace_data):
     if not trace_data:
         return []
     
-    # 가능한 경로 탐색
-    for path in [
-        ['orchestrationTrace', 'invocationInput', 'steps'],
-        ['orchestrationTrace', 'invocationInput'],
-        ['invocationInput', 'steps'],
-        ['invocationInput'],
-        ['observation']
-    ]:
-        current = trace_data
-        try:
-            for key in path:
-                current = current[key]
-            
-            # 리스트인 경우, 바로 반환
-            if isinstance(current, list):
-                logger.info(f"✅ {'>'.join(path)} 경로에서 스텝 정보 {len(current)}개 발견")
-                return current
-            # 단일 항목이 아닌 경우, 계속 탐색
-        except (KeyError, TypeError):
-            continue
-    
-    # 재귀적으로 스텝 찾기
-    def find_steps_recursive(obj, depth=0):
-        if depth > 5:  # 재귀 깊이 제한
-            return None
-            
-        if isinstance(obj, dict):
-            if "steps" in obj and isinstance(obj["steps"], list):
-                return obj["steps"]
-                
-            for key, value in obj.items():
-                result = find_steps_recursive(value, depth + 1)
-                if result:
-                    return result
-                    
-        elif isinstance(obj, list) and all(isinstance(item, dict) for item in obj):
-            if any("actionGroupInvocationInput" in item or "invocationType" in item for item in obj):
-                return obj
-        
-        return None
-    
-    steps = find_steps_recursive(trace_data)
+    steps = get_trace_index(trace_data, index).steps(trace_data)
     if steps:
-        return steps
-        
-    return []
\ No newline at end of file
+        logger.info(f"✅ 트레이스 색인에서 스텝 정보 {len(steps)}개 발견")
+    return steps
@@ -0,0 +1,251 @@
+# Path: /bedrock_chatbot_app/lib/transcript_store.py
+
+"""세션 토큰별 채팅 기록을 영구 저장하고 재접속 시 복원하는 모듈"""
+import hashlib
+import hmac
+import logging
+import os
+import sqlite3
+import threading
+from lib.conversation import Conversation
+from lib.json_codec import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# 기본 데이터베이스 경로 (여러 파드가 함께 쓰려면 공유 볼륨의 경로를 환경 변수로 지정)
+DEFAULT_DB_PATH = os.environ.get("TRANSCRIPT_DB_PATH", "transcripts.db")
+
+# SQLite 저널 모드 (WAL은 공유 메모리를 사용하므로 EFS 등 네트워크 파일 시스템에서는 DELETE 사용)
+DEFAULT_JOURNAL_MODE = os.environ.get("TRANSCRIPT_DB_JOURNAL_MODE", "WAL")
+DEFAULT_PAGE_SIZE = 30
+
+
+class TranscriptStore:
+    """
+    채팅 기록 저장소 인터페이스
+
+    다른 저장소(예: 공유 데이터베이스)를 사용하려면 이 클래스를 상속하여
+    아래 메서드를 구현하고 set_transcript_store()로 교체합니다.
+    메시지는 저장 시 증가하는 순번(seq)을 부여받으며, 페이지 조회는 이 순번을 기준으로 합니다.
+    각 세션은 처음 등록한 소유자(owner_digest()로 변환한 값)에게 묶이며, 복원 전에 is_owner()로 확인합니다.
+    """
+
+    def claim(self, session_token, owner):
+        """
+        세션을 소유자에게 등록합니다.
+
+        Returns:
+            bool: 새로 등록했거나 이미 같은 소유자의 세션이면 True
+        """
+        raise NotImplementedError
+
+    def is_owner(self, session_token, owner):
+        """세션이 주어진 소유자에게 등록되어 있는지 확인합니다"""
+        raise NotImplementedError
+
+    def append(self, session_token, message):
+        """메시지를 추가하고 부여된 순번을 반환합니다"""
+        raise NotImplementedError
+
+    def load_page(self, session_token, before_seq=None, limit=DEFAULT_PAGE_SIZE):
+        """
+        before_seq 이전의 메시지를 최대 limit개 시간순으로 반환합니다.
+
+        before_seq가 없으면 가장 최근 메시지(꼬리)를 반환합니다.
+        """
+        raise NotImplementedError
+
+    def has_before(self, session_token, seq):
+        """주어진 순번 이전에 저장된 메시지가 있는지 확인합니다"""
+        raise NotImplementedError
+
+    def load_converse_turns(self, session_token):
+        """Converse 응답과 그 직전 사용자 메시지를 시간순으로 반환합니다"""
+        raise NotImplementedError
+
+    def delete(self, session_token):
+        """세션의 모든 메시지를 삭제합니다 (소유자 등록은 유지)"""
+        raise NotImplementedError
+
+
+class SQLiteTranscriptStore(TranscriptStore):
+    """
+    SQLite 기반 채팅 기록 저장소 (기본 WAL 모드, 공유 볼륨에서는 DELETE 저널 모드)
+
+    Streamlit 세션은 각자 스레드에서 실행되므로 스레드별로 연결을 유지합니다.
+
+    Attributes:
+        db_path (str): SQLite 데이터베이스 파일 경로
+        journal_mode (str): SQLite 저널 모드
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, journal_mode=DEFAULT_JOURNAL_MODE):
+        self.db_path = db_path
+        self.journal_mode = journal_mode
+        self._local = threading.local()
+
+    def _connect(self):
+        """현재 스레드의 연결을 반환합니다 (없으면 생성 및 스키마 준비)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0)
+            conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+            # WAL이 아니면 커밋마다 동기화하여 공유 볼륨에서도 손상되지 않도록 함
+            conn.execute("PRAGMA synchronous=NORMAL" if self.journal_mode.upper() == "WAL" else "PRAGMA synchronous=FULL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_token TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    response_type TEXT,
+                    payload TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_token, seq)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_token TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL
+                )
+            """)
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def claim(self, session_token, owner):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO sessions (session_token, owner) VALUES (?, ?)",
+                (session_token, owner)
+            )
+        return self.is_owner(session_token, owner)
+
+    def is_owner(self, session_token, owner):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT owner FROM sessions WHERE session_token = ?", (session_token,)
+        ).fetchone()
+        return row is not None and hmac.compare_digest(row[0], owner)
+
+    def append(self, session_token, message):
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO messages (session_token, role, response_type, payload) VALUES (?, ?, ?, ?)",
+                (session_token, message["role"], message.get("response_type"),
+                 dumps(message, default=str))
+            )
+        return cursor.lastrowid
+
+    def load_page(self, session_token, before_seq=None, limit=DEFAULT_PAGE_SIZE):
+        conn = self._connect()
+        if before_seq is None:
+            rows = conn.execute(
+                "SELECT seq, payload FROM messages WHERE session_token = ? ORDER BY seq DESC LIMIT ?",
+                (session_token, limit)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT seq, payload FROM messages WHERE session_token = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                (session_token, before_seq, limit)
+            ).fetchall()
+
+        return [self._row_to_message(seq, payload) for seq, payload in reversed(rows)]
+
+    def has_before(self, session_token, seq):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT 1 FROM messages WHERE session_token = ? AND seq < ? LIMIT 1",
+            (session_token, seq)
+        ).fetchone()
+        return row is not None
+
+    def load_converse_turns(self, session_token):
+        conn = self._connect()
+        rows = conn.execute("""
+            SELECT seq, payload FROM (
+                SELECT seq, role, payload, response_type,
+                       LEAD(response_type) OVER (ORDER BY seq) AS next_type
+                FROM messages WHERE session_token = ?
+            )
+            WHERE response_type = 'converse' OR (role = 'user' AND next_type = 'converse')
+            ORDER BY seq
+        """, (session_token,)).fetchall()
+        return [self._row_to_message(seq, payload) for seq, payload in rows]
+
+    def delete(self, session_token):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM messages WHERE session_token = ?", (session_token,))
+
+    @staticmethod
+    def _row_to_message(seq, payload):
+        message = loads(payload)
+        message["seq"] = seq
+        return message
+
+
+# 프로세스 전역 채팅 기록 저장소
+transcript_store = SQLiteTranscriptStore()
+
+
+def get_transcript_store():
+    """현재 사용 중인 채팅 기록 저장소를 반환합니다"""
+    return transcript_store
+
+
+def set_transcript_store(store):
+    """채팅 기록 저장소를 다른 구현으로 교체합니다"""
+    global transcript_store
+    transcript_store = store
+
+
+def owner_digest(identity):
+    """
+    인증된 사용자 식별자를 저장용 소유자 값으로 변환합니다.
+
+    식별자 원문은 저장하지 않고 SHA-256 해시만 저장합니다.
+    """
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+def restore_session(session_token, owner, limit=DEFAULT_PAGE_SIZE):
+    """
+    세션 토큰으로 저장된 대화를 복원합니다.
+
+    세션이 owner에게 등록되어 있지 않으면 아무것도 불러오지 않습니다 (URL이 유출되어도
+    다른 사용자의 대화를 불러올 수 없음). 화면에는 최근 메시지(꼬리)만 불러오고,
+    Converse 대화 기록은 저장된 턴의 텍스트로 재구성하므로 모델을 다시 호출하지 않습니다.
+
+    Args:
+        session_token (str): 세션 토큰
+        owner (str): 현재 사용자의 소유자 값 (owner_digest() 결과)
+        limit (int): 불러올 최근 메시지 수
+
+    Returns:
+        dict: chat_messages, converse_history(Conversation), has_more를 담은 딕셔너리
+    """
+    store = get_transcript_store()
+    try:
+        if not store.is_owner(session_token, owner):
+            logger.warning("⚠️ 소유자가 확인되지 않은 세션 토큰의 채팅 기록 복원 요청을 거부했습니다")
+            return {"chat_messages": [], "converse_history": Conversation(), "has_more": False}
+        messages = store.load_page(session_token, limit=limit)
+        has_more = bool(messages) and store.has_before(session_token, messages[0]["seq"])
+        converse_history = Conversation.from_history([
+            {"role": turn["role"], "content": turn["content"]}
+            for turn in store.load_converse_turns(session_token)
+        ])
+    except Exception as e:
+        logger.error(f"❌ 채팅 기록 복원 실패: {str(e)}")
+        return {"chat_messages": [], "converse_history": Conversation(), "has_more": False}
+
+    if messages:
+        logger.info(f"📂 채팅 기록 복원: {len(messages)}개 메시지, Converse 턴 {len(converse_history)}개")
+
+    return {
+        "chat_messages": messages,
+        "converse_history": converse_history,
+        "has_more": has_more
+    }
@@ -0,0 +1,46 @@
+"""lib.alb_auth ALB 사용자 클레임 서명 검증 테스트"""
+import time
+import pytest
+
+jwt = pytest.importorskip("jwt")
+ec = pytest.importorskip("cryptography.hazmat.primitives.asymmetric.ec")
+serialization = pytest.importorskip("cryptography.hazmat.primitives.serialization")
+
+from lib import alb_auth  # noqa: E402
+
+SIGNER = "arn:aws:elasticloadbalancing:us-west-2:123456789012:loadbalancer/app/test/abc"
+
+
+@pytest.fixture
+def signing_key(monkeypatch):
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode("utf-8")
+    monkeypatch.setattr(alb_auth, "_get_public_key", lambda kid, region: public_pem)
+    return private_key
+
+
+def _token(private_key, signer=SIGNER, **claims):
+    payload = {"sub": "user-1", "exp": int(time.time()) + 60}
+    payload.update(claims)
+    return jwt.encode(payload, private_key, algorithm="ES256", headers={"kid": "key-1", "signer": signer})
+
+
+def test_valid_claim_returns_subject(signing_key):
+    assert alb_auth.verify_alb_identity(_token(signing_key), "us-west-2", SIGNER) == "user-1"
+
+
+def test_rejects_other_signer(signing_key):
+    token = _token(signing_key, signer="arn:aws:elasticloadbalancing:other")
+    assert alb_auth.verify_alb_identity(token, "us-west-2", SIGNER) is None
+
+
+def test_rejects_forged_and_expired_claims(signing_key):
+    forged = _token(ec.generate_private_key(ec.SECP256R1()))
+    expired = _token(signing_key, exp=int(time.time()) - 60)
+
+    assert alb_auth.verify_alb_identity(forged, "us-west-2", SIGNER) is None
+    assert alb_auth.verify_alb_identity(expired, "us-west-2", SIGNER) is None
+    assert alb_auth.verify_alb_identity("not-a-jwt", "us-west-2", SIGNER) is None
+    assert alb_auth.verify_alb_identity(None) is None
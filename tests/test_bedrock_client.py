@@ -0,0 +1,79 @@
+"""lib.bedrock_client 리전 라우팅 및 장애 전환 테스트"""
+import pytest
+
+pytest.importorskip("boto3")
+exceptions = pytest.importorskip("botocore.exceptions")
+
+from lib import bedrock_client  # noqa: E402
+from lib.bedrock_client import RegionRouter, is_failover_error  # noqa: E402
+
+
+def _client_error(code):
+    return exceptions.ClientError({"Error": {"Code": code, "Message": code}}, "Converse")
+
+
+@pytest.fixture(autouse=True)
+def region_clients(monkeypatch):
+    # 클라이언트 대신 리전 이름을 전달하여 어느 리전에서 호출했는지 확인
+    monkeypatch.setattr(bedrock_client, "get_bedrock_client", lambda region_name=None: region_name)
+
+
+def test_primary_region_is_preferred_before_observation():
+    router = RegionRouter(["us-west-2", "us-east-1", "us-west-2"])
+
+    assert router.regions == ["us-west-2", "us-east-1"]
+    assert router.ranked_regions() == ["us-west-2", "us-east-1"]
+    assert router.invoke("converse", lambda region: region) == "us-west-2"
+
+
+def test_throttling_fails_over_to_next_region():
+    router = RegionRouter(["us-west-2", "us-east-1"])
+
+    def call(region):
+        if region == "us-west-2":
+            raise _client_error("ThrottlingException")
+        return region
+
+    assert router.invoke("converse", call) == "us-east-1"
+    events = router.failover_events()
+    assert [(event["from_region"], event["to_region"]) for event in events] == [("us-west-2", "us-east-1")]
+    assert router.stats()["us-west-2"]["error_rate"] == 1.0
+    assert router.ranked_regions() == ["us-east-1", "us-west-2"]
+
+
+def test_non_failover_errors_are_raised_immediately():
+    router = RegionRouter(["us-west-2", "us-east-1"])
+    calls = []
+
+    def call(region):
+        calls.append(region)
+        raise _client_error("ValidationException")
+
+    with pytest.raises(exceptions.ClientError):
+        router.invoke("converse", call)
+    assert calls == ["us-west-2"]
+    assert router.failover_events() == []
+
+
+def test_last_error_is_raised_when_all_regions_fail():
+    router = RegionRouter(["us-west-2", "us-east-1"])
+
+    def call(region):
+        raise _client_error("ServiceUnavailableException")
+
+    with pytest.raises(exceptions.ClientError):
+        router.invoke("converse", call)
+    assert len(router.failover_events()) == 1
+
+
+def test_prefer_secondary_starts_with_second_best_region():
+    router = RegionRouter(["us-west-2", "us-east-1"])
+
+    assert router.invoke("converse", lambda region: region, prefer_secondary=True) == "us-east-1"
+
+
+def test_failover_error_classification():
+    assert is_failover_error(_client_error("ThrottlingException"))
+    assert is_failover_error(exceptions.EndpointConnectionError(endpoint_url="https://example.com"))
+    assert not is_failover_error(_client_error("AccessDeniedException"))
+    assert not is_failover_error(ValueError("bad"))
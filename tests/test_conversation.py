@@ -0,0 +1,68 @@
+"""lib.conversation 대화 객체 테스트"""
+from lib.conversation import Conversation
+
+
+def _user(text):
+    return {"role": "user", "content": [{"text": text}]}
+
+
+def _assistant(text):
+    return {"role": "assistant", "content": [{"text": text}]}
+
+
+def test_append_returns_new_object_and_keeps_prefix():
+    first = Conversation().append(_user("a"))
+    second = first.append(_assistant("b"))
+
+    assert len(first) == 1
+    assert first.messages == [_user("a")]
+    assert second.messages == [_user("a"), _assistant("b")]
+
+
+def test_append_does_not_copy_messages():
+    message = _user("a")
+    first = Conversation().append(message)
+    second = first.append(_assistant("b"))
+
+    assert second.messages[0] is message
+    assert first.messages[0] is message
+
+
+def test_append_from_forked_object_copies_prefix():
+    base = Conversation().append(_user("a"))
+    left = base.append(_assistant("left"))
+    right = base.append(_assistant("right"))
+
+    assert left.messages == [_user("a"), _assistant("left")]
+    assert right.messages == [_user("a"), _assistant("right")]
+    assert base.messages == [_user("a")]
+
+    # 분기 후에도 각 갈래에 이어서 추가하면 서로 영향을 주지 않음
+    left_next = left.add_user_text("left again")
+    right_next = right.add_user_text("right again")
+    assert left_next.messages[-2:] == [_assistant("left"), _user("left again")]
+    assert right_next.messages[-2:] == [_assistant("right"), _user("right again")]
+    assert left.messages == [_user("a"), _assistant("left")]
+
+
+def test_from_history_wraps_text_content():
+    conversation = Conversation.from_history([
+        {"role": "user", "content": "질문"},
+        {"role": "assistant", "content": [{"text": "답변"}]}
+    ])
+
+    assert conversation.messages == [_user("질문"), _assistant("답변")]
+    assert Conversation.from_history(conversation) is conversation
+
+
+def test_tail_starts_with_user_message():
+    conversation = Conversation([_user("1"), _assistant("2"), _user("3"), _assistant("4")])
+
+    assert conversation.tail(3).messages == [_user("3"), _assistant("4")]
+    assert conversation.tail(0).messages == []
+
+
+def test_json_round_trip():
+    conversation = Conversation([_user("한글"), _assistant("ok")])
+
+    assert Conversation.from_json(conversation.to_json()).messages == conversation.messages
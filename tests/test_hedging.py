@@ -0,0 +1,87 @@
+"""lib.hedging 헤지 요청 테스트"""
+import threading
+import time
+import pytest
+from lib import hedging
+from lib.hedging import HedgeBudget, LatencyTracker, MIN_SAMPLES, hedged_call
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    tracker = LatencyTracker()
+    monkeypatch.setattr(hedging, "latency_tracker", tracker)
+    monkeypatch.setattr(hedging, "hedge_budget", HedgeBudget(ratio=1.0))
+    monkeypatch.setattr(hedging.config, "hedge_percentile", 0.5)
+    return tracker
+
+
+def _warm_up(tracker, operation, latency):
+    for _ in range(MIN_SAMPLES):
+        tracker.record(operation, latency)
+
+
+def test_without_history_runs_primary_on_caller_thread(tracker):
+    caller = threading.get_ident()
+    threads = []
+
+    result = hedged_call("op", lambda: threads.append(threading.get_ident()) or "primary", enabled=True)
+
+    assert result == "primary"
+    assert threads == [caller]
+    assert tracker.percentile("op", 0.5) is None
+
+
+def test_fast_primary_is_not_hedged(tracker):
+    _warm_up(tracker, "op", 0.5)
+    calls = []
+
+    result = hedged_call("op", lambda: "primary", secondary=lambda: calls.append("secondary"), enabled=True)
+
+    assert result == "primary"
+    assert calls == []
+
+
+def test_slow_primary_is_hedged_and_both_latencies_recorded(tracker, monkeypatch):
+    _warm_up(tracker, "op", 0.01)
+    recorded = []
+    monkeypatch.setattr(tracker, "record", lambda operation, latency: recorded.append(latency))
+    release = threading.Event()
+
+    def slow_primary():
+        release.wait(5)
+        return "primary"
+
+    result = hedged_call("op", slow_primary, secondary=lambda: "secondary", enabled=True)
+    assert result == "secondary"
+
+    release.set()
+    deadline = time.time() + 5
+    while len(recorded) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(recorded) == 2
+
+
+def test_failed_hedge_falls_back_to_primary(tracker):
+    _warm_up(tracker, "op", 0.01)
+
+    def slow_primary():
+        time.sleep(0.1)
+        return "primary"
+
+    def failing_secondary():
+        raise RuntimeError("boom")
+
+    assert hedged_call("op", slow_primary, secondary=failing_secondary, enabled=True) == "primary"
+
+
+def test_budget_limits_hedges(tracker, monkeypatch):
+    monkeypatch.setattr(hedging, "hedge_budget", HedgeBudget(ratio=0.0, burst=0.0))
+    _warm_up(tracker, "op", 0.01)
+    calls = []
+
+    def slow_primary():
+        time.sleep(0.05)
+        return "primary"
+
+    assert hedged_call("op", slow_primary, secondary=lambda: calls.append(1), enabled=True) == "primary"
+    assert calls == []
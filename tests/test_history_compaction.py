@@ -0,0 +1,73 @@
+"""lib.history_compaction 대화 기록 윈도우 및 백그라운드 요약 테스트"""
+from concurrent.futures import Future
+import pytest
+
+pytest.importorskip("boto3")
+
+from lib import history_compaction  # noqa: E402
+from lib.conversation import Conversation  # noqa: E402
+from lib.history_compaction import HistoryCompactor  # noqa: E402
+
+MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
+
+
+class _ManualExecutor:
+    """요약 작업을 실행하지 않고 테스트가 결과를 정하는 실행기"""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.submitted.append((future, args))
+        return future
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    executor = _ManualExecutor()
+    monkeypatch.setattr(history_compaction, "_summary_executor", executor)
+    monkeypatch.setattr(history_compaction, "get_history_token_budget", lambda model_id: 200)
+    return executor
+
+
+def _conversation(turns):
+    conversation = Conversation()
+    for index in range(turns):
+        conversation = conversation.add_user_text(f"질문 {index} " + "a" * 200)
+        conversation = conversation.append({"role": "assistant", "content": [{"text": f"답변 {index} " + "b" * 200}]})
+    return conversation.add_user_text("마지막 질문")
+
+
+def test_short_history_is_sent_as_is(executor):
+    conversation = Conversation().add_user_text("안녕하세요")
+
+    window, system = HistoryCompactor().prepare(conversation, MODEL_ID)
+
+    assert window == conversation.messages
+    assert system is None
+    assert executor.submitted == []
+
+
+def test_evicted_turns_are_kept_until_summary_lands(executor):
+    compactor = HistoryCompactor()
+    conversation = _conversation(6)
+
+    window, system = compactor.prepare(conversation, MODEL_ID)
+    assert window == conversation.messages
+    assert system is None
+    assert len(executor.submitted) == 1
+
+    # 요약이 진행 중이면 새 요약을 시작하지 않고 계속 원문을 보냄
+    window, _ = compactor.prepare(conversation, MODEL_ID)
+    assert window == conversation.messages
+    assert len(executor.submitted) == 1
+
+    future, (_, _, summarized, _) = executor.submitted[0]
+    future.set_result("이전 대화 요약")
+    window, system = compactor.prepare(conversation, MODEL_ID)
+
+    assert len(window) < len(conversation.messages)
+    assert window[0]["role"] == "user"
+    assert "이전 대화 요약" in system[0]["text"]
+    assert conversation.messages[:len(conversation.messages) - len(window)] == summarized
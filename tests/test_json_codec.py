@@ -0,0 +1,34 @@
+"""lib.json_codec 인코딩/디코딩 테스트"""
+import pytest
+from lib.json_codec import JSONDecodeError, dumpb, dumps, loads
+
+
+def test_compact_and_pretty_output():
+    assert dumpb({"a": [1, 2], "b": "한글"}) == '{"a":[1,2],"b":"한글"}'.encode("utf-8")
+    assert dumps({"a": 1}, pretty=True) == '{\n  "a": 1\n}'
+
+
+def test_sort_keys_and_non_string_keys():
+    assert dumps({"b": 1, "a": 2}, sort_keys=True) == '{"a":2,"b":1}'
+    assert loads(dumps({1: "x"})) == {"1": "x"}
+
+
+def test_falls_back_for_values_orjson_rejects():
+    big = 2 ** 70
+    assert loads(dumpb({"n": big})) == {"n": big}
+
+
+def test_default_hook():
+    assert dumps({"s": {1, 2}}, default=sorted) == '{"s":[1,2]}'
+
+
+def test_loads_accepts_buffers_and_nan_literal():
+    assert loads(bytearray(b'{"a":1}')) == {"a": 1}
+    assert loads(memoryview(b"[1]")) == [1]
+    value = loads("[NaN]")[0]
+    assert value != value
+
+
+def test_invalid_json_raises_decode_error():
+    with pytest.raises(JSONDecodeError):
+        loads("{not json")
@@ -0,0 +1,84 @@
+"""lib.knowledge_base 필터 파싱 및 검색 결과 병합 테스트"""
+import pytest
+
+pytest.importorskip("botocore")
+pytest.importorskip("numpy")
+
+from lib.knowledge_base import RRF_K, fuse_results, parse_filter_expression  # noqa: E402
+
+
+def _result(source, content, score):
+    return {"source": source, "content": content, "score": score}
+
+
+def test_parse_filter_empty_expression():
+    assert parse_filter_expression("") is None
+    assert parse_filter_expression("   ") is None
+    assert parse_filter_expression(None) is None
+
+
+def test_parse_filter_single_condition():
+    assert parse_filter_expression("category = guidelines") == {
+        "equals": {"key": "category", "value": "guidelines"}
+    }
+
+
+def test_parse_filter_multiple_conditions_and_value_types():
+    assert parse_filter_expression("year >= 2023; score < 0.5; draft != false; state in CA, NY") == {
+        "andAll": [
+            {"greaterThanOrEquals": {"key": "year", "value": 2023}},
+            {"lessThan": {"key": "score", "value": 0.5}},
+            {"notEquals": {"key": "draft", "value": False}},
+            {"in": {"key": "state", "value": ["CA", "NY"]}},
+        ]
+    }
+
+
+def test_parse_filter_quoted_value_stays_string():
+    assert parse_filter_expression("code = '2023'") == {"equals": {"key": "code", "value": "2023"}}
+
+
+def test_parse_filter_json_passthrough():
+    expression = '{"equals": {"key": "a", "value": 1}}'
+    assert parse_filter_expression(expression) == {"equals": {"key": "a", "value": 1}}
+
+
+def test_parse_filter_invalid_expression():
+    with pytest.raises(ValueError):
+        parse_filter_expression("no operator here")
+    with pytest.raises(ValueError):
+        parse_filter_expression("{not json")
+
+
+def test_fuse_results_empty():
+    assert fuse_results([], 5) == []
+    assert fuse_results([[], []], 5) == []
+
+
+def test_fuse_results_ranks_by_reciprocal_rank():
+    first = [_result("s3://a", "alpha", 0.9), _result("s3://b", "beta", 0.5)]
+    second = [_result("s3://b", "beta", 0.8), _result("s3://c", "gamma", 0.1)]
+
+    merged = fuse_results([first, second], 5)
+
+    # beta는 두 목록에 모두 있어 RRF 점수를 합산
+    assert [result["content"] for result in merged] == ["beta", "alpha", "gamma"]
+    assert merged[0]["score"] == 1.0
+    assert merged[1]["score"] == pytest.approx((1 / (RRF_K + 1)) / (1 / (RRF_K + 2) + 1 / (RRF_K + 1)))
+    assert merged[0]["raw_score"] == 0.5
+
+
+def test_fuse_results_deduplicates_by_source_and_content():
+    first = [_result("s3://a", "same text", 0.9)]
+    second = [_result("s3://a", "  same text  ", 0.7), _result("s3://other", "same text", 0.6)]
+
+    merged = fuse_results([first, second], 5)
+
+    assert len(merged) == 2
+    assert merged[0]["source"] == "s3://a"
+
+
+def test_fuse_results_respects_top_k():
+    results = [_result(f"s3://{index}", f"text {index}", 1.0 - index / 10) for index in range(5)]
+
+    assert len(fuse_results([results], 2)) == 2
@@ -0,0 +1,81 @@
+"""lib.local_index 청크 분할, 메타데이터 필터 및 로컬 벡터 검색 테스트"""
+import json
+import pytest
+
+pytest.importorskip("numpy")
+
+from lib import local_index  # noqa: E402
+from lib.local_index import LocalVectorIndex, build_index, chunk_text, _match_filter  # noqa: E402
+
+DOCUMENTS = {
+    "loans/manufactured.txt": ("Manufactured housing loans require a permanent foundation.", {"year": 2024, "type": "loan"}),
+    "loans/credit.md": ("Minimum credit score for conventional loans is 620.", {"year": 2023, "type": "loan"}),
+    "office/holidays.html": ("<p>The office is closed on national holidays.</p>", {"year": 2024, "type": "hr"}),
+}
+
+
+@pytest.fixture
+def document_dir(tmp_path):
+    root = tmp_path / "docs"
+    for name, (text, metadata) in DOCUMENTS.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+        (root / f"{name}.metadata.json").write_text(json.dumps({"metadataAttributes": metadata}), encoding="utf-8")
+    return root
+
+
+def test_chunk_text_overlaps_and_covers_text():
+    text = "\n\n".join(f"문단 {index} " + "내용 " * 60 for index in range(10))
+
+    chunks = chunk_text(text, chunk_chars=300, overlap_chars=50)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert chunks[0].startswith("문단 0") and "문단 9" in chunks[-1]
+    assert chunk_text("   ") == []
+
+
+def test_match_filter_operators():
+    metadata = {"year": 2024, "type": "loan"}
+
+    assert _match_filter(metadata, {"equals": {"key": "type", "value": "loan"}})
+    assert _match_filter(metadata, {"andAll": [
+        {"greaterThanOrEquals": {"key": "year", "value": 2024}}, {"in": {"key": "type", "value": ["loan", "hr"]}}
+    ]})
+    assert not _match_filter(metadata, {"lessThan": {"key": "year", "value": "2024"}})
+    assert _match_filter(metadata, {"notEquals": {"key": "missing", "value": 1}})
+
+
+def test_build_and_search_with_filter(document_dir, tmp_path):
+    index_dir = tmp_path / "index"
+    manifest = build_index(str(document_dir), str(index_dir))
+    index = LocalVectorIndex(str(index_dir))
+
+    results = index.search("manufactured housing foundation", top_k=2)
+    filtered = index.search("holidays", top_k=5, metadata_filter={"equals": {"key": "type", "value": "loan"}})
+
+    assert manifest["chunks"] == 3 and manifest["lists"] == 0
+    assert results[0]["source_filename"] == "loans/manufactured.txt"
+    assert results[0]["knowledge_base_id"] == local_index.LOCAL_KNOWLEDGE_BASE_ID
+    assert "<p>" not in index.search("office", top_k=1)[0]["content"]
+    assert {result["metadata"]["type"] for result in filtered} == {"loan"}
+    assert index.search("anything", top_k=0)
+
+
+def test_ivf_index_searches_probed_lists(document_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(local_index, "BRUTE_FORCE_MAX_VECTORS", 1)
+    index_dir = tmp_path / "ivf"
+
+    manifest = build_index(str(document_dir), str(index_dir))
+    index = LocalVectorIndex(str(index_dir))
+
+    assert manifest["lists"] == 1
+    assert index.search("credit score", top_k=1, nprobe=100)[0]["source_filename"] == "loans/credit.md"
+
+
+def test_empty_document_dir_is_rejected(tmp_path):
+    (tmp_path / "empty").mkdir()
+
+    with pytest.raises(ValueError):
+        build_index(str(tmp_path / "empty"), str(tmp_path / "index"))
@@ -0,0 +1,39 @@
+"""lib.logging_config 큐 핸들러/필터 테스트"""
+import logging
+import queue
+from lib.logging_config import NonBlockingQueueHandler, SamplingFilter, lazy
+
+
+def _record(msg, *args, name="lib.test", level=logging.INFO):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_prepare_snapshots_message_in_calling_thread():
+    handler = NonBlockingQueueHandler(queue.Queue())
+    data = ["a"]
+    prepared = handler.prepare(_record("state %s", lazy(lambda: list(data))))
+    data.append("b")
+    assert prepared.getMessage() == "state ['a']"
+    assert prepared.args is None
+
+
+def test_full_queue_drops_without_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    handler.enqueue(_record("first"))
+    handler.enqueue(_record("second"))
+    assert handler.queue.qsize() == 1
+
+
+def test_sampling_uses_longest_prefix():
+    sampling = SamplingFilter({"lib": 0.0, "lib.hedging": 1.0})
+    assert sampling.rate_for("lib.hedging.router") == 1.0
+    assert sampling.rate_for("lib.flow") == 0.0
+    assert sampling.rate_for("ui.main") == 1.0
+    assert not sampling.filter(_record("dropped", name="lib.flow"))
+    assert sampling.filter(_record("kept", name="lib.flow", level=logging.WARNING))
+
+
+def test_app_records_propagate_to_root(caplog):
+    with caplog.at_level(logging.INFO, logger="lib"):
+        logging.getLogger("lib.test").info("propagated")
+    assert "propagated" in caplog.text
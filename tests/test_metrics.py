@@ -0,0 +1,105 @@
+"""lib.metrics 메트릭 집계, Prometheus 텍스트 형식, 메트릭 서버 테스트"""
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from lib import metrics
+from lib.metrics import MetricsRegistry, record_call, record_usage, track_call
+
+
+class _ThrottlingError(Exception):
+    response = {"Error": {"Code": "ThrottlingException"}}
+
+
+def _sample_values(metric):
+    return {(suffix, key, extra): value for suffix, key, extra, value in metric.samples()}
+
+
+def test_counter_and_gauge_render():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "테스트 카운터", ("mode",))
+    counter.inc(mode="agent")
+    counter.inc(2, mode="agent")
+    gauge = registry.gauge("test_in_flight", "테스트 게이지")
+    with gauge.track_in_progress():
+        assert _sample_values(gauge)[("", (), None)] == 1
+    text = registry.render()
+
+    assert "# TYPE test_total counter" in text
+    assert 'test_total{mode="agent"} 3' in text
+    assert "test_in_flight 0" in text
+    assert text.endswith("\n")
+
+
+def test_registry_returns_existing_metric():
+    registry = MetricsRegistry()
+    assert registry.counter("same", "설명") is registry.counter("same", "다른 설명")
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "테스트 히스토그램", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+    text = registry.render()
+
+    assert 'test_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_seconds_bucket{le="1.0"} 2' in text
+    assert 'test_seconds_bucket{le="+Inf"} 3' in text
+    assert "test_seconds_sum 5.55" in text
+    assert "test_seconds_count 3" in text
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter("escaped_total", "이스케이프", ("name",)).inc(name='a"b\\c\nd')
+    assert 'escaped_total{name="a\\"b\\\\c\\nd"} 1' in registry.render()
+
+
+def test_track_call_records_success_and_throttle():
+    operation = "test_track_call"
+    with track_call(operation, region="test-region"):
+        pass
+    with pytest.raises(_ThrottlingError):
+        with track_call(operation, region="test-region"):
+            raise _ThrottlingError()
+    record_call(operation, "test-region", 0.1, ValueError("실패"))
+
+    calls = _sample_values(metrics.CALLS_TOTAL)
+    assert calls[("", (operation, "test-region", "success"), None)] == 1
+    assert calls[("", (operation, "test-region", "throttled"), None)] == 1
+    assert calls[("", (operation, "test-region", "error"), None)] == 1
+    assert _sample_values(metrics.THROTTLES_TOTAL)[("", (operation, "test-region"), None)] == 1
+    assert _sample_values(metrics.CALL_SECONDS)[("_count", (operation, "test-region"), None)] == 3
+
+
+def test_record_usage_skips_missing_kinds():
+    operation = "test_record_usage"
+    record_usage(operation, {"input_tokens": 10, "output_tokens": 4, "cache_read_tokens": None})
+
+    tokens = _sample_values(metrics.TOKENS_TOTAL)
+    assert tokens[("", (operation, "input"), None)] == 10
+    assert tokens[("", (operation, "output"), None)] == 4
+    assert ("", (operation, "cache_read"), None) not in tokens
+
+
+def test_metrics_handler_serves_metrics_and_health():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), metrics._MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/metrics") as response:
+            assert response.headers["Content-Type"] == metrics.PROMETHEUS_CONTENT_TYPE
+            assert b"# TYPE bedrock_calls_total counter" in response.read()
+        with urllib.request.urlopen(f"{base}/readyz") as response:
+            assert response.read() == b"ok\n"
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            urllib.request.urlopen(f"{base}/unknown")
+        assert excinfo.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,58 @@
+"""lib.model_router 복잡도 추정, 모델 점수 및 승격 테스트"""
+import pytest
+from lib.model_router import ModelRouter, ModelStats, estimate_complexity, is_weak_answer
+
+HAIKU = "anthropic.claude-3-haiku-20240307-v1:0"
+HAIKU_35 = "us.anthropic.claude-3-5-haiku-20241022-v1:0"
+SONNET = "anthropic.claude-3-sonnet-20240229-v1:0"
+SONNET_37 = "us.anthropic.claude-3-7-sonnet-20250219-v1:0"
+
+
+def test_complexity_rises_with_analysis_keywords():
+    simple, _ = estimate_complexity("안녕하세요")
+    complex_score, _ = estimate_complexity("두 대출 상품을 비교 분석하고 월 상환액을 계산해주세요")
+
+    assert simple < 1.0 <= complex_score
+
+
+def test_unobserved_models_rank_by_cost_with_default_prior():
+    router = ModelRouter()
+
+    assert router._rank([HAIKU_35, HAIKU]) == [HAIKU, HAIKU_35]
+
+
+def test_unobserved_model_uses_fleet_median_latency():
+    stats = ModelStats()
+    stats.record(HAIKU, 10.0, success=True)
+    router = ModelRouter(stats=stats)
+
+    # 관측된 모델이 하나뿐이면 그 지연 시간이 사전값이 되어 비용으로 비교
+    assert router._rank([HAIKU_35, HAIKU]) == [HAIKU, HAIKU_35]
+
+    stats.record(SONNET, 0.5, success=True)
+    stats.record(SONNET_37, 0.5, success=True)
+    assert stats.median_latency() == pytest.approx(0.5)
+    assert router._rank([HAIKU_35, HAIKU]) == [HAIKU_35, HAIKU]
+
+
+def test_unhealthy_models_rank_last():
+    stats = ModelStats(alpha=1.0)
+    stats.record(HAIKU, 0.1, success=False)
+    router = ModelRouter(stats=stats)
+
+    assert router._rank([HAIKU, HAIKU_35]) == [HAIKU_35, HAIKU]
+
+
+def test_weak_fast_answer_escalates_to_strong_model():
+    calls = []
+
+    def call(model_id):
+        calls.append(model_id)
+        output = "잘 모르겠습니다." if len(calls) == 1 else "충분히 자세한 답변입니다. " * 3
+        return {"response_type": "converse", "output": output}
+
+    response, decision = ModelRouter().execute("안녕하세요", call)
+
+    assert calls[0] in (HAIKU, HAIKU_35)
+    assert decision.escalated and decision.model_id == calls[1]
+    assert is_weak_answer("안녕하세요", response) is None
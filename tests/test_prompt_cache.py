@@ -0,0 +1,51 @@
+"""lib.prompt_cache 캐시 체크포인트 적용 조건 테스트"""
+from lib.prompt_cache import (
+    ANTHROPIC_CACHE_CONTROL, add_history_cache_point, add_system_cache_point, build_anthropic_system,
+    cache_min_tokens, merge_system_into_messages, normalize_usage
+)
+
+CACHING_MODEL = "us.anthropic.claude-3-7-sonnet-20250219-v1:0"
+NON_CACHING_MODEL = "anthropic.claude-3-sonnet-20240229-v1:0"
+
+
+def test_anthropic_system_caches_only_long_prefix_on_supported_model():
+    long_text = "대출 자격 요건을 추출합니다. " * 400
+    short_text = "대출 자격 요건을 추출합니다."
+
+    assert build_anthropic_system(long_text, CACHING_MODEL)[0]["cache_control"] == ANTHROPIC_CACHE_CONTROL
+    assert "cache_control" not in build_anthropic_system(short_text, CACHING_MODEL)[0]
+    assert "cache_control" not in build_anthropic_system(long_text, NON_CACHING_MODEL)[0]
+
+
+def test_cache_min_tokens_per_model():
+    assert cache_min_tokens("us.anthropic.claude-3-5-haiku-20241022-v1:0") == 2048
+    assert cache_min_tokens("unknown-model") == 1024
+
+
+def test_history_cache_point_does_not_mutate_shared_messages():
+    messages = [
+        {"role": "user", "content": [{"text": "q1"}]},
+        {"role": "assistant", "content": [{"text": "a1"}]},
+        {"role": "user", "content": [{"text": "q2"}]}
+    ]
+
+    cached = add_history_cache_point(messages)
+
+    assert cached[1]["content"][-1] == {"cachePoint": {"type": "default"}}
+    assert messages[1]["content"] == [{"text": "a1"}]
+    assert add_system_cache_point([]) == []
+
+
+def test_merge_system_into_first_message():
+    merged = merge_system_into_messages([{"text": "지시"}], [{"role": "user", "content": [{"text": "질문"}]}])
+
+    assert merged[0]["content"] == [{"text": "지시"}, {"text": "질문"}]
+
+
+def test_normalize_usage_accepts_both_formats():
+    converse = normalize_usage({"inputTokens": 3, "outputTokens": 4, "cacheReadInputTokens": 5})
+    anthropic = normalize_usage({"input_tokens": 3, "output_tokens": 4, "cache_read_input_tokens": 5})
+
+    assert converse == anthropic == {
+        "input_tokens": 3, "output_tokens": 4, "cache_read_tokens": 5, "cache_write_tokens": 0
+    }
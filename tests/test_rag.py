@@ -0,0 +1,90 @@
+"""lib.rag 컨텍스트 패킹, 인용 매핑 및 RAG 스트리밍 테스트"""
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("boto3")
+
+from lib import rag  # noqa: E402
+from lib.conversation import Conversation  # noqa: E402
+from lib.history_compaction import HistoryCompactor  # noqa: E402
+from lib.rag import (  # noqa: E402
+    RagSession, dedupe_chunks, format_context, map_citations, pack_context, rag_converse_stream
+)
+
+
+def _chunk(content, source="doc.pdf"):
+    return {"content": content, "source": f"s3://bucket/{source}", "source_filename": source, "knowledge_base_id": "KB"}
+
+
+def test_dedupe_ignores_whitespace_and_case():
+    chunks = [_chunk("Loan  Limits"), _chunk("loan limits"), _chunk("Credit score")]
+
+    assert dedupe_chunks(chunks) == [chunks[0], chunks[2]]
+
+
+def test_pack_skips_chunks_over_budget_and_numbers_citations():
+    chunks = [_chunk("a" * 400), _chunk("b" * 4000), _chunk("c" * 40)]
+
+    packed, used = pack_context(chunks, budget_tokens=200, model_id="anthropic.claude-3-haiku-20240307-v1:0")
+
+    assert [chunk["content"][0] for chunk in packed] == ["a", "c"]
+    assert [chunk["citation"] for chunk in packed] == [1, 2]
+    assert used <= 200
+    assert "citation" not in chunks[0]
+
+
+def test_format_context_and_map_citations():
+    packed, _ = pack_context([_chunk("첫 문서", "a.pdf"), _chunk("둘째 문서", "b.pdf")], 1000)
+
+    context = format_context(packed)
+    cited = map_citations("답변입니다 [2].", packed)
+
+    assert context.startswith("<sources>") and "[1] (출처: a.pdf)\n첫 문서" in context
+    assert [detail["source_file"] for detail in cited] == ["b.pdf"]
+
+
+def test_session_keeps_recent_chunks():
+    session = RagSession(max_chunks=2)
+    session.remember([_chunk("one"), _chunk("two")])
+    session.remember([_chunk("three"), _chunk("one")])
+
+    assert [chunk["content"] for chunk in session.previous_chunks()] == ["one", "three"]
+
+
+def test_rag_stream_sends_packed_context_and_maps_citations(monkeypatch):
+    captured = {}
+
+    def fake_converse_stream(query, history, **kwargs):
+        captured.update(kwargs)
+        response = {"response_type": "rag", "output": ""}
+
+        def stream():
+            yield "답변 "
+            response["output"] = "답변 [1]"
+            yield "[1]"
+
+        response["stream"] = stream()
+        return response
+
+    monkeypatch.setattr(rag, "retrieve_chunks", lambda query, ids, config: ([_chunk("대출 한도", "limits.pdf")], []))
+    monkeypatch.setattr(rag, "converse_stream", fake_converse_stream)
+    compactor = HistoryCompactor()
+
+    response = rag_converse_stream("대출 한도는?", knowledge_base_id="KB", conversation_history=Conversation(),
+                                   rag_session=RagSession(), compactor=compactor)
+    assert "".join(response["stream"]) == "답변 [1]"
+
+    assert captured["compactor"] is compactor
+    assert "대출 한도" in captured["system"][1]["text"]
+    assert [detail["source_file"] for detail in response["citation_details"]] == ["limits.pdf"]
+
+
+def test_retrieval_error_returns_error_response(monkeypatch):
+    def failing_retrieve(query, ids, config):
+        raise RuntimeError("down")
+
+    monkeypatch.setattr(rag, "retrieve_chunks", failing_retrieve)
+
+    response = rag_converse_stream("질문", knowledge_base_id="KB")
+
+    assert response["response_type"] == "error"
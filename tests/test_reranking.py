@@ -0,0 +1,65 @@
+"""lib.reranking BM25 재정렬 및 MMR 다양화 테스트"""
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("boto3")
+
+from lib.reranking import (  # noqa: E402
+    MAX_RETRIEVE_RESULTS, bm25_scores, mmr_select, overfetch_size, rerank_results, tokenize, _term_matrix
+)
+
+
+def _result(content, score=0.5):
+    return {"content": content, "score": score, "source": "s3://bucket/doc", "knowledge_base_id": "KB"}
+
+
+def test_overfetch_size_is_capped():
+    assert overfetch_size(5) == 15
+    assert overfetch_size(50) == MAX_RETRIEVE_RESULTS
+
+
+def test_bm25_prefers_documents_with_query_terms():
+    documents = [tokenize("mortgage rates today"), tokenize("weather forecast"), tokenize("mortgage mortgage loan")]
+    matrix, vocabulary = _term_matrix(documents)
+
+    scores = bm25_scores(tokenize("mortgage loan"), matrix, vocabulary)
+
+    assert scores[1] == 0
+    assert scores[2] > scores[0] > 0
+    assert not bm25_scores(tokenize("unknown"), matrix, vocabulary).any()
+
+
+def test_mmr_skips_near_duplicates():
+    relevance = np.array([1.0, 0.95, 0.5], dtype=np.float32)
+    similarity = np.array([
+        [1.0, 0.99, 0.1],
+        [0.99, 1.0, 0.1],
+        [0.1, 0.1, 1.0]
+    ], dtype=np.float32)
+
+    assert mmr_select(relevance, similarity, top_k=3) == [0, 2]
+
+
+def test_rerank_drops_duplicate_chunks_without_embeddings():
+    results = [
+        _result("Fannie Mae manufactured housing loan requirements", 0.9),
+        _result("Fannie Mae manufactured housing loan requirements", 0.85),
+        _result("Credit score requirements for conventional loans", 0.6),
+        _result("Office holiday schedule", 0.2)
+    ]
+
+    reranked, cost = rerank_results("manufactured housing loan requirements", results, top_k=2, embedding_model_id="")
+
+    assert [result["content"] for result in reranked] == [results[0]["content"], results[2]["content"]]
+    assert all("rerank_score" in result for result in reranked)
+    assert "rerank_score" not in results[0]
+    assert cost["candidates"] == 4 and cost["selected"] == 2 and cost["embedding_calls"] == 0
+
+
+def test_single_result_is_returned_unchanged():
+    results = [_result("only one")]
+
+    reranked, cost = rerank_results("query", results, top_k=3, embedding_model_id="")
+
+    assert reranked == results
+    assert cost["selected"] == 1
@@ -0,0 +1,94 @@
+"""lib.retrieval_cache 쿼리 정규화, TTL/LRU 및 KB 버전 무효화 테스트"""
+import pytest
+
+pytest.importorskip("boto3")
+
+from lib import retrieval_cache as retrieval_cache_module  # noqa: E402
+from lib.retrieval_cache import RetrievalCache, normalize_query  # noqa: E402
+
+
+class _Config:
+    """to_api()만 제공하는 검색 설정"""
+
+    def __init__(self, top_k=5):
+        self.top_k = top_k
+
+    def to_api(self):
+        return {"vectorSearchConfiguration": {"numberOfResults": self.top_k}}
+
+
+RESULTS = [{"content": "대출 한도", "score": 0.9}]
+
+
+def test_normalize_query_ignores_case_spacing_and_trailing_punctuation():
+    assert normalize_query("  대출   한도는?  ") == "대출 한도는"
+    assert normalize_query("Loan LIMITS!") == normalize_query("loan limits")
+    assert normalize_query(None) == ""
+
+
+def test_hit_for_equivalent_query_and_miss_for_other_config():
+    cache = RetrievalCache()
+    cache.put("KB", "대출 한도는?", _Config(), RESULTS)
+
+    assert cache.get("KB", "대출  한도는", _Config()) == RESULTS
+    assert cache.get("KB", "대출 한도는", _Config(top_k=10)) is None
+    assert cache.get("OTHER", "대출 한도는", _Config()) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_entries_expire_and_lru_is_bounded(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(retrieval_cache_module.time, "monotonic", lambda: now[0])
+    cache = RetrievalCache(max_entries=2, ttl_seconds=10)
+
+    cache.put("KB", "a", _Config(), RESULTS)
+    cache.put("KB", "b", _Config(), RESULTS)
+    cache.get("KB", "a", _Config())
+    cache.put("KB", "c", _Config(), RESULTS)
+    assert cache.get("KB", "b", _Config()) is None
+    assert cache.get("KB", "a", _Config()) == RESULTS
+
+    now[0] += 11
+    assert cache.get("KB", "a", _Config()) is None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["expirations"] == 1
+
+
+def test_version_change_invalidates_only_that_kb():
+    cache = RetrievalCache()
+    cache.put("KB", "q", _Config(), RESULTS)
+    cache.put("OTHER", "q", _Config(), RESULTS)
+
+    assert cache.set_version("KB", "ds1:job2")
+    assert not cache.set_version("KB", "ds1:job2")
+
+    assert cache.get("KB", "q", _Config()) is None
+    assert cache.get("OTHER", "q", _Config()) == RESULTS
+
+
+def test_refresh_version_is_rate_limited_and_tolerates_errors(monkeypatch):
+    versions = iter(["v1", RuntimeError("denied")])
+    calls = []
+
+    def fetch(knowledge_base_id):
+        calls.append(knowledge_base_id)
+        value = next(versions)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    now = [0.0]
+    monkeypatch.setattr(retrieval_cache_module, "fetch_ingestion_version", fetch)
+    monkeypatch.setattr(retrieval_cache_module.time, "monotonic", lambda: now[0])
+    cache = RetrievalCache()
+    cache.put("KB", "q", _Config(), RESULTS)
+
+    cache.refresh_version("KB", interval_seconds=60)
+    cache.refresh_version("KB", interval_seconds=60)
+    assert calls == ["KB"]
+    assert cache.get("KB", "q", _Config()) is None
+
+    cache.put("KB", "q", _Config(), RESULTS)
+    now[0] += 61
+    cache.refresh_version("KB", interval_seconds=60)
+    assert calls == ["KB", "KB"]
+    assert cache.get("KB", "q", _Config()) == RESULTS
@@ -0,0 +1,92 @@
+"""lib.knowledge_base RetrieveAndGenerate 세션 재사용 및 스트리밍 테스트"""
+import pytest
+
+pytest.importorskip("numpy")
+exceptions = pytest.importorskip("botocore.exceptions")
+
+from lib import knowledge_base  # noqa: E402
+from lib.knowledge_base import query_knowledge_base, retrieve_and_generate_stream  # noqa: E402
+
+CITATION = {
+    "generatedResponsePart": {"textResponsePart": {"text": "한도는 80%"}},
+    "retrievedReferences": [{
+        "location": {"s3Location": {"uri": "s3://bucket/limits.pdf"}},
+        "content": {"text": "LTV 한도 80%"}
+    }]
+}
+
+
+def _session_error():
+    return exceptions.ClientError(
+        {"Error": {"Code": "ValidationException", "Message": "Session is expired"}}, "RetrieveAndGenerate"
+    )
+
+
+class _FakeAgentClient:
+    """만료 세션을 한 번 거부하는 RetrieveAndGenerate 클라이언트"""
+
+    def __init__(self, expired_session=None):
+        self.expired_session = expired_session
+        self.calls = []
+
+    def _check(self, params):
+        self.calls.append(params)
+        if self.expired_session and params.get("sessionId") == self.expired_session:
+            raise _session_error()
+
+    def retrieve_and_generate(self, **params):
+        self._check(params)
+        return {"output": {"text": "답변"}, "citations": [CITATION], "sessionId": "new-session"}
+
+    def retrieve_and_generate_stream(self, **params):
+        self._check(params)
+        return {
+            "sessionId": "new-session",
+            "stream": [
+                {"output": {"text": "한도는 "}},
+                {"output": {"text": "80%입니다"}},
+                {"citation": {"citation": CITATION}}
+            ]
+        }
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = _FakeAgentClient(expired_session="old-session")
+    monkeypatch.setattr(knowledge_base, "get_bedrock_agent_client", lambda: client)
+    return client
+
+
+def test_session_id_is_reused(client):
+    response = query_knowledge_base("한도는?", knowledge_base_id="KB", session_id="live-session")
+
+    assert client.calls[0]["sessionId"] == "live-session"
+    assert response["session_id"] == "new-session"
+    assert response["citation_details"][0]["source_file"] == "limits.pdf"
+
+
+def test_expired_session_retries_without_session(client):
+    response = query_knowledge_base("한도는?", knowledge_base_id="KB", session_id="old-session")
+
+    assert [call.get("sessionId") for call in client.calls] == ["old-session", None]
+    assert response["output"] == "답변"
+
+
+def test_stream_yields_text_then_fills_output_and_citations(client):
+    params = knowledge_base.build_retrieve_and_generate_params("한도는?", "KB", knowledge_base.RetrievalConfig(), "old-session")
+
+    response = retrieve_and_generate_stream(client, params, "한도는?")
+    assert response["output"] == ""
+
+    assert list(response["stream"]) == ["한도는 ", "80%입니다"]
+    assert response["output"] == "한도는 80%입니다"
+    assert response["citation_details"][0]["referenced_content"] == "LTV 한도 80%"
+    assert response["session_id"] == "new-session"
+    assert "sessionId" not in client.calls[-1]
+
+
+def test_generation_is_rejected_for_local_backend(client):
+    response = query_knowledge_base("한도는?", knowledge_base_id="KB", backend="local")
+
+    assert response["response_type"] == "error"
+    assert client.calls == []
@@ -0,0 +1,110 @@
+"""lib.session_memory 세션 압축 및 참조 기반 정리 테스트"""
+import pytest
+from lib import session_memory as session_memory_module
+from lib.conversation import Conversation
+from lib.session_memory import SessionMemoryManager, get_message_content
+from lib.trace_store import TraceStore
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    traces = TraceStore(spill_dir=str(tmp_path / "traces"))
+    spills = TraceStore(spill_dir=str(tmp_path / "messages"))
+    monkeypatch.setattr(session_memory_module, "trace_store", traces)
+    monkeypatch.setattr(session_memory_module, "message_spill_store", spills)
+    return traces, spills
+
+
+def _state(messages, trace_id=None):
+    return {
+        "chat_messages": messages,
+        "converse_history": Conversation(),
+        "current_trace": {"trace_id": trace_id} if trace_id else None,
+        "flow_extracted_data": None
+    }
+
+
+def _messages(count, size):
+    return [{"role": "user", "content": f"{index}" + "가" * size} for index in range(count)]
+
+
+def test_compact_compresses_then_spills_old_messages(stores):
+    _, spills = stores
+    messages = _messages(10, 4000)
+    originals = [message["content"] for message in messages]
+    manager = SessionMemoryManager(session_budget_bytes=1, keep_recent_messages=2)
+
+    manager.enforce("s1", _state(messages))
+
+    assert all("spill_ref" in message and message["content"] is None for message in messages[:-2])
+    assert all(message["content"] == original for message, original in zip(messages[-2:], originals[-2:]))
+    assert [get_message_content(message) for message in messages] == originals
+    assert spills.stats()["memory_items"] == 8
+
+
+def test_compact_stops_after_compression_when_under_budget(stores):
+    messages = [{"role": "user", "content": "a" * 100000} for _ in range(4)]
+    manager = SessionMemoryManager(keep_recent_messages=1)
+    manager.session_budget_bytes = manager.footprint(_state(messages))["total"] - 1
+
+    manager.enforce("s1", _state(messages))
+
+    assert all("content_z" in message and "spill_ref" not in message for message in messages[:-1])
+    assert get_message_content(messages[0]) == "a" * 100000
+
+
+def test_footprint_cache_measures_only_new_messages(stores, monkeypatch):
+    manager = SessionMemoryManager()
+    messages = _messages(5, 10)
+    state = _state(messages)
+    first = manager.footprint(state, "s1")["total"]
+    assert manager.footprint(state, "s1")["total"] == first
+
+    measured = []
+    original = session_memory_module.estimate_size
+    monkeypatch.setattr(session_memory_module, "estimate_size", lambda obj: measured.append(obj) or original(obj))
+    messages.append({"role": "assistant", "content": "new"})
+    manager.footprint(state, "s1")
+
+    assert [obj for obj in measured if isinstance(obj, dict) and "role" in obj] == [messages[-1]]
+
+
+def test_active_sessions_are_never_evicted(stores):
+    traces, _ = stores
+    trace_id = traces.put({"a": 1})
+    manager = SessionMemoryManager(idle_ttl_seconds=0, is_session_active=lambda sid: True)
+
+    manager.enforce("idle", _state([], trace_id))
+    manager.enforce("other", _state([]))
+
+    assert trace_id in traces
+    assert manager.process_footprint()["sessions"] == 2
+
+
+def test_shared_refs_are_deleted_only_after_last_owner(stores):
+    traces, _ = stores
+    trace_id = traces.put({"a": 1})
+    alive = {"a": True, "b": True, "c": True}
+    manager = SessionMemoryManager(idle_ttl_seconds=0, is_session_active=lambda sid: alive[sid])
+
+    manager.enforce("a", _state([{"role": "assistant", "content": "x", "trace_ref": trace_id}]))
+    manager.enforce("b", _state([], trace_id))
+
+    alive["a"] = False
+    manager.enforce("c", _state([]))
+    assert trace_id in traces
+
+    alive["b"] = False
+    manager.enforce("c", _state([]))
+    assert trace_id not in traces
+
+
+def test_process_budget_spills_store_memory_instead_of_deleting(stores):
+    traces, _ = stores
+    trace_id = traces.put({"data": "x" * 10000})
+    manager = SessionMemoryManager(process_budget_bytes=1, is_session_active=lambda sid: True)
+
+    manager.enforce("s1", _state([], trace_id))
+
+    assert traces.stats()["memory_items"] == 0
+    assert traces.get(trace_id) == {"data": "x" * 10000}
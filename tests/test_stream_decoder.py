@@ -0,0 +1,28 @@
+"""lib.stream_decoder 바이트 조각 텍스트 변환 테스트"""
+from lib.stream_decoder import StreamTextDecoder
+
+
+def test_multibyte_character_split_across_chunks():
+    data = "안녕하세요, Bedrock!".encode("utf-8")
+    decoder = StreamTextDecoder()
+    for index in range(len(data)):
+        decoder.feed(data[index:index + 1])
+
+    assert decoder.getvalue() == "안녕하세요, Bedrock!"
+    assert len(decoder) == len(data)
+
+
+def test_buffer_grows_beyond_initial_capacity():
+    decoder = StreamTextDecoder(capacity=4)
+    decoder.feed(b"abc")
+    decoder.feed(memoryview(b"defgh"))
+    decoder.feed(b"")
+
+    assert decoder.getvalue() == "abcdefgh"
+
+
+def test_invalid_bytes_are_replaced():
+    decoder = StreamTextDecoder()
+    decoder.feed(b"ok\xff")
+
+    assert decoder.getvalue() == "ok�"
@@ -0,0 +1,46 @@
+"""lib.token_estimator 토큰 추정 및 요청 크기 사전 점검 테스트"""
+import pytest
+from lib import token_estimator
+from lib.token_estimator import (
+    MESSAGE_OVERHEAD_TOKENS, RequestTooLargeError, estimate_message_tokens, estimate_request_tokens,
+    estimate_tokens, preflight
+)
+
+CLAUDE = "anthropic.claude-3-haiku-20240307-v1:0"
+TITAN = "amazon.titan-text-express-v1"
+
+
+def test_korean_text_counts_more_tokens_than_ascii():
+    assert estimate_tokens("", CLAUDE) == 0
+    assert estimate_tokens("a" * 100, CLAUDE) == 29
+    assert estimate_tokens("가" * 100, CLAUDE) == 101
+
+
+def test_cache_does_not_keep_text(monkeypatch):
+    monkeypatch.setattr(token_estimator, "ESTIMATE_CACHE_SIZE", 2)
+    token_estimator._estimate_cache.clear()
+
+    for text in ["첫 번째 텍스트", "두 번째 텍스트", "세 번째 텍스트"]:
+        estimate_tokens(text, CLAUDE)
+
+    assert len(token_estimator._estimate_cache) == 2
+    assert not any(isinstance(part, str) for key in token_estimator._estimate_cache for part in key)
+    assert estimate_tokens("세 번째 텍스트", CLAUDE) == token_estimator._estimate("세 번째 텍스트", (0.28, 1.0))
+
+
+def test_message_and_request_estimates():
+    message = {"role": "user", "content": [{"text": "a" * 100}, {"cachePoint": {"type": "default"}}]}
+
+    assert estimate_message_tokens(message, CLAUDE) == 29 + MESSAGE_OVERHEAD_TOKENS
+    assert estimate_request_tokens([message], [{"text": "a" * 100}], CLAUDE) == 2 * 29 + MESSAGE_OVERHEAD_TOKENS
+
+
+def test_preflight_clamps_max_tokens_to_model_limits():
+    assert preflight(CLAUDE, 100, 10000) == 4096
+    assert preflight(CLAUDE, 100) == token_estimator.DEFAULT_MAX_TOKENS
+    assert preflight(TITAN, 7000, 4096) == int(8192 * 0.95) - 7000
+
+
+def test_preflight_rejects_requests_over_context():
+    with pytest.raises(RequestTooLargeError):
+        preflight(TITAN, 8000, 1024)
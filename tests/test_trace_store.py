@@ -0,0 +1,60 @@
+"""lib.trace_store 메시지별 트레이스 저장소 테스트"""
+from lib.trace_store import TraceStore
+
+
+def _store(tmp_path, **limits):
+    return TraceStore(spill_dir=str(tmp_path / "traces"), **limits)
+
+
+def test_put_and_get_round_trip(tmp_path):
+    store = _store(tmp_path)
+    trace_id = store.put({"trace_data": {"steps": [1, 2]}, "response_type": "agent"})
+
+    assert trace_id in store
+    assert store.get(trace_id) == {"trace_data": {"steps": [1, 2]}, "response_type": "agent"}
+    assert store.get_payload(trace_id) == b'{"trace_data":{"steps":[1,2]},"response_type":"agent"}'
+    assert store.get("missing") is None
+    assert store.get_payload(None) is None
+
+
+def test_least_recently_used_traces_spill_to_disk(tmp_path):
+    store = _store(tmp_path, max_memory_items=2)
+    first = store.put({"n": 1})
+    second = store.put({"n": 2})
+    store.get(first)
+    third = store.put({"n": 3})
+
+    assert store.stats() == {"memory_items": 2, "memory_bytes": len(b'{"n":1}') * 2, "disk_items": 1}
+    assert store.get(second) == {"n": 2}
+    assert store.get(first) == {"n": 1} and store.get(third) == {"n": 3}
+
+
+def test_disk_limit_drops_oldest(tmp_path):
+    store = _store(tmp_path, max_memory_items=1, max_disk_items=1)
+    ids = [store.put({"n": n}) for n in range(3)]
+
+    assert ids[0] not in store
+    assert store.get(ids[1]) == {"n": 1}
+    assert store.get(ids[2]) == {"n": 2}
+
+
+def test_delete_removes_memory_and_disk_copies(tmp_path):
+    store = _store(tmp_path, max_memory_items=1)
+    spilled = store.put({"n": 1})
+    kept = store.put({"n": 2})
+
+    store.delete(spilled)
+    store.delete(kept)
+
+    assert spilled not in store and kept not in store
+    assert store.stats() == {"memory_items": 0, "memory_bytes": 0, "disk_items": 0}
+    assert not list((tmp_path / "traces").iterdir())
+
+
+def test_put_with_same_id_replaces(tmp_path):
+    store = _store(tmp_path)
+    store.put({"n": 1}, trace_id="fixed")
+    store.put({"n": 2}, trace_id="fixed")
+
+    assert store.get("fixed") == {"n": 2}
+    assert store.stats()["memory_items"] == 1
@@ -0,0 +1,137 @@
+"""lib.trace_utils 직렬화 함수 및 트레이스 색인 테스트"""
+import json
+from lib.trace_utils import (
+    CIRCULAR_MARKER, DEPTH_MARKER, SIZE_MARKER, TRUNCATION_MARKER, TraceIndex, find_steps_in_trace,
+    get_trace_index, resolve_path, serialize_json
+)
+
+
+def test_structure_matches_payload():
+    structure, payload = serialize_json({"a": [1, 2.5, None, True, "한글"], 3: (1, 2), "b": b"raw"})
+    assert json.loads(payload) == structure
+    assert structure == {"a": [1, 2.5, None, True, "한글"], "3": [1, 2], "b": "raw"}
+
+
+def test_payload_is_compact():
+    _, payload = serialize_json({"a": [1, 2], "b": {"c": "d"}})
+    assert payload == b'{"a":[1,2],"b":{"c":"d"}}'
+
+
+def test_non_finite_float_becomes_null():
+    structure, payload = serialize_json([float("nan"), float("inf")])
+    assert structure == [None, None]
+    assert payload == b"[null,null]"
+
+
+def test_circular_reference():
+    data = {"a": 1}
+    data["self"] = data
+    structure, _ = serialize_json(data)
+    assert structure == {"a": 1, "self": CIRCULAR_MARKER}
+
+
+def test_string_and_bytes_truncation():
+    structure, _ = serialize_json({"s": "x" * 20, "b": b"y" * 20}, max_string_length=5, max_bytes_length=4)
+    assert structure == {"s": "xxxxx" + TRUNCATION_MARKER, "b": "yyyy" + TRUNCATION_MARKER}
+
+
+def test_depth_limit_without_recursion():
+    deep = node = {}
+    for _ in range(100000):
+        node["c"] = {}
+        node = node["c"]
+    structure, payload = serialize_json(deep, max_depth=3)
+    assert structure == {"c": {"c": {"c": DEPTH_MARKER}}}
+    assert json.loads(payload) == structure
+
+
+def test_total_size_limit_skips_remaining_items():
+    structure, payload = serialize_json({"l": list(range(100000)), "z": "after"}, max_total_bytes=50)
+    assert structure["l"][-1] == SIZE_MARKER
+    assert structure["z"] == SIZE_MARKER
+    assert len(payload) < 50 + 64
+
+
+def test_shared_subtree_is_reused():
+    shared = {"k": [1, 2]}
+    structure, payload = serialize_json({"a": shared, "b": shared})
+    assert structure == {"a": {"k": [1, 2]}, "b": {"k": [1, 2]}}
+    assert payload == b'{"a":{"k":[1,2]},"b":{"k":[1,2]}}'
+
+
+def test_shared_subtree_respects_size_limit():
+    shared = {"k": "x" * 300}
+    structure, payload = serialize_json({"a": shared, "b": shared, "c": shared}, max_total_bytes=400)
+    assert structure == {"a": shared, "b": SIZE_MARKER}
+    assert len(payload) < 400 + 64
+    assert json.loads(payload) == structure
+
+
+def test_shared_subtree_respects_depth_limit():
+    shared = {"z": {"z": 1}}
+    structure, _ = serialize_json({"p": shared, "q": {"r": shared}}, max_depth=3)
+    assert structure["p"] == {"z": {"z": 1}}
+    assert structure["q"] == {"r": {"z": DEPTH_MARKER}}
+
+
+def _agent_trace():
+    return {
+        "orchestrationTrace": {
+            "rationale": {"text": "생각"},
+            "invocationInput": [{"actionGroup": "a"}, {"actionGroup": "b"}],
+            "observation": {"finalResponse": {"text": "최종 답변"}}
+        }
+    }
+
+
+def test_trace_index_records_paths_in_document_order():
+    index = TraceIndex.build(_agent_trace())
+
+    assert index.paths("rationale") == [("orchestrationTrace", "rationale")]
+    assert index.paths("finalResponse") == [("orchestrationTrace", "observation", "finalResponse")]
+    assert index.paths("steps") == []
+
+
+def test_trace_index_lookups():
+    trace = _agent_trace()
+    index = TraceIndex.build(trace)
+
+    assert index.get(trace, "rationale") == {"text": "생각"}
+    assert index.get(trace, "steps") is None
+    assert index.final_response_text(trace) == "최종 답변"
+    assert index.steps(trace) == [{"actionGroup": "a"}, {"actionGroup": "b"}]
+
+
+def test_trace_index_incremental_fragments_with_prefix():
+    trace = {"events": [{"rationale": {"text": "첫째"}}, {"finalResponse": {"text": "끝"}}]}
+    index = TraceIndex()
+    index.add(trace["events"][0], ("events", 0))
+    index.add(trace["events"][1], ("events", 1))
+    # 같은 경로를 다시 추가해도 중복 기록하지 않음
+    index.add(trace["events"][1], ("events", 1))
+
+    assert index.paths("finalResponse") == [("events", 1, "finalResponse")]
+    assert index.final_response_text(trace) == "끝"
+
+
+def test_trace_index_round_trips_through_dict():
+    trace = _agent_trace()
+    restored = TraceIndex.from_dict(json.loads(json.dumps(TraceIndex.build(trace).to_dict())))
+
+    assert restored.paths("finalResponse") == [("orchestrationTrace", "observation", "finalResponse")]
+    assert restored.final_response_text(trace) == "최종 답변"
+
+
+def test_steps_prefers_steps_list():
+    trace = {"steps": [{"n": 1}], "invocationInput": [{"n": 2}]}
+    assert find_steps_in_trace(trace) == [{"n": 1}]
+    assert find_steps_in_trace({}) == []
+
+
+def test_get_trace_index_accepts_stored_dict():
+    trace = _agent_trace()
+    stored = TraceIndex.build(trace).to_dict()
+
+    assert get_trace_index(trace, stored).paths("rationale") == [("orchestrationTrace", "rationale")]
+    assert isinstance(get_trace_index(trace), TraceIndex)
+    assert resolve_path(trace, ("orchestrationTrace", "missing")) is None
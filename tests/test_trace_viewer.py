@@ -0,0 +1,68 @@
+"""ui.trace_viewer 트리 렌더링 및 큰 트레이스 처리 테스트"""
+import pytest
+
+pytest.importorskip("streamlit")
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+
+def _tree_script():
+    from ui.trace_viewer import render_trace_tree
+    render_trace_tree({"a": {"b": {"c": 1}}, "items": [1, 2, 3], "name": "trace"}, "tree")
+
+
+def _small_trace_script():
+    from ui.trace_viewer import render_full_trace_json
+    render_full_trace_json({"a": 1}, b'{"a":1}', "small", "trace-id", "test")
+
+
+def _large_trace_script():
+    import ui.trace_viewer as trace_viewer
+    trace_viewer.MAX_INLINE_TRACE_BYTES = 4
+    trace_viewer.render_full_trace_json({"a": 1}, b'{"a":1}', "large", "trace-id", "test")
+
+
+def _paged_tree_script():
+    import ui.trace_viewer as trace_viewer
+    trace_viewer.TREE_PAGE_SIZE = 2
+    trace_viewer.render_trace_tree({str(index): index for index in range(5)}, "paged")
+
+
+def test_tree_renders_only_top_level_until_expanded():
+    at = AppTest.from_function(_tree_script).run()
+
+    assert not at.exception
+    assert [toggle.label for toggle in at.toggle] == ["a {1}", "items [3]"]
+    assert [text.value for text in at.text] == ["name: trace"]
+
+    at.toggle[0].set_value(True).run()
+    assert [toggle.label.strip() for toggle in at.toggle] == ["a {1}", "b {1}", "items [3]"]
+
+
+def test_small_trace_json_behind_toggle():
+    at = AppTest.from_function(_small_trace_script).run()
+
+    assert not at.exception
+    assert len(at.warning) == 0
+    assert len(at.code) == 0
+
+    at.toggle[0].set_value(True).run()
+    assert len(at.code) == 1
+
+
+def test_large_trace_is_not_rendered_inline():
+    at = AppTest.from_function(_large_trace_script).run()
+
+    assert not at.exception
+    assert len(at.warning) == 1
+    assert len(at.toggle) == 0
+    assert len(at.code) == 0
+
+
+def test_tree_pages_large_levels():
+    at = AppTest.from_function(_paged_tree_script).run()
+
+    assert not at.exception
+    assert len(at.text) == 2
+    at.button[0].click().run()
+    assert len(at.text) == 4
@@ -0,0 +1,59 @@
+"""lib.transcript_store 저장/복원 및 소유자 확인 테스트"""
+import pytest
+from lib import transcript_store as transcript_module
+from lib.transcript_store import SQLiteTranscriptStore, owner_digest, restore_session
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = SQLiteTranscriptStore(str(tmp_path / "transcripts.db"))
+    monkeypatch.setattr(transcript_module, "transcript_store", store)
+    return store
+
+
+def test_claim_binds_session_to_first_owner(store):
+    alice, bob = owner_digest("alice"), owner_digest("bob")
+
+    assert store.claim("token", alice)
+    assert not store.claim("token", bob)
+    assert store.is_owner("token", alice)
+    assert not store.is_owner("token", bob)
+    assert not store.is_owner("unknown", alice)
+
+
+def test_restore_requires_owner(store):
+    alice, bob = owner_digest("alice"), owner_digest("bob")
+    store.claim("token", alice)
+    store.append("token", {"role": "user", "content": "안녕"})
+
+    restored = restore_session("token", alice)
+    assert [msg["content"] for msg in restored["chat_messages"]] == ["안녕"]
+
+    assert restore_session("token", bob)["chat_messages"] == []
+
+
+def test_pages_and_converse_turns(store):
+    owner = owner_digest("alice")
+    store.claim("token", owner)
+    for index in range(5):
+        store.append("token", {"role": "user", "content": f"q{index}"})
+        store.append("token", {"role": "assistant", "content": f"a{index}", "response_type": "converse"})
+
+    restored = restore_session("token", owner, limit=4)
+    assert [msg["content"] for msg in restored["chat_messages"]] == ["q3", "a3", "q4", "a4"]
+    assert restored["has_more"]
+    assert len(restored["converse_history"]) == 10
+
+    earlier = store.load_page("token", before_seq=restored["chat_messages"][0]["seq"], limit=2)
+    assert [msg["content"] for msg in earlier] == ["q2", "a2"]
+
+
+def test_delete_keeps_ownership(store):
+    owner = owner_digest("alice")
+    store.claim("token", owner)
+    store.append("token", {"role": "user", "content": "x"})
+
+    store.delete("token")
+
+    assert store.load_page("token") == []
+    assert store.is_owner("token", owner)
@@ -7,26 +7,109 @@
 사용자 입력 처리, 응답 생성, 채팅 기록 표시 및 트레이스 정보 시각화 기능을 담당합니다.
 """
 import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import time
-import json
+import uuid
 from lib.invoke_model import invoke_model
 from lib.converse import converse
+from lib.conversation import Conversation
+from lib.history_compaction import HistoryCompactor
+from lib.model_router import AUTO_MODEL_ID, model_router
+from lib.token_estimator import estimate_request_tokens
 from lib.knowledge_base import query_knowledge_base
+from lib.rag import RagSession, rag_converse_stream, DEFAULT_CONTEXT_TOKEN_BUDGET
 from lib.agent import invoke_agent
 from lib.flow import invoke_flow
-from lib.trace_utils import ensure_json_serializable
-from lib.logging_config import logger
+from lib.json_codec import dumpb
+from lib.trace_utils import serialize_json, find_steps_in_trace
+from lib.trace_store import trace_store
+from ui.trace_viewer import load_trace, render_trace_tree, render_full_trace_json
+from lib.session_memory import session_memory, get_message_content
+from lib.transcript_store import get_transcript_store, restore_session, owner_digest
+from lib.config import config
+from lib.alb_auth import ALB_OIDC_DATA_HEADER, verify_alb_identity
+from lib.logging_config import logger, log_context, lazy
+from lib.metrics import CHAT_REQUESTS_IN_FLIGHT, CHAT_REQUEST_SECONDS, CHAT_REQUESTS_TOTAL
+
+
+# 인증 헤더가 없는 사용자의 소유자 식별자
+ANONYMOUS_OWNER = "anonymous"
+
+
+def get_transcript_owner():
+    """
+    ALB OIDC 인증이 서명한 사용자 클레임에서 현재 사용자의 소유자 값을 구합니다.
+    
+    클라이언트가 임의로 보낼 수 있는 헤더 값은 믿지 않고 서명을 검증하며, 검증된 사용자가 없으면 None을 반환합니다.
+    """
+    identity = verify_alb_identity(st.context.headers.get(ALB_OIDC_DATA_HEADER))
+    return owner_digest(identity) if identity else None
+
+
+def init_transcript_session():
+    """
+    채팅 기록 세션 토큰을 정하고 저장된 대화를 복원합니다.
+    
+    URL의 session 파라미터는 현재 사용자가 소유한 세션일 때만 복원하고, 그렇지 않으면 새 세션을 시작합니다.
+    검증된 사용자가 없으면 transcript_anonymous_restore가 켜진 경우에만 토큰을 URL에 노출합니다.
+    """
+    store = get_transcript_store()
+    owner = get_transcript_owner()
+    restorable = owner is not None or config.transcript_anonymous_restore
+    if owner is None:
+        owner = owner_digest(ANONYMOUS_OWNER)
+    
+    token = st.query_params.get("session") if restorable else None
+    if token:
+        try:
+            if not store.is_owner(token, owner):
+                logger.warning("⚠️ 소유하지 않은 세션 토큰으로 접속하여 새 세션을 시작합니다")
+                token = None
+        except Exception as e:
+            logger.warning(f"세션 소유자 확인 실패: {str(e)}")
+            token = None
+    
+    if token:
+        restored = restore_session(token, owner)
+        st.session_state.chat_messages = restored["chat_messages"]
+        st.session_state.converse_history = restored["converse_history"]
+        st.session_state.transcript_has_more = restored["has_more"]
+    else:
+        token = uuid.uuid4().hex
+        try:
+            store.claim(token, owner)
+        except Exception as e:
+            logger.warning(f"채팅 기록 세션 등록 실패: {str(e)}")
+        if restorable:
+            st.query_params["session"] = token
+        elif "session" in st.query_params:
+            del st.query_params["session"]
+    
+    st.session_state.transcript_token = token
 
 
 def init_chat():
     """채팅 인터페이스 초기화 - 필요한 세션 변수들을 초기화합니다"""
+    # 세션 토큰 확인 및 저장된 대화 복원 (소유한 세션이면 URL의 session 파라미터로 재접속 시 이어서 진행)
+    if "transcript_token" not in st.session_state:
+        init_transcript_session()
+    
     # 기본 채팅 관련 상태 초기화
     if "chat_messages" not in st.session_state:
         st.session_state.chat_messages = []
     if "current_trace" not in st.session_state:
         st.session_state.current_trace = None
     if "converse_history" not in st.session_state:
-        st.session_state.converse_history = []
+        st.session_state.converse_history = Conversation()
+    if "converse_compactor" not in st.session_state:
+        st.session_state.converse_compactor = HistoryCompactor()
+    if "rag_history" not in st.session_state:
+        st.session_state.rag_history = Conversation()
+    if "rag_session" not in st.session_state:
+        st.session_state.rag_session = RagSession()
+    if "rag_compactor" not in st.session_state:
+        st.session_state.rag_compactor = HistoryCompactor()
     
     # 처리 상태 관련 변수 초기화
     if "processing_status" not in st.session_state:
@@ -43,8 +126,34 @@ def init_chat():
         st.session_state.response_mode = "Foundation Model"
 
 
-def add_message(role, content, response_type=None):
-    """채팅 메시지를 저장합니다"""
+def get_session_id():
+    """현재 Streamlit 세션의 ID를 반환합니다"""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "local"
+
+
+def is_session_active(session_id):
+    """브라우저 탭이 아직 연결되어 있는 Streamlit 세션인지 확인합니다 (런타임 밖에서는 항상 True)"""
+    if not Runtime.exists():
+        return True
+    return Runtime.instance().is_active_session(session_id)
+
+
+# 열려 있는 세션의 저장소 항목은 정리하지 않도록 세션 연결 상태 확인 함수를 등록
+session_memory.is_session_active = is_session_active
+
+
+def enforce_session_memory():
+    """현재 세션에 메모리 한도를 적용하고 사용량 보고서를 세션에 저장합니다"""
+    st.session_state.memory_report = session_memory.enforce(get_session_id(), st.session_state)
+
+
+def add_message(role, content, response_type=None, trace_ref=None, meta=None):
+    """
+    채팅 메시지를 저장합니다 (트레이스는 trace_store의 ID로만 참조)
+    
+    meta에는 토큰 사용량 등 응답 부가 정보를 담습니다.
+    """
     message = {
         "role": role,
         "content": content,
@@ -53,12 +162,44 @@ def add_message(role, content, response_type=None):
     
     if role == "assistant" and response_type:
         message["response_type"] = response_type
+    if trace_ref:
+        message["trace_ref"] = trace_ref
+    if meta:
+        message["meta"] = meta
+    
+    # 채팅 기록 저장소에 즉시 추가 (실패해도 대화는 계속 진행)
+    try:
+        message["seq"] = get_transcript_store().append(st.session_state.transcript_token, message)
+    except Exception as e:
+        logger.warning(f"채팅 기록 저장 실패: {str(e)}")
     
     st.session_state.chat_messages.append(message)
 
 
+def load_earlier_messages():
+    """저장소에서 현재 표시 중인 메시지 이전 페이지를 불러와 앞에 추가합니다"""
+    messages = st.session_state.chat_messages
+    oldest_seq = next((msg["seq"] for msg in messages if "seq" in msg), None)
+    if oldest_seq is None:
+        st.session_state.transcript_has_more = False
+        return
+    
+    store = get_transcript_store()
+    earlier = store.load_page(st.session_state.transcript_token, before_seq=oldest_seq)
+    st.session_state.chat_messages = earlier + messages
+    st.session_state.transcript_has_more = bool(earlier) and store.has_before(
+        st.session_state.transcript_token, earlier[0]["seq"]
+    )
+
+
 def display_chat_history():
     """저장된 채팅 기록을 화면에 표시합니다"""
+    # 이전 페이지 불러오기 (재접속 시 최근 메시지만 복원되므로)
+    if st.session_state.get("transcript_has_more"):
+        if st.button("이전 메시지 불러오기", key="load_earlier_messages"):
+            load_earlier_messages()
+            st.rerun()
+    
     # 저장된 메시지 표시
     for msg_idx, msg in enumerate(st.session_state.chat_messages):
         with st.chat_message(msg["role"]):
@@ -68,7 +209,34 @@ def display_chat_history():
                 st.caption(f"응답 유형: {response_type_display}")
             
             # 메시지 내용 표시
-            st.markdown(msg["content"])
+            st.markdown(get_message_content(msg))
+            
+            # 자동 라우팅 결정 표시 (존재하는 경우)
+            routing = msg.get("meta", {}).get("routing")
+            if routing:
+                escalated = " (승격)" if routing.get("escalated") else ""
+                st.caption(f"모델 자동 선택{escalated}: {routing['model_id']} - {routing['reason']}")
+            
+            # 헤지 요청의 보조 모델이 응답한 경우 표시
+            hedged_model_id = msg.get("meta", {}).get("hedged_model_id")
+            if hedged_model_id:
+                st.caption(f"⚠️ 지연으로 보조 모델이 응답했습니다: {hedged_model_id}")
+            
+            # 토큰/캐시 사용량 표시 (존재하는 경우)
+            usage = msg.get("meta", {}).get("usage")
+            if usage:
+                st.caption(
+                    f"토큰: 입력 {usage['input_tokens']} / 출력 {usage['output_tokens']} / "
+                    f"캐시 읽기 {usage['cache_read_tokens']} / 캐시 쓰기 {usage['cache_write_tokens']}"
+                )
+            
+            # 검색 결과 재정렬 비용 표시 (존재하는 경우)
+            rerank = msg.get("meta", {}).get("rerank")
+            if rerank:
+                st.caption(
+                    f"재정렬: 후보 {rerank['candidates']}개 → {rerank['selected']}개, {rerank['elapsed_ms']}ms, "
+                    f"임베딩 {rerank['embedding_calls']}회 ({rerank['embedding_tokens']} 토큰)"
+                )
             
             # 트레이스 정보 표시 (Agent/Flow인 경우)
             if msg["role"] == "assistant" and msg.get("response_type") in ["agent", "flow"]:
@@ -80,31 +248,52 @@ def display_chat_history():
             st.write("생각 중...")
 
 
+@st.fragment
 def display_trace_info(msg_idx):
-    """특정 메시지와 연관된 트레이스 정보를 표시합니다"""
-    trace_available = 'current_trace' in st.session_state and st.session_state.current_trace is not None
+    """
+    특정 메시지와 연관된 트레이스 정보를 표시합니다 (메시지별 프래그먼트).
     
-    if trace_available:
-        trace_data = st.session_state.current_trace.get("trace_data", {})
-        
+    트레이스는 사용자가 불러오기를 켠 경우에만 저장소에서 역직렬화하여 렌더링합니다.
+    """
+    messages = st.session_state.chat_messages
+    trace_ref = messages[msg_idx].get("trace_ref") if msg_idx < len(messages) else None
+    
+    if trace_ref and trace_ref in trace_store:
         with st.expander("🔍 트레이스 정보", expanded=False):
+            if not st.toggle("트레이스 불러오기", key=f"trace_toggle_{trace_ref}"):
+                st.caption("트레이스 불러오기를 켜면 상세 정보가 표시됩니다.")
+                return
+            
+            trace_record, payload, payload_hash = load_trace(trace_ref)
+            if payload is None:
+                st.warning("트레이스 정보를 찾을 수 없습니다.")
+                return
+            trace_data = trace_record.get("trace_data", {})
+            key_prefix = f"msg_trace_{trace_ref}"
+            
+            # 트레이스는 펼친 노드만 그리는 트리로 표시 (전체 JSON은 크기에 따라 토글 또는 다운로드)
             if "orchestrationTrace" in trace_data:
-                display_orchestration_trace(trace_data["orchestrationTrace"], msg_idx)
-            else:
-                st.json(trace_data)
+                steps = find_steps_in_trace(trace_data, trace_record.get("trace_index"))
+                display_orchestration_trace(trace_data["orchestrationTrace"], steps, key_prefix)
+            elif isinstance(trace_data, (dict, list)):
+                render_trace_tree(trace_data, f"{key_prefix}_tree")
+            
+            st.divider()
+            render_full_trace_json(trace_data, payload, payload_hash, trace_ref, key_prefix)
     else:
         with st.expander("⚠️ 트레이스 정보 없음", expanded=False):
             st.warning("트레이스 정보를 찾을 수 없습니다.")
 
 
-def display_orchestration_trace(trace, msg_idx):
-    """오케스트레이션 트레이스를 스텝별로 표시합니다"""
-    # 스텝 정보 추출
-    steps = trace.get("invocationInput", {}).get("steps", [])
+def display_orchestration_trace(trace, steps, key_prefix):
+    """
+    오케스트레이션 트레이스를 스텝별로 표시합니다 (스텝은 트레이스 색인으로 조회한 목록).
     
+    스텝 원본 데이터는 펼친 노드만 그리는 트리로 표시합니다.
+    """
     if not steps:
         st.warning("스텝 정보가 없습니다.")
-        st.json(trace)
+        render_trace_tree(trace, f"{key_prefix}_orchestration")
         return
     
     # 요약 탭과 스텝별 탭 생성
@@ -143,7 +332,7 @@ def display_orchestration_trace(trace, msg_idx):
                         st.write(f"- {param.get('name')}: {param.get('value')}")
             
             with st.expander("전체 스텝 데이터", expanded=False):
-                st.json(step)
+                render_trace_tree(step, f"{key_prefix}_step_{i}")
 
 
 def show_flow_trace(trace_data, msg_idx):
@@ -156,7 +345,7 @@ def show_flow_trace(trace_data, msg_idx):
         st.json(st.session_state.flow_extracted_data)
     
     with st.expander("전체 Flow 트레이스 데이터", expanded=False):
-        st.json(trace_data)
+        render_trace_tree(trace_data, f"flow_trace_{msg_idx}")
 
 
 def get_response_type_display(response_type):
@@ -166,6 +355,7 @@ def get_response_type_display(response_type):
         "converse": "Converse API",
         "retrieve": "Knowledge Base (Retrieve API)",
         "retrieve_and_generate": "Knowledge Base (RetrieveandGenerate API)",
+        "rag": "Knowledge Base (RAG + ConverseStream)",
         "agent": "Agent",
         "flow": "Flow",
         "error": "오류"
@@ -206,13 +396,8 @@ def process_user_input(user_input):
     response_mode = st.session_state.response_mode
     
     # 로깅
-    logger.info(f"사용자 입력 처리 시작: '{user_input}'")
-    logger.info(f"현재 응답 모드: {response_mode}")
-    
-    if response_mode == "Agent":
-        logger.info(f"Agent API 호출 - enableTrace: {st.session_state.get('agent_enable_trace', True)}")
-    elif response_mode == "Flow":
-        logger.info(f"Flow API 호출 - enableTrace: {st.session_state.get('flow_enable_trace', True)}")
+    logger.info("사용자 입력 처리 시작: 모드=%s, %d 글자", response_mode, len(user_input))
+    logger.debug("사용자 입력: %.200s", user_input)
     
     # 처리 상태 업데이트
     st.session_state.processing_status = {
@@ -234,62 +419,116 @@ def check_pending_response():
         prompt = st.session_state.processing_status["current_prompt"]
         mode = st.session_state.processing_status["current_mode"]
         
-        try:
-            # 응답 생성
-            response_data = generate_response(prompt, mode)
-            output = response_data.get("output", "응답을 생성할 수 없습니다.")
-            response_type = response_data.get("response_type", "unknown")
-            
-            # 디버그 정보 처리
-            if "debug_info" in response_data:
-                logger.info(f"응답 디버그 정보: {response_data['debug_info']}")
-            
-            # 트레이스 정보 처리
-            if "trace" in response_data and response_data["trace"]:
-                process_trace_data(response_data, response_type)
-            else:
-                logger.warning("트레이스 정보 없음")
-                st.session_state.current_trace = None
+        # 이 요청에서 기록되는 로그에 요청/세션 ID 부여, 모드별 처리 중 요청 수/처리 시간 기록
+        with log_context(uuid.uuid4().hex[:12], get_session_id()), CHAT_REQUESTS_IN_FLIGHT.track_in_progress(mode=mode):
+            start = time.perf_counter()
+            status = "error"
+            try:
+                # 응답 생성
+                response_data = generate_response(prompt, mode)
+                
+                # 스트리밍 응답은 도착하는 대로 표시한 뒤 채팅 기록으로 옮김
+                if "stream" in response_data:
+                    stream_placeholder = st.empty()
+                    with stream_placeholder.container():
+                        with st.chat_message("assistant"):
+                            st.write_stream(response_data["stream"])
+                    stream_placeholder.empty()
+                
+                # 생성형 KB 응답의 출처 표시
+                if response_data.get("citation_details"):
+                    response_data["output"] += format_citations(response_data["citation_details"])
+                
+                output = response_data.get("output", "응답을 생성할 수 없습니다.")
+                response_type = response_data.get("response_type", "unknown")
+                
+                # 디버그 정보 처리
+                if "debug_info" in response_data:
+                    logger.debug("응답 디버그 정보: %s", response_data["debug_info"])
+                
+                # 트레이스 정보 처리
+                trace_ref = None
+                if "trace" in response_data and response_data["trace"]:
+                    trace_ref = process_trace_data(response_data, response_type)
+                else:
+                    logger.warning("트레이스 정보 없음")
+                    st.session_state.current_trace = None
+                
+                # 응답 부가 정보 (토큰/캐시 사용량, 라우팅, 헤지 응답 모델)
+                meta = {}
+                if response_data.get("usage"):
+                    meta["usage"] = response_data["usage"]
+                if response_data.get("routing"):
+                    meta["routing"] = response_data["routing"]
+                if response_data.get("rerank"):
+                    meta["rerank"] = response_data["rerank"]
+                if response_data.get("hedged_model"):
+                    meta["hedged_model_id"] = response_data["model_id"]
+                
+                # 응답 메시지 추가
+                add_message("assistant", output, response_type, trace_ref=trace_ref, meta=meta)
+                status = "error" if response_type == "error" else "success"
+                
+                # Converse API 대화 기록 업데이트
+                if response_data.get("response_type") == "converse" and "conversation_history" in response_data:
+                    st.session_state.converse_history = response_data["conversation_history"]
+                
+                # RAG 대화 기록 업데이트
+                if response_data.get("response_type") == "rag" and "conversation_history" in response_data:
+                    st.session_state.rag_history = response_data["conversation_history"]
             
-            # 응답 메시지 추가
-            add_message("assistant", output, response_type)
+            except Exception as e:
+                logger.error(f"응답 생성 중 오류 발생: {str(e)}", exc_info=True)
+                add_message("assistant", f"⚠️ 오류 발생: {str(e)}", "error")
             
-            # Converse API 대화 기록 업데이트
-            if response_data.get("response_type") == "converse" and "conversation_history" in response_data:
-                st.session_state.converse_history = response_data["conversation_history"]
-        
-        except Exception as e:
-            logger.error(f"응답 생성 중 오류 발생: {str(e)}", exc_info=True)
-            add_message("assistant", f"⚠️ 오류 발생: {str(e)}", "error")
-        
-        finally:
-            # 처리 완료
-            st.session_state.processing_status["is_processing"] = False
-            st.session_state.pending_message = None
+            finally:
+                CHAT_REQUEST_SECONDS.observe(time.perf_counter() - start, mode=mode)
+                CHAT_REQUESTS_TOTAL.inc(mode=mode, status=status)
+                
+                # 처리 완료
+                st.session_state.processing_status["is_processing"] = False
+                st.session_state.pending_message = None
 
 
 def process_trace_data(response_data, response_type):
-    """트레이스 데이터를 처리하고 저장합니다"""
-    trace_data = response_data["trace"]
-    trace_type = type(trace_data).__name__
-    trace_keys = list(trace_data.keys()) if isinstance(trace_data, dict) else "N/A"
+    """
+    트레이스 데이터를 트레이스 저장소에 저장합니다.
+    
+    세션 상태에는 최신 트레이스의 참조 정보만 남깁니다.
     
-    logger.info(f"트레이스 정보: 존재=True, 타입={trace_type}, 키={trace_keys}")
+    Returns:
+        str: 저장된 트레이스 ID
+    """
+    trace_data = response_data["trace"]
+    logger.debug(
+        "트레이스 정보: 타입=%s, 키=%s", type(trace_data).__name__,
+        lazy(lambda: list(trace_data) if isinstance(trace_data, dict) else "N/A")
+    )
     
-    # 트레이스 정보 저장
+    # 트레이스 정보 저장 (한 번만 직렬화하여 저장소와 디버깅 파일에 함께 사용)
+    timestamp = time.time()
+    trace_record, payload = serialize_json({
+        "trace_data": trace_data,
+        "trace_index": response_data.get("trace_index"),
+        "response_type": response_type,
+        "timestamp": timestamp
+    })
+    trace_id = trace_store.put_payload(payload)
     st.session_state.current_trace = {
-        "trace_data": ensure_json_serializable(trace_data),
+        "trace_id": trace_id,
         "response_type": response_type,
-        "timestamp": time.time()
+        "timestamp": timestamp
     }
-    logger.info("✅ 트레이스 정보 저장 완료")
+    logger.info(f"✅ 트레이스 정보 저장 완료: {trace_id}")
     
     # 디버깅용 파일 저장
     try:
-        with open("last_trace.json", "w") as f:
-            json.dump(ensure_json_serializable(trace_data), f, indent=2)
+        with open("last_trace.json", "wb") as f:
+            f.write(dumpb(trace_record["trace_data"], pretty=True))
     except Exception as e:
         logger.warning(f"트레이스 파일 저장 실패: {str(e)}")
+    
+    return trace_id
 
 
 def generate_response(prompt, mode):
@@ -298,12 +537,20 @@ def generate_response(prompt, mode):
     # Foundation Model 모드
     if mode == "Foundation Model":
         model_id = st.session_state.get("model_id")
-        # 이 부분을 수정:
-        response = invoke_model(prompt, model_id)  # invoke_foundation_model -> invoke_model
-        return {
-            "response_type": "foundation_model",
-            "output": response
-        }
+        
+        def call_model(selected_model_id):
+            return {
+                "response_type": "foundation_model",
+                "output": invoke_model(prompt, selected_model_id)
+            }
+        
+        # 자동 라우팅 모드
+        if model_id == AUTO_MODEL_ID:
+            response, decision = model_router.execute(prompt, call_model)
+            response["routing"] = decision.to_dict()
+            return response
+        
+        return call_model(model_id)
     
     # Converse API 모드
     elif mode == "Converse API":
@@ -311,31 +558,79 @@ def generate_response(prompt, mode):
         temperature = st.session_state.get("temperature", 0.7)
         max_tokens = st.session_state.get("max_tokens", 1024)
         
-        return invoke_converse(
-            prompt, 
-            conversation_history=st.session_state.converse_history,
-            model_id=model_id,
-            temperature=temperature,
-            max_tokens=max_tokens
-        )
+        def call_converse(selected_model_id):
+            return converse(
+                prompt, 
+                conversation_history=st.session_state.converse_history,
+                model_id=selected_model_id,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                compactor=st.session_state.converse_compactor
+            )
+        
+        # 자동 라우팅 모드 (대화 기록 크기도 복잡도에 반영)
+        if model_id == AUTO_MODEL_ID:
+            history_tokens = estimate_request_tokens(st.session_state.converse_history.messages)
+            response, decision = model_router.execute(prompt, call_converse, context_tokens=history_tokens)
+            response["routing"] = decision.to_dict()
+            return response
+        
+        return call_converse(model_id)
     
     # Knowledge Base Retrieve 모드
     elif mode == "Knowledge Base (Retrieve)":
         kb_id = st.session_state.get("knowledge_base_id")
-        response = query_knowledge_base(prompt, kb_id, retrieve_only=True)
+        retrieval_config = st.session_state.get("retrieval_config")
+        response = query_knowledge_base(prompt, kb_id, retrieve_only=True, retrieval_config=retrieval_config)
         
         # 검색 결과 포맷팅
         if response.get("results"):
             response["output"] = format_kb_results(response["results"])
         else:
             response["output"] = "검색 결과가 없습니다."
+        
+        # 통합 검색에서 응답하지 않은 KB 안내
+        if response.get("failed_knowledge_bases"):
+            failed = ", ".join(response["failed_knowledge_bases"])
+            response["output"] += f"\n\n⚠️ 응답하지 않은 Knowledge Base: {failed}"
             
         return response
     
     # Knowledge Base Retrieve & Generate 모드
     elif mode == "Knowledge Base (Retrieve & Generate)":
         kb_id = st.session_state.get("knowledge_base_id")
-        return query_knowledge_base(prompt, kb_id, retrieve_only=False)
+        retrieval_config = st.session_state.get("retrieval_config")
+        
+        # 같은 KB로 이어지는 대화는 서비스 세션을 재사용
+        kb_session = st.session_state.get("kb_session") or {}
+        session_id = kb_session.get("session_id") if kb_session.get("knowledge_base_id") == kb_id else None
+        
+        response = query_knowledge_base(
+            prompt, kb_id, retrieve_only=False, retrieval_config=retrieval_config,
+            session_id=session_id, stream=st.session_state.get("kb_stream", True)
+        )
+        if response.get("session_id"):
+            st.session_state.kb_session = {"knowledge_base_id": kb_id, "session_id": response["session_id"]}
+        return response
+    
+    # Knowledge Base RAG 모드 (검색 후 직접 컨텍스트를 구성하여 스트리밍 생성)
+    elif mode == "Knowledge Base (RAG)":
+        response = rag_converse_stream(
+            prompt,
+            knowledge_base_id=st.session_state.get("knowledge_base_id"),
+            retrieval_config=st.session_state.get("retrieval_config"),
+            conversation_history=st.session_state.get("rag_history"),
+            model_id=st.session_state.get("rag_model_id"),
+            rag_session=st.session_state.get("rag_session"),
+            context_token_budget=st.session_state.get("rag_context_budget", DEFAULT_CONTEXT_TOKEN_BUDGET),
+            compactor=st.session_state.get("rag_compactor")
+        )
+        
+        if response.get("failed_knowledge_bases"):
+            failed = ", ".join(response["failed_knowledge_bases"])
+            logger.warning(f"⚠️ 응답하지 않은 Knowledge Base: {failed}")
+        
+        return response
     
     # Agent 모드
     elif mode == "Agent":
@@ -388,6 +683,23 @@ def format_kb_results(results):
         
         source = result.get('source', 'Unknown')
         filename = result.get('source_filename', 'Unknown')
-        formatted_output += f"**출처:** [{filename}]({source})\n\n---\n\n"
+        formatted_output += f"**출처:** [{filename}]({source})"
+        if result.get('knowledge_base_id'):
+            formatted_output += f" (KB: {result['knowledge_base_id']})"
+        formatted_output += "\n\n---\n\n"
     
-    return formatted_output
\ No newline at end of file
+    return formatted_output
+
+
+def format_citations(citation_details):
+    """생성형 KB 응답에 사용된 출처 목록을 마크다운으로 변환합니다 (같은 출처는 한 번만 표시)"""
+    lines = ["\n\n---\n**출처:**"]
+    seen = set()
+    for citation in citation_details:
+        key = (citation.get("citation"), citation["source_uri"])
+        if key in seen:
+            continue
+        seen.add(key)
+        label = f"[{citation['citation']}] " if citation.get("citation") else ""
+        lines.append(f"- {label}[{citation['source_file']}]({citation['source_uri']})")
+    return "\n".join(lines)
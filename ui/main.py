@@ -8,7 +8,7 @@
 
 import streamlit as st
 from ui.sidebar import render_sidebar
-from ui.chat_interface import init_chat, display_chat_history, process_user_input, handle_sample_prompt, check_pending_response
+from ui.chat_interface import init_chat, display_chat_history, process_user_input, handle_sample_prompt, check_pending_response, enforce_session_memory
 
 def render_main_ui():
     """
@@ -26,6 +26,9 @@ def render_main_ui():
     # 대기 중인 응답 확인 및 처리
     check_pending_response()
     
+    # 세션 메모리 한도 적용 및 유휴 세션 정리
+    enforce_session_memory()
+    
     # 사이드바 렌더링 (설정 및 모드 선택)
     render_sidebar()
     
@@ -36,6 +39,15 @@ def render_main_ui():
         handle_sample_prompt(prompt)
     
     # 현재 모드 및 상태 표시
+    render_status_indicator()
+    
+    # 채팅 인터페이스 - 전체 너비 사용
+    render_chat_area()
+
+
+@st.fragment
+def render_status_indicator():
+    """현재 모드와 처리 상태를 표시합니다 (독립적으로 재실행되는 프래그먼트)"""
     col_status1, col_status2 = st.columns(2)
     
     with col_status1:
@@ -49,12 +61,20 @@ def render_main_ui():
             st.warning("요청 처리 중...", icon="⏳")
         else:
             st.success("준비 완료", icon="✅")
+
+
+@st.fragment
+def render_chat_area():
+    """
+    채팅 기록과 입력 필드를 렌더링합니다 (독립적으로 재실행되는 프래그먼트).
     
-    # 채팅 인터페이스 - 전체 너비 사용
+    새 메시지가 입력되면 process_user_input이 전체 앱 재실행을 요청하므로
+    상태 표시와 사이드바도 함께 갱신됩니다.
+    """
     # 이전 채팅 기록 표시
     display_chat_history()
     
     # 사용자 입력 필드 및 처리 로직
     user_input = st.chat_input("메시지를 입력하세요...", disabled=st.session_state.processing_status.get("is_processing", False))
     if user_input:
-        process_user_input(user_input)
\ No newline at end of file
+        process_user_input(user_input)
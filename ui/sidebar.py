@@ -7,7 +7,16 @@ Streamlit 애플리케이션의 사이드바 UI 구성 모듈
 사용자가 샘플 프롬프트를 선택할 수 있는 인터페이스를 제공합니다.
 """
 import streamlit as st
-from lib.config import config
+from lib.config import config, MODEL_OPTIONS
+from lib.conversation import Conversation
+from lib.history_compaction import HistoryCompactor
+from lib.knowledge_base import RetrievalConfig, SEARCH_TYPES, BACKEND_BEDROCK, BACKEND_LOCAL, parse_filter_expression
+from lib.model_router import AUTO_MODEL_ID
+from lib.rag import RagSession, DEFAULT_CONTEXT_TOKEN_BUDGET
+from lib.retrieval_cache import retrieval_cache
+from lib.trace_store import trace_store
+from lib.session_memory import message_spill_store
+from lib.transcript_store import get_transcript_store
 
 # 모든 모드에서 공통으로 사용할 샘플 프롬프트
 SAMPLE_PROMPTS = [
@@ -19,13 +28,6 @@ SAMPLE_PROMPTS = [
     { "income": 80000, "totalDebt": 5000, "loanTerm": 30, "loanAmount": 10000, "creditScore": 750, "mlsId": "MLS-3456" }
 ]
 
-# 모델 옵션 목록
-MODEL_OPTIONS = [
-    "anthropic.claude-3-sonnet-20240229-v1:0", 
-    "anthropic.claude-3-haiku-20240307-v1:0", 
-    "amazon.titan-text-express-v1"
-]
-
 def render_sidebar():
     """애플리케이션 사이드바 UI를 렌더링합니다."""
     with st.sidebar:
@@ -49,6 +51,7 @@ def render_sidebar():
         # 푸터
         st.divider()
         st.write("Amazon Bedrock 채팅봇 애플리케이션")
+        render_memory_report()
 
 
 def render_response_mode_selector():
@@ -56,28 +59,36 @@ def render_response_mode_selector():
     st.session_state.response_mode = st.radio(
         "응답 모드 선택",
         ["Foundation Model", "Converse API", "Knowledge Base (Retrieve)", 
-         "Knowledge Base (Retrieve & Generate)", "Agent", "Flow"],
+         "Knowledge Base (Retrieve & Generate)", "Knowledge Base (RAG)", "Agent", "Flow"],
         index=0,
         help="채팅봇이 사용할 응답 생성 방식을 선택하세요."
     )
 
 
+@st.fragment
 def render_parameter_inputs():
-    """선택된 응답 모드에 따라 적절한 파라미터 입력 필드를 렌더링합니다."""
+    """
+    선택된 응답 모드에 따라 적절한 파라미터 입력 필드를 렌더링합니다.
+    
+    프래그먼트로 실행되어 파라미터 변경 시 이 패널만 다시 그려집니다.
+    응답 모드가 바뀌면 전체 앱이 재실행되므로 패널도 함께 갱신됩니다.
+    """
     mode = st.session_state.response_mode
     
     # Foundation Model 설정
     if mode == "Foundation Model":
         st.session_state.model_id = st.selectbox(
-            "모델 선택", MODEL_OPTIONS, index=0,
-            help="사용할 파운데이션 모델을 선택하세요."
+            "모델 선택", list(MODEL_OPTIONS) + [AUTO_MODEL_ID], index=0,
+            format_func=format_model_option,
+            help="사용할 파운데이션 모델을 선택하세요. auto를 선택하면 요청마다 모델을 자동으로 선택합니다."
         )
     
     # Converse API 설정
     elif mode == "Converse API":
         st.session_state.model_id = st.selectbox(
-            "모델 선택", MODEL_OPTIONS, index=0,
-            help="사용할 파운데이션 모델을 선택하세요."
+            "모델 선택", list(MODEL_OPTIONS) + [AUTO_MODEL_ID], index=0,
+            format_func=format_model_option,
+            help="사용할 파운데이션 모델을 선택하세요. auto를 선택하면 요청마다 모델을 자동으로 선택합니다."
         )
         st.session_state.temperature = st.slider(
             "Temperature", min_value=0.0, max_value=1.0, value=0.7, step=0.1,
@@ -92,8 +103,24 @@ def render_parameter_inputs():
     elif "Knowledge Base" in mode:
         st.session_state.knowledge_base_id = st.text_input(
             "Knowledge Base ID", config.knowledge_base_id,
-            help="사용할 Knowledge Base의 ID를 입력하세요."
+            help="사용할 Knowledge Base의 ID를 입력하세요. 검색 모드에서는 쉼표로 구분하여 여러 KB를 동시에 검색할 수 있습니다."
         )
+        render_retrieval_settings()
+        if mode == "Knowledge Base (Retrieve & Generate)":
+            st.session_state.kb_stream = st.checkbox(
+                "스트리밍 응답", value=True,
+                help="생성된 텍스트와 인용 정보를 도착하는 대로 표시합니다."
+            )
+        elif mode == "Knowledge Base (RAG)":
+            st.session_state.rag_model_id = st.selectbox(
+                "생성 모델", list(MODEL_OPTIONS), index=0,
+                help="검색 결과를 바탕으로 답변을 생성할 모델을 선택하세요."
+            )
+            st.session_state.rag_context_budget = st.number_input(
+                "컨텍스트 토큰 예산", min_value=500, max_value=20000,
+                value=DEFAULT_CONTEXT_TOKEN_BUDGET, step=500,
+                help="답변 생성에 함께 보낼 검색 청크의 최대 토큰 수입니다."
+            )
     
     # Agent 설정
     elif mode == "Agent":
@@ -118,6 +145,67 @@ def render_parameter_inputs():
         )
 
 
+def render_retrieval_settings():
+    """Knowledge Base 검색 설정(top-k, 검색 유형, 메타데이터 필터) 입력 필드를 렌더링합니다."""
+    top_k = st.number_input(
+        "검색 결과 수 (top-k)", min_value=1, max_value=100, value=5, step=1,
+        help="Knowledge Base에서 가져올 결과 수입니다."
+    )
+    search_type = st.selectbox(
+        "검색 유형", [None] + SEARCH_TYPES, index=0,
+        format_func=lambda value: "기본값" if value is None else value,
+        help="HYBRID는 키워드와 의미 검색을 함께, SEMANTIC은 의미 검색만 사용합니다."
+    )
+    filter_expression = st.text_area(
+        "메타데이터 필터",
+        placeholder="category = guidelines; year >= 2023",
+        help="세미콜론으로 구분한 조건(=, !=, >, >=, <, <=, in) 또는 Bedrock 필터 JSON을 입력하세요. 모든 조건을 만족하는 문서만 검색합니다."
+    )
+
+    backend = BACKEND_BEDROCK
+    if st.session_state.response_mode != "Knowledge Base (Retrieve & Generate)":
+        backends = [BACKEND_BEDROCK, BACKEND_LOCAL]
+        backend = st.selectbox(
+            "검색 백엔드", backends, index=backends.index(config.knowledge_base_backend),
+            format_func=lambda value: "Bedrock Knowledge Base" if value == BACKEND_BEDROCK else f"로컬 인덱스 ({config.local_index_path})",
+            help="로컬 인덱스는 python -m lib.local_index build로 만든 오프라인 벡터 인덱스를 검색합니다."
+        )
+
+    rerank = False
+    if st.session_state.response_mode in ("Knowledge Base (Retrieve)", "Knowledge Base (RAG)"):
+        rerank = st.checkbox(
+            "재정렬 및 중복 제거", value=True,
+            help="후보를 더 많이 가져와 로컬에서 BM25/임베딩으로 재정렬하고 비슷한 청크를 걸러냅니다."
+        )
+
+    try:
+        metadata_filter = parse_filter_expression(filter_expression)
+    except ValueError as e:
+        st.error(str(e))
+        metadata_filter = None
+
+    st.session_state.retrieval_config = RetrievalConfig(
+        top_k=int(top_k), search_type=search_type, filter=metadata_filter, rerank=rerank, backend=backend
+    )
+
+    # 검색 캐시 상태 (RetrieveAndGenerate는 서버에서 검색하므로 사용하지 않음)
+    if st.session_state.response_mode != "Knowledge Base (Retrieve & Generate)":
+        stats = retrieval_cache.stats()
+        st.caption(
+            f"검색 캐시: 적중률 {stats['hit_rate']:.0%} "
+            f"({stats['hits']}/{stats['hits'] + stats['misses']}), {stats['entries']}개 항목"
+        )
+        if st.button("검색 캐시 비우기", help="KB 내용이 바뀐 경우 캐시된 검색 결과를 삭제합니다."):
+            retrieval_cache.invalidate()
+
+
+def format_model_option(model_id):
+    """모델 선택 목록의 표시 이름을 반환합니다."""
+    if model_id == AUTO_MODEL_ID:
+        return "auto (복잡도/지연 시간 기반 자동 선택)"
+    return model_id
+
+
 def render_action_buttons():
     """설정 저장 및 대화 초기화 버튼을 렌더링합니다."""
     
@@ -129,11 +217,28 @@ def render_action_buttons():
 
 def reset_conversation():
     """대화 기록 및 관련 상태를 초기화합니다."""
+    # 메시지가 참조하던 트레이스와 내보낸 메시지 내용을 저장소에서 삭제
+    for msg in st.session_state.get("chat_messages", []):
+        if msg.get("trace_ref"):
+            trace_store.delete(msg["trace_ref"])
+        if msg.get("spill_ref"):
+            message_spill_store.delete(msg["spill_ref"])
+    
+    # 저장된 채팅 기록 삭제
+    if "transcript_token" in st.session_state:
+        get_transcript_store().delete(st.session_state.transcript_token)
+    st.session_state.transcript_has_more = False
+    
     # 초기화할 세션 상태 항목들
     reset_items = [
         {"key": "chat_messages", "default": []},
         {"key": "current_trace", "default": None},
-        {"key": "converse_history", "default": []},
+        {"key": "converse_history", "default": Conversation()},
+        {"key": "converse_compactor", "default": HistoryCompactor()},
+        {"key": "kb_session", "default": None},
+        {"key": "rag_history", "default": Conversation()},
+        {"key": "rag_session", "default": RagSession()},
+        {"key": "rag_compactor", "default": HistoryCompactor()},
         {"key": "processing_status", "default": {
             "is_processing": False,
             "current_prompt": None,
@@ -146,8 +251,20 @@ def reset_conversation():
             st.session_state[item["key"]] = item["default"]
 
 
+def render_memory_report():
+    """현재 세션의 메모리 사용량을 표시합니다."""
+    report = st.session_state.get("memory_report")
+    if report:
+        st.caption(f"세션 메모리 사용량: {report['total'] / 1024:.1f} KB")
+
+
+@st.fragment
 def render_sample_prompts():
-    """모든 모드에서 공통으로 사용할 샘플 프롬프트 버튼을 렌더링합니다."""
+    """
+    모든 모드에서 공통으로 사용할 샘플 프롬프트 버튼을 렌더링합니다.
+    
+    프래그먼트로 실행되며, 프롬프트 선택 시에만 전체 앱 재실행을 요청합니다.
+    """
     # 처리 중일 때는 샘플 프롬프트 비활성화
     disabled = st.session_state.get("processing_status", {}).get("is_processing", False)
     
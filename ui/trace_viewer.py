@@ -5,9 +5,59 @@ Bedrock 서비스의 트레이스 정보를 시각화하는 UI 모듈
 Agent 및 Flow 실행 과정의 상세 정보를 사용자에게 보기 좋게 표시합니다.
 """
 
+import hashlib
 import streamlit as st
-import json
+from lib.json_codec import dumps, loads
 from lib.trace_utils import extract_trace_summary
+from lib.trace_store import trace_store
+
+# 화면에 전체 JSON을 표시할 최대 트레이스 크기 (넘으면 다운로드로 제공)
+MAX_INLINE_TRACE_BYTES = 1024 * 1024
+
+# 트리 한 단계에 한 번에 표시할 항목 수
+TREE_PAGE_SIZE = 50
+
+# 트리 값 미리보기 최대 길이
+TREE_PREVIEW_LENGTH = 200
+
+# 캐시에 유지할 트레이스 수
+TRACE_CACHE_ENTRIES = 8
+
+
+def trace_hash(payload):
+    """직렬화된 트레이스의 캐시 키(내용 해시)를 반환합니다"""
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+@st.cache_resource(max_entries=TRACE_CACHE_ENTRIES, show_spinner=False)
+def _parse_trace(payload_hash, _payload):
+    """
+    직렬화된 트레이스를 역직렬화합니다 (해시가 같으면 재실행 시 다시 파싱하지 않음).
+
+    반환 객체는 복사 없이 공유되므로 호출자는 수정하지 않아야 합니다.
+    """
+    return loads(_payload)
+
+
+@st.cache_data(max_entries=TRACE_CACHE_ENTRIES, show_spinner=False)
+def _format_trace(payload_hash, _trace):
+    """트레이스의 보기 좋은 JSON 문자열을 캐시합니다"""
+    return format_trace_for_display(_trace)
+
+
+def load_trace(trace_id):
+    """
+    트레이스 저장소에서 트레이스를 불러옵니다 (같은 트레이스는 캐시된 객체 재사용).
+
+    Returns:
+        tuple: (트레이스 레코드, 직렬화된 bytes, 내용 해시) - 없으면 ({}, None, None)
+    """
+    payload = trace_store.get_payload(trace_id)
+    if payload is None:
+        return {}, None, None
+    payload_hash = trace_hash(payload)
+    return _parse_trace(payload_hash, payload), payload, payload_hash
+
 
 def format_trace_for_display(trace):
     """
@@ -17,9 +67,82 @@ def format_trace_for_display(trace):
         return "트레이스 정보가 없습니다."
     
     # 딕셔너리를 보기 좋은 JSON 형태로 변환
-    formatted_trace = json.dumps(trace, indent=2, ensure_ascii=False)
+    formatted_trace = dumps(trace, pretty=True)
     return formatted_trace
 
+
+def _preview(value):
+    """트리 말단 값의 한 줄 미리보기를 반환합니다"""
+    text = value if isinstance(value, str) else dumps(value)
+    if len(text) > TREE_PREVIEW_LENGTH:
+        text = text[:TREE_PREVIEW_LENGTH] + "…"
+    return text.replace("\n", " ")
+
+
+def _show_more(page_key):
+    """트리 단계의 표시 항목 수를 한 페이지만큼 늘립니다"""
+    st.session_state[page_key] = st.session_state.get(page_key, TREE_PAGE_SIZE) + TREE_PAGE_SIZE
+
+
+def render_trace_tree(node, key_prefix, depth=0):
+    """
+    트레이스를 접을 수 있는 트리로 표시합니다.
+    
+    하위 트리는 토글을 켠 노드만 렌더링하므로, 펼치지 않은 부분은 화면 요소를 만들지 않습니다.
+    항목이 많은 단계는 TREE_PAGE_SIZE개씩 나누어 표시합니다.
+    
+    Args:
+        node (dict or list): 표시할 노드
+        key_prefix (str): 위젯 키 접두어 (트레이스 해시와 노드 경로)
+        depth (int): 들여쓰기 깊이
+    """
+    items = node.items() if isinstance(node, dict) else enumerate(node)
+    page_key = f"{key_prefix}#page"
+    limit = st.session_state.get(page_key, TREE_PAGE_SIZE)
+    indent = "\u3000" * depth
+    
+    for index, (key, value) in enumerate(items):
+        if index >= limit:
+            st.button(
+                f"{indent}더 보기 ({len(node) - limit}개 남음)", key=f"{page_key}#more",
+                on_click=_show_more, args=(page_key,)
+            )
+            break
+        
+        child_key = f"{key_prefix}/{key}"
+        if isinstance(value, (dict, list)) and value:
+            size = f"{{{len(value)}}}" if isinstance(value, dict) else f"[{len(value)}]"
+            if st.toggle(f"{indent}{key} {size}", key=child_key):
+                render_trace_tree(value, child_key, depth + 1)
+        else:
+            st.text(f"{indent}{key}: {_preview(value)}")
+
+
+def render_full_trace_json(trace_data, payload, payload_hash, trace_id, key_prefix):
+    """
+    전체 트레이스 JSON을 크기에 따라 표시합니다.
+    
+    직렬화 크기가 MAX_INLINE_TRACE_BYTES 이하이면 토글을 켠 경우에만 캐시된 JSON을 표시하고,
+    넘으면 화면에 그리지 않고 다운로드로 제공합니다.
+    
+    Args:
+        trace_data: 표시할 트레이스 데이터
+        payload (bytes): 트레이스 레코드의 직렬화된 bytes (크기 판단 및 다운로드용)
+        payload_hash (str): 캐시 키로 사용할 내용 해시
+        trace_id (str): 다운로드 파일 이름에 사용할 트레이스 ID
+        key_prefix (str): 위젯 키 접두어 (같은 트레이스를 여러 곳에 표시할 때 구분)
+    """
+    if len(payload) > MAX_INLINE_TRACE_BYTES:
+        st.warning(f"트레이스가 커서({len(payload) / (1024 * 1024):.1f}MB) 전체 JSON은 다운로드로 제공합니다.")
+        st.download_button(
+            "📥 트레이스 다운로드", data=payload, file_name=f"trace_{trace_id}.json",
+            mime="application/json", key=f"{key_prefix}_download_{payload_hash}"
+        )
+    elif st.toggle("전체 JSON 보기", key=f"{key_prefix}_json_{payload_hash}"):
+        st.code(_format_trace(payload_hash, trace_data), language="json")
+
+
+@st.fragment
 def render_trace_viewer():
     """
     트레이스 정보 뷰어 UI를 렌더링합니다.
@@ -30,35 +153,16 @@ def render_trace_viewer():
     Converse API의 경우 대화 기록을 표시합니다.
     
     트레이스 정보가 없는 경우 안내 메시지를 표시합니다.
-    """
-
-    # 디버깅 정보 추가
-    st.write("### 트레이스 디버그 정보")
     
-    # 세션 상태 확인
-    if 'current_trace' in st.session_state:
-        if st.session_state.current_trace:
-            st.success("세션에 트레이스 정보가 있습니다")
-            st.write(f"트레이스 유형: {st.session_state.current_trace.get('response_type')}")
-            
-            # 트레이스 데이터 확인
-            trace_data = st.session_state.current_trace.get("trace_data")
-            if trace_data:
-                st.success("트레이스 데이터가 존재합니다")
-                # 트레이스 데이터 일부 표시
-                st.json({k: str(type(v)) for k, v in trace_data.items()} if isinstance(trace_data, dict) else {"데이터 타입": str(type(trace_data))})
-            else:
-                st.error("트레이스 데이터가 None입니다")
-        else:
-            st.warning("세션에 트레이스 객체가 있지만 내용이 없습니다")
-    else:
-        st.error("세션에 트레이스 정보가 없습니다")
-        
+    프래그먼트로 실행되어 뷰어 내부 상호작용 시 뷰어 영역만 다시 그려집니다.
+    역직렬화 결과와 포맷팅된 JSON은 트레이스 해시로 캐시하며, 상세 정보는 펼친 노드만 렌더링합니다.
+    """
     # 세션에 저장된 트레이스 정보가 있는지 확인
-    if st.session_state.current_trace:
-        # 트레이스 데이터 및 응답 유형 가져오기
-        trace_data = st.session_state.current_trace["trace_data"]
+    if st.session_state.get("current_trace"):
+        # 트레이스 데이터 및 응답 유형 가져오기 (세션에는 참조만 있으므로 저장소에서 로드)
         response_type = st.session_state.current_trace["response_type"]
+        trace_record, payload, payload_hash = load_trace(st.session_state.current_trace.get("trace_id"))
+        trace_data = trace_record.get("trace_data")
         
         # 트레이스 뷰어 제목
         st.header("트레이스 정보")
@@ -71,7 +175,7 @@ def render_trace_viewer():
             if trace_data:
                 # 트레이스 정보에서 요약 정보 추출
                 try:
-                    summary = extract_trace_summary(trace_data, response_type)
+                    summary = extract_trace_summary(trace_data, response_type, trace_record.get("trace_index"))
                     st.subheader("요약")
                     
                     # 에러 메시지가 있는 경우 표시
@@ -106,7 +210,7 @@ def render_trace_viewer():
                 except Exception as e:
                     st.error(f"트레이스 요약 처리 중 오류 발생: {str(e)}")
                     if isinstance(trace_data, dict):
-                        st.json(trace_data)
+                        render_trace_tree(trace_data, f"trace_summary_tree_{payload_hash}")
             else:
                 st.write("요약 정보가 없습니다.")
         
@@ -114,22 +218,27 @@ def render_trace_viewer():
         with tab2:
             try:
                 if trace_data:
-                    # 트레이스 전체 정보를 포맷팅하여 코드 블록으로 표시
                     st.subheader("전체 트레이스")
-                    st.code(format_trace_for_display(trace_data), language="json")
+                    if isinstance(trace_data, (dict, list)):
+                        render_trace_tree(trace_data, f"trace_tree_{payload_hash}")
+                    else:
+                        st.text(_preview(trace_data))
+                    
+                    st.divider()
+                    render_full_trace_json(
+                        trace_data, payload, payload_hash, st.session_state.current_trace.get("trace_id"), "trace"
+                    )
                 else:
                     st.write("트레이스 정보가 없습니다.")
             except Exception as e:
                 st.error(f"트레이스 데이터 표시 중 오류 발생: {str(e)}")
-                st.write("원본 트레이스 데이터:")
-                st.json(trace_data)
                 
     # Converse API 대화 기록 표시 (트레이스 정보가 없어도)
     elif st.session_state.response_mode == "Converse API" and hasattr(st.session_state, 'converse_history') and st.session_state.converse_history:
         st.header("Converse 대화 기록")
         
         # 대화 기록 테이블로 표시
-        converse_history = st.session_state.converse_history
+        converse_history = st.session_state.converse_history.text_history()
         
         # 대화 흐름을 시각적으로 표시
         for i, msg in enumerate(converse_history):